@@ -10,12 +10,18 @@ from src.core.updater import check_for_updates
 from src.core.alarm_manager import AlarmManager
 from src.core.data_store import DataStore
 from src.core.tuner import StepResponseAnalyzer
+from src.core.task_registry import TaskRegistry
+from src.core.filters import TelemetryPipeline, DEFAULT_FILTER_CHAIN
+from src.core.sequencer import AutotuneSequencer
+from src.core.recipe import RecipeRunner
+from src.core.storage_writer import StorageWriter
 
 # --- IMPORTS VISTAS ---
 from src.views.alarms import AlarmsView
 from src.views.dashboard import DashboardView
 from src.views.tuning import TuningView
 from src.views.settings import SettingsView
+from src.views.simulation import SimulationView
 
 # --- IMPORTS COMPONENTES ---
 from src.components.sidebar import AnimatedSidebar
@@ -35,27 +41,47 @@ def main(page: ft.Page):
     }
 
     # --- 2. INICIALIZAR NÚCLEO ---
+    # Registro central: dueño de todas las corrutinas de fondo (cancelación + contabilidad)
+    task_registry = TaskRegistry(page)
     esp_interface = ESP32Interface()
     app_data = DataStore()
+
+    # Filtros de telemetría (entre read_telemetry y los consumidores)
+    try:
+        telemetry_filter = TelemetryPipeline(page.client_storage.get("filter_chain") or DEFAULT_FILTER_CHAIN)
+    except ValueError as e:
+        print(f"[Filtros] Cadena guardada inválida ({e}), usando la predeterminada.")
+        telemetry_filter = TelemetryPipeline(DEFAULT_FILTER_CHAIN)
     
     # --- NUEVO: TUNER GLOBAL (Persistencia) ---
-    global_tuner = StepResponseAnalyzer()
+    global_tuner = StepResponseAnalyzer(esp_interface)
+    # Guardados desde el bucle global: client_storage bloquea si se llama en el loop
+    storage_writer = StorageWriter(page.client_storage)
+    # Secuencia multi-punto desatendida (tabla de modelos en client_storage)
+    sequencer = AutotuneSequencer(global_tuner, esp_interface, storage_writer)
+    # Perfiles rampa/meseta (reanuda una receta interrumpida)
+    recipe_runner = RecipeRunner(esp_interface, storage_writer)
 
     # Placeholder
     topbar = None
 
-    def on_alarm_trigger_callback():
-        if topbar: topbar.add_notification("¡Tiempo Finalizado!")
+    def on_alarm_trigger_callback(name):
+        # Lo llama el event loop justo al vencer el temporizador (una sola vez)
+        if topbar: topbar.add_notification(f"¡Tiempo Finalizado! ({name})")
         try:
             page.snack_bar = ft.SnackBar(
-                content=ft.Text("¡TIEMPO FINALIZADO!", weight="bold"),
+                content=ft.Text(f"¡TIEMPO FINALIZADO! ({name})", weight="bold"),
                 bgcolor=AppTheme.color_alarm, duration=5000
             )
             page.snack_bar.open = True
             page.update()
         except: pass
 
-    alarm_manager = AlarmManager(page, esp_interface, on_alarm_trigger_callback)
+    def on_rule_alarm_callback(message):
+        # Transición a activa de una regla de alarma (no se repite mientras siga activa)
+        if topbar: topbar.add_notification(message)
+
+    alarm_manager = AlarmManager(page, esp_interface, on_alarm_trigger_callback, on_rule_alarm_callback)
 
     # --- 3. FONDO AURORA ---
     center_x = random.uniform(-0.1, 0.5)
@@ -84,35 +110,62 @@ def main(page: ft.Page):
 
     content_view = ft.Column(expand=True, scroll="auto")
 
-    # --- 5. NAVEGACIÓN ---
+    # --- 5. NAVEGACIÓN (CACHÉ DE VISTAS) ---
+    # Cada vista se construye UNA sola vez y queda en caché. Al cambiar de pestaña
+    # la vista saliente se oculta y se suspende (su bucle queda en pausa) y la
+    # entrante se muestra y se reanuda. Así el número de tareas es fijo.
+    view_factories = {
+        # Pasamos la instancia global del tuner para ver datos en tiempo real sin reiniciar
+        "dashboard": lambda: DashboardView(esp_interface, page, app_data, task_registry),
+        "graphs": lambda: TuningView(esp_interface, page, global_tuner, task_registry, sequencer, app_data, storage_writer),
+        "alarms": lambda: AlarmsView(alarm_manager, page, task_registry, recipe_runner),
+        "simulation": lambda: SimulationView(page, task_registry),
+        "settings": lambda: SettingsView(esp_interface, page, task_registry, telemetry_filter),
+    }
+    view_cache = {}
+    current_route = {"name": None}
+
     def navigate(route_name):
-        content_view.controls.clear()
-
-        if route_name == "dashboard":
-            content_view.controls.append(DashboardView(esp_interface, page, app_data))
-        
-        elif route_name == "graphs":
-            # Pasamos la instancia global para ver datos en tiempo real sin reiniciar
-            content_view.controls.append(TuningView(esp_interface, page, global_tuner))
-        
-        elif route_name == "alarms":
-            content_view.controls.append(AlarmsView(alarm_manager, page))
-        
-        elif route_name == "settings":
-            content_view.controls.append(SettingsView(esp_interface, page))
-        
-        elif route_name == "logout":
+        if route_name == "logout":
             # Seguridad: Apagar tuning si salimos de la app
-            if global_tuner.recording:
+            sequencer.abort("Cierre de la aplicación")
+            if global_tuner.testing:
+                global_tuner.stop_relay()
                 esp_interface.send_auto_tune_cmd(False)
-            
+
+            task_registry.shutdown()
             esp_interface.disconnect()
             page.window.close()
             return
 
+        if route_name not in view_factories or route_name == current_route["name"]:
+            return
+
+        # 1. Ocultar y pausar la vista actual
+        previous = view_cache.get(current_route["name"])
+        if previous:
+            previous.suspend()
+            previous.visible = False
+
+        # 2. Mostrar la vista destino (construirla solo la primera vez)
+        view = view_cache.get(route_name)
+        is_new = view is None
+        if is_new:
+            view = view_factories[route_name]()
+            view_cache[route_name] = view
+            content_view.controls.append(view)
+        else:
+            view.visible = True
+
+        current_route["name"] = route_name
+
         if content_view.page:
             content_view.update()
 
+        # 3. Reanudar después de montar (la vista ya es visible y puede actualizarse)
+        if not is_new:
+            view.resume()
+
     content_container.content = content_view
 
     # --- 6. COMPONENTES DE UI ---
@@ -172,34 +225,67 @@ def main(page: ft.Page):
                     
                     if telemetry:
                         t_now = time.time()
-                        temp = float(telemetry.get('temp', 0))
+                        raw_temp = float(telemetry.get('temp', 0))
                         sp = float(telemetry.get('sp', 0))
                         out = int(telemetry.get('out', 0))
+
+                        # 0. Filtrado en flujo (la cruda se guarda junto a la filtrada)
+                        temp, rate = telemetry_filter.process(t_now, raw_temp)
+                        # La seguridad no usa la filtrada: el filtro atrasa y recorta picos
+                        safety_temp = max(raw_temp, temp)
                         
                         # 1. Alimentar Dashboard (CORREGIDO: SE PASA EL VALOR 'out')
                         if app_data.start_time is None: app_data.start_time = t_now
                         elapsed = t_now - app_data.start_time
-                        app_data.add_data(elapsed, temp, sp, power=out)
+                        app_data.add_data(elapsed, temp, sp, power=out, raw_temp=raw_temp, rate=rate)
+
+                        # 1b. Reglas de alarma: O(1) por regla y muestra
+                        alarm_manager.process_sample(time.monotonic(), temp, sp, rate)
 
                         # 2. Alimentar Tuner (Siempre actualizamos live data para el dimmer)
-                        global_tuner.update_live_data(temp, out)
+                        global_tuner.update_live_data(temp, out, safety_temp=safety_temp)
+
+                        # 2b. Autosintonía por relé: conmutar potencia manual
+                        if global_tuner.relay_active:
+                            power = global_tuner.relay_step(temp)
+                            if power is not None and not esp_interface.send_manual_power(power):
+                                # Sin comando M el modo E queda a potencia fija: no hay relé
+                                global_tuner.stop_relay()
+                            if not global_tuner.relay_active:
+                                # Ensayo terminado: devolver el control al PID
+                                esp_interface.send_auto_tune_cmd(False)
+
+                        # 2c. Secuencia multi-punto (estabilizar -> escalón -> siguiente punto)
+                        sequencer.tick(time.monotonic(), temp, sp, out)
+
+                        # 2d. Receta rampa/meseta (en pausa mientras haya un ensayo)
+                        if not (global_tuner.testing or sequencer.active):
+                            if recipe_runner.tick(time.monotonic(), temp) and topbar:
+                                topbar.add_notification("Receta terminada")
 
                         # 3. SEGURIDAD: Límite 80°C durante Tuning
-                        if global_tuner.recording:
-                            if temp >= 80.0:
-                                print(f"[Safety] Temp {temp}°C > 80°C. Abortando Tuning.")
-                                global_tuner.stop_recording()
+                        # Corte predictivo: el calor ya aplicado sigue llegando durante el tiempo muerto
+                        if global_tuner.testing:
+                            predicted = global_tuner.predicted_temp
+                            if safety_temp >= 80.0 or global_tuner.safety_guard.tripped:
+                                # Sin modelo todavía no hay proyección: vale la medida
+                                predicted = safety_temp if predicted is None else max(safety_temp, predicted)
+                                sequencer.abort("parada de emergencia")
+                                print(f"[Safety] Temp {safety_temp}°C (proyectada {predicted:.1f}°C) >= 80°C. Abortando Tuning.")
+                                if global_tuner.relay_active: global_tuner.stop_relay()
+                                elif global_tuner.recording: global_tuner.stop_recording()   # Si la secuencia no lo detuvo ya
                                 esp_interface.send_auto_tune_cmd(False)
                                 
                                 page.snack_bar = ft.SnackBar(
-                                    content=ft.Text("¡PARADA EMERGENCIA! Temp > 80°C"),
+                                    content=ft.Text(f"¡PARADA EMERGENCIA! Temp proyectada {predicted:.1f}°C > 80°C"),
                                     bgcolor="red"
                                 )
                                 page.snack_bar.open = True
                                 page.update()
 
-                # C) Chequeo de Alarmas
-                alarm_manager.check_status()
+                # C) Alarmas: los temporizadores se disparan solos (loop.call_at);
+                #    aquí solo las reglas "sin datos", que deben correr aun sin telemetría
+                alarm_manager.check_timeouts(time.monotonic())
 
             except Exception as e:
                 print(f"Error loop global: {e}")
@@ -207,7 +293,7 @@ def main(page: ft.Page):
             # Frecuencia de muestreo global (0.5s es suficiente)
             await asyncio.sleep(0.5)
 
-    page.run_task(global_monitoring_loop)
+    task_registry.spawn("global_monitoring", global_monitoring_loop)
 
     # --- TAREA DE ACTUALIZACIÓN (NUEVO) ---
     async def run_update_check():
@@ -219,7 +305,7 @@ def main(page: ft.Page):
         except Exception as e:
             print(f"Error checking updates: {e}")
 
-    page.run_task(run_update_check)
+    task_registry.spawn("update_check", run_update_check)
 
     # --- 9. ARRANQUE ---
     navigate("dashboard")
@@ -243,6 +329,8 @@ def main(page: ft.Page):
             sidebar.toggle_sidebar(False)
 
     page.on_resized = handle_page_resize
+    # Cierre de sesión/ventana: cancelar todas las tareas registradas
+    page.on_disconnect = lambda e: task_registry.shutdown()
     page.update()
 
 if __name__ == "__main__":
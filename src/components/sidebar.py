@@ -60,6 +60,7 @@ class AnimatedSidebar(ft.Container):
             SidebarItem(ft.Icons.DASHBOARD, "Dashboard", page, self.handle_nav_click, "dashboard"),
             SidebarItem(ft.Icons.ANALYTICS, "Sintonización", page, self.handle_nav_click, "graphs"),
             SidebarItem(ft.Icons.TIMER, "Alarmas", page, self.handle_nav_click, "alarms"),
+            SidebarItem(ft.Icons.SCIENCE, "Simulador", page, self.handle_nav_click, "simulation"),
             SidebarItem(ft.Icons.SETTINGS, "Ajustes", page, self.handle_nav_click, "settings"),
         ]
         
@@ -1,85 +1,218 @@
 # src/core/alarm_manager.py
-import time
+"""
+Temporizadores de proceso dirigidos por eventos.
+
+Cada temporizador con nombre se agenda con loop.call_at sobre el reloj del
+event loop (monotónico: un ajuste NTP no mueve el fin). Al vencer dispara UNA
+sola vez (buzzer + callback); entretanto, un tic por segundo EMPUJA el tiempo
+restante a los suscriptores (AlarmsView) en lugar de que lo consulten.
+Los métodos públicos se pueden llamar desde los hilos de los handlers de
+Flet: todo lo que toca el loop se despacha con call_soon_threadsafe.
+
+Además evalúa las reglas de alarma de proceso (src/core/alarm_rules.py) con
+cada muestra de telemetría: process_sample() y check_timeouts().
+"""
+import asyncio
+import math
+
+from src.core.alarm_rules import AlarmRuleEngine, DEFAULT_ALARM_RULES, DEFAULT_SOURCE
+
+DEFAULT_TIMER = "proceso"
+
+
+class _Timer:
+    __slots__ = ("name", "minutes", "deadline", "fire_handle", "tick_handle", "fired")
+
+    def __init__(self, name, minutes, deadline):
+        self.name = name
+        self.minutes = minutes
+        self.deadline = deadline      # loop.time() de vencimiento
+        self.fire_handle = None
+        self.tick_handle = None
+        self.fired = False
+
 
 class AlarmManager:
-    def __init__(self, page, esp_interface, on_trigger_callback):
+    def __init__(self, page, esp_interface, on_trigger_callback, on_rule_callback=None):
         self.page = page
         self.esp = esp_interface
         self.on_trigger = on_trigger_callback
-        
-        # Variables de estado
-        self.is_running = False
-        self.end_time = 0.0  # Marca de tiempo UNIX cuando debe sonar
-        self.buzzer_sent = False
-        
+        self.on_rule = on_rule_callback
+
+        # Temporizadores vivos por nombre y suscriptores del tiempo restante
+        self.timers = {}
+        self.listeners = []
+
         # Valores por defecto (cargamos de la memoria persistente si existen)
         saved_min = self.page.client_storage.get("timer_minutes")
         saved_sp = self.page.client_storage.get("timer_sp")
-        
+
         self.initial_minutes = saved_min if saved_min is not None else 5.0
         self.target_sp = saved_sp if saved_sp is not None else 0.0
 
+        # Reglas de alarma de proceso (persistidas como texto)
+        try:
+            self.rules = AlarmRuleEngine(self.page.client_storage.get("alarm_rules") or DEFAULT_ALARM_RULES,
+                                         on_event=self._on_rule_event)
+        except ValueError as e:
+            print(f"[Alarmas] Reglas guardadas inválidas ({e}), usando las predeterminadas.")
+            self.rules = AlarmRuleEngine(DEFAULT_ALARM_RULES, on_event=self._on_rule_event)
+
+    @property
+    def loop(self):
+        return self.page.loop
+
+    @property
+    def is_running(self):
+        """Compatibilidad: el temporizador principal sigue en marcha."""
+        timer = self.timers.get(DEFAULT_TIMER)
+        return timer is not None and not timer.fired
+
+    # --- HILOS ---
+    def _in_loop(self, fn, *args):
+        """Ejecuta fn en el hilo del event loop (directo si ya estamos en él)."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    # --- API DE PROCESO (SP + temporizador principal) ---
     def start_process(self, setpoint, minutes):
         """
-        Inicia el proceso: 
+        Inicia el proceso:
         1. Guarda configuración.
         2. Envía SOLO el Setpoint al ESP32 (Seguro).
-        3. Calcula la hora exacta de finalización.
+        3. Agenda el fin en el reloj monotónico del loop.
         """
         self.target_sp = float(setpoint)
         self.initial_minutes = float(minutes)
-        
+
         # Persistencia: Guardar para la próxima vez que se abra la app
         self.page.client_storage.set("timer_minutes", self.initial_minutes)
         self.page.client_storage.set("timer_sp", self.target_sp)
-        
+
         # --- CORRECCIÓN DE SEGURIDAD ---
         # Antes enviábamos (0,0,0, sp) arriesgando el PID.
         # Ahora usamos el método dedicado que solo toca la temperatura 'T'.
         self.esp.send_setpoint_only(self.target_sp)
-        
-        # 2. Calcular HORA DE FIN EXACTA (Timestamp Actual + Segundos)
-        # Usar Timestamp es mejor que restar 1 segundo, porque es inmune a bloqueos de la app.
-        self.end_time = time.time() + (self.initial_minutes * 60)
-        
-        self.is_running = True
-        self.buzzer_sent = False
-        print(f"Iniciado. Termina en timestamp: {self.end_time}")
-
-    def stop_process(self):
-        """Detiene el contador y apaga el buzzer manualmente."""
-        self.is_running = False
-        self.esp.send_buzzer(False)
-        self.buzzer_sent = False
-        print("Proceso detenido manualmente.")
-
-    def get_remaining_seconds(self):
-        """Calcula cuánto falta comparando la hora actual con la hora fin."""
-        if not self.is_running:
-            return 0
-        
-        remaining = self.end_time - time.time()
-        
-        if remaining <= 0:
-            return 0
-        
-        return int(remaining)
-
-    def check_status(self):
+
+        self.start_timer(DEFAULT_TIMER, self.initial_minutes)
+
+    def stop_process(self, name=DEFAULT_TIMER):
         """
-        Llamar a esto constantemente desde el bucle global en main.py.
-        Verifica si ya pasamos la hora de finalización.
+        Detiene el temporizador y apaga el buzzer, salvo que siga sonando por
+        una regla activa u otro temporizador vencido.
         """
-        if self.is_running:
-            # Si el tiempo actual es mayor o igual al tiempo fin
-            if time.time() >= self.end_time:
-                if not self.buzzer_sent:
-                    # ¡TIEMPO CUMPLIDO!
-                    print("Timer finalizado. Enviando señal Buzzer...")
-                    self.esp.send_buzzer(True)
-                    
-                    # Notificar a la interfaz (TopBar)
-                    if self.on_trigger:
-                        self.on_trigger()
-                    
-                    self.buzzer_sent = True
\ No newline at end of file
+        self._in_loop(self._stop, name)
+        print(f"[Alarmas] '{name}' detenido manualmente.")
+
+    # --- TEMPORIZADORES CON NOMBRE ---
+    def start_timer(self, name, minutes):
+        """Agenda (o reinicia) el temporizador 'name'."""
+        # El plazo se fija ya (no cuando el loop procese el agendado)
+        timer = _Timer(name, float(minutes), self.loop.time() + float(minutes) * 60.0)
+        self._in_loop(self._schedule, timer)
+        print(f"[Alarmas] '{name}' iniciado: {minutes} min")
+
+    def cancel_timer(self, name):
+        self._in_loop(self._cancel, name)
+
+    def get_remaining_seconds(self, name=DEFAULT_TIMER):
+        """Segundos restantes (0 si no existe o ya venció)."""
+        timer = self.timers.get(name)
+        if timer is None or timer.fired: return 0
+        return max(0, math.ceil(timer.deadline - self.loop.time()))
+
+    def active_timers(self):
+        """{nombre: segundos restantes} de los temporizadores vivos."""
+        return {name: self.get_remaining_seconds(name) for name, t in self.timers.items() if not t.fired}
+
+    # --- REGLAS DE ALARMA (por muestra, hilo del loop) ---
+    def configure_rules(self, spec):
+        """Reemplaza y guarda las reglas (ValueError si la especificación es inválida)."""
+        self.rules.configure(spec)
+        self.page.client_storage.set("alarm_rules", spec)
+
+    def process_sample(self, t, temp, sp=None, rate=None, source=DEFAULT_SOURCE):
+        self.rules.process(t, temp, sp, rate, source)
+
+    def check_timeouts(self, t):
+        self.rules.check_timeouts(t)
+
+    def _on_rule_event(self, rule, active):
+        if active:
+            print(f"[Alarmas] ACTIVA: {rule.message}")
+            self.esp.send_buzzer(True)
+            if self.on_rule: self.on_rule(rule.message)
+        else:
+            print(f"[Alarmas] Normalizada: {rule.name}")
+            self._release_buzzer()
+
+    def _release_buzzer(self):
+        """El buzzer se apaga cuando no queda ninguna regla ni temporizador sonando."""
+        if not self.rules.active_alarms() and not any(t.fired for t in self.timers.values()):
+            self.esp.send_buzzer(False)
+
+    # --- SUSCRIPCIÓN (empuje del tiempo restante) ---
+    def subscribe(self, callback):
+        """callback(nombre, segundos_restantes, vencido) en el hilo del loop."""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _notify(self, name, remaining, fired):
+        for callback in list(self.listeners):
+            try:
+                callback(name, remaining, fired)
+            except Exception as e:
+                print(f"[Alarmas] Error en suscriptor: {e}")
+
+    # --- LOOP (solo en el hilo del event loop) ---
+    def _schedule(self, timer):
+        self._cancel(timer.name, notify=False)
+        self.timers[timer.name] = timer
+        timer.fire_handle = self.loop.call_at(timer.deadline, self._fire, timer)
+        self._tick(timer)
+
+    def _tick(self, timer):
+        """Empuja el tiempo restante y agenda el próximo cambio de segundo."""
+        if timer.fired or self.timers.get(timer.name) is not timer: return
+        self._notify(timer.name, self.get_remaining_seconds(timer.name), False)
+        remaining = timer.deadline - self.loop.time()
+        if remaining > 1.0:
+            # Próximo borde de segundo entero respecto del plazo
+            next_at = timer.deadline - (math.ceil(remaining) - 1)
+            timer.tick_handle = self.loop.call_at(next_at, self._tick, timer)
+
+    def _fire(self, timer):
+        if timer.fired or self.timers.get(timer.name) is not timer: return
+        timer.fired = True
+        if timer.tick_handle: timer.tick_handle.cancel()
+
+        # ¡TIEMPO CUMPLIDO!
+        print(f"[Alarmas] '{timer.name}' finalizado. Enviando señal Buzzer...")
+        self.esp.send_buzzer(True)
+        self._notify(timer.name, 0, True)
+
+        # Notificar a la interfaz (TopBar)
+        if self.on_trigger:
+            self.on_trigger(timer.name)
+
+    def _stop(self, name):
+        self._cancel(name)
+        self._release_buzzer()
+
+    def _cancel(self, name, notify=True):
+        timer = self.timers.pop(name, None)
+        if timer is None: return
+        for handle in (timer.fire_handle, timer.tick_handle):
+            if handle: handle.cancel()
+        timer.fired = True
+        if notify: self._notify(name, 0, False)
@@ -0,0 +1,172 @@
+# src/core/alarm_rules.py
+"""
+Reglas de alarma declarativas sobre el flujo de telemetría.
+
+Especificación de texto (como la cadena de filtros), separada por comas:
+    [fuente/]tipo:límite[:histéresis[:retardo_s]]
+
+    high:78        temperatura > 78 °C
+    low:20         temperatura < 20 °C
+    dev:5          |temperatura - SP| > 5 °C
+    rate:3         |pendiente| > 3 °C/min (derivada del TelemetryPipeline)
+    nodata:10      más de 10 s sin muestras
+
+- Histéresis: la alarma activa se normaliza recién al volver 'histéresis'
+  dentro del límite (evita el parpadeo en el borde).
+- Retardo (debounce): la condición debe sostenerse 'retardo' s seguidos.
+- 'fuente' permite reglas por horno; sin prefijo aplica a DEFAULT_SOURCE.
+
+Cada regla guarda su estado (activa, desde cuándo está pendiente): evaluarla
+es O(1) por muestra, y cada muestra solo recorre las reglas de su fuente.
+"""
+
+DEFAULT_SOURCE = "horno"
+DEFAULT_ALARM_RULES = "high:80:1:2,nodata:10"
+DEFAULT_HYSTERESIS = 1.0
+DEFAULT_DELAY = 2.0
+
+# tipo -> (sentido, descripción, unidad); sentido +1 dispara por arriba, -1 por abajo
+RULE_KINDS = {
+    "high":   (1, "Temperatura alta", "°C"),
+    "low":    (-1, "Temperatura baja", "°C"),
+    "dev":    (1, "Desvío del SP", "°C"),
+    "rate":   (1, "Pendiente excesiva", "°C/min"),
+    "nodata": (1, "Sin datos", "s"),
+}
+
+
+class AlarmRule:
+    __slots__ = ("name", "source", "kind", "limit", "hysteresis", "delay",
+                 "sign", "active", "pending_since", "value")
+
+    def __init__(self, kind, limit, hysteresis=DEFAULT_HYSTERESIS, delay=DEFAULT_DELAY,
+                 source=DEFAULT_SOURCE, name=None):
+        if kind not in RULE_KINDS: raise ValueError(f"Tipo de regla desconocido: {kind}")
+        if hysteresis < 0 or delay < 0: raise ValueError("Histéresis y retardo deben ser >= 0")
+        self.kind = kind
+        self.limit = float(limit)
+        self.hysteresis = float(hysteresis)
+        self.delay = float(delay)
+        self.source = source
+        self.name = name or f"{kind}:{limit:g}"
+        self.sign = RULE_KINDS[kind][0]
+        self.reset()
+
+    def reset(self):
+        self.active = False
+        self.pending_since = None
+        self.value = None
+
+    def evaluate(self, t, x):
+        """
+        Actualiza con el valor x (en la unidad de la regla) en el instante t.
+        Retorna True al activarse, False al normalizarse, None sin cambios.
+        """
+        self.value = x
+        excess = self.sign * (x - self.limit)
+        if self.active:
+            if excess < -self.hysteresis:
+                self.active = False
+                return False
+            return None
+
+        if excess > 0:
+            if self.pending_since is None: self.pending_since = t
+            if t - self.pending_since >= self.delay:
+                self.active = True
+                self.pending_since = None
+                return True
+        else:
+            self.pending_since = None
+        return None
+
+    @property
+    def message(self):
+        label, unit = RULE_KINDS[self.kind][1], RULE_KINDS[self.kind][2]
+        prefix = f"{self.source}: " if self.source != DEFAULT_SOURCE else ""
+        op = ">" if self.sign > 0 else "<"
+        return f"{prefix}{label} {self.value:.1f}{unit} {op} {self.limit:g}{unit}"
+
+
+def parse_rules(spec):
+    """Lista de AlarmRule desde la especificación de texto (ValueError si es inválida)."""
+    rules = []
+    for item in filter(None, (s.strip() for s in (spec or "").split(","))):
+        source, _, body = item.rpartition("/")
+        kind, *args = body.split(":")
+        kind = kind.strip().lower()
+        if not args or len(args) > 3:
+            raise ValueError(f"Regla inválida: {item}")
+        try:
+            values = [float(a) for a in args]
+        except ValueError:
+            raise ValueError(f"Parámetros inválidos: {item}")
+        if kind == "nodata":
+            values[1:2] = [0.0]     # Sin histéresis: cualquier muestra la normaliza
+        rules.append(AlarmRule(kind, *values, source=source.strip() or DEFAULT_SOURCE, name=item))
+    return rules
+
+
+class AlarmRuleEngine:
+    """
+    Evalúa reglas por muestra. on_event(regla, activa) se llama solo en las
+    transiciones (activación / normalización).
+    """
+
+    def __init__(self, spec=DEFAULT_ALARM_RULES, on_event=None):
+        self.on_event = on_event
+        self.configure(spec)
+
+    def configure(self, spec):
+        """
+        Reemplaza las reglas (ValueError si la especificación es inválida).
+        Las alarmas activas de las reglas viejas se normalizan antes del
+        cambio: sin ese evento nadie apagaría el buzzer.
+        """
+        rules = parse_rules(spec)
+        for rule in getattr(self, "rules", ()):
+            if rule.active:
+                rule.reset()
+                self._emit(rule, False)
+        self.spec = spec
+        self.rules = rules
+        # Índices por fuente: una muestra solo toca las reglas de su horno
+        self.sample_rules = {}
+        self.nodata_rules = {}
+        for rule in rules:
+            index = self.nodata_rules if rule.kind == "nodata" else self.sample_rules
+            index.setdefault(rule.source, []).append(rule)
+        self.last_seen = {}
+
+    def process(self, t, temp, sp=None, rate=None, source=DEFAULT_SOURCE):
+        """Una muestra de telemetría ('rate' en °C/s, como la del TelemetryPipeline)."""
+        self.last_seen[source] = t
+        for rule in self.nodata_rules.get(source, ()):
+            self._emit(rule, rule.evaluate(t, 0.0))
+
+        for rule in self.sample_rules.get(source, ()):
+            kind = rule.kind
+            if kind == "high" or kind == "low":
+                x = temp
+            elif kind == "dev":
+                if sp is None: continue
+                x = abs(temp - sp)
+            else:  # rate
+                if rate is None: continue
+                x = abs(rate) * 60.0
+            self._emit(rule, rule.evaluate(t, x))
+
+    def check_timeouts(self, t):
+        """Reglas 'sin datos': llamar periódicamente (también sin telemetría)."""
+        for source, rules in self.nodata_rules.items():
+            last = self.last_seen.get(source)
+            if last is None: continue   # Aún no hubo ninguna muestra de esta fuente
+            for rule in rules:
+                self._emit(rule, rule.evaluate(t, t - last))
+
+    def active_alarms(self):
+        return [rule for rule in self.rules if rule.active]
+
+    def _emit(self, rule, change):
+        if change is not None and self.on_event:
+            self.on_event(rule, change)
@@ -1,64 +1,80 @@
 # src/core/data_store.py
-import flet as ft
+from array import array
+from bisect import bisect_left, bisect_right
 
 class DataStore:
     def __init__(self):
-        # --- CAPA VISUAL (Flet Objects) ---
-        # Mantenemos esta lista corta para que la gráfica no se trabe
-        self.data_temp = [] 
-        self.data_sp = []
-        
-        # --- NUEVO: Variable para guardar la última potencia recibida ---
+        # --- CAPA HISTÓRICA (Columnas numéricas crudas) ---
+        # Guardamos todo aquí para exportar a Excel/CSV y para la gráfica.
+        # array('d') ocupa 8 bytes por muestra: mucho menos que objetos Flet.
+        # Los puntos de la gráfica los materializa ChartSeries solo para la
+        # ventana visible (ver src/utils/chart_series.py).
+        self.time_data = array('d')
+        self.temp_data = array('d')
+        self.sp_data = array('d')
+        self.power_data = array('d')
+        # Temperatura cruda del termopar (temp_data guarda la filtrada)
+        self.raw_temp_data = array('d')
+
+        # --- Variable para guardar la última potencia recibida ---
         self.last_power = 0
-        
-        # --- CAPA HISTÓRICA (Raw Data) ---
-        # Guardamos todo aquí para exportar a Excel/CSV.
-        # Usamos tuplas simples (x, y) que consumen menos RAM que objetos Flet
-        self.full_temp_history = [] 
-        self.full_sp_history = []
-        
+        # Pendiente filtrada (°C/s, derivada Savitzky–Golay) o None
+        self.last_rate = None
+
         # Referencia de tiempo
         self.start_time = None
 
-    def add_data(self, elapsed_time, temp, sp, power=0): # <--- Añadido argumento power
+    def add_data(self, elapsed_time, temp, sp, power=0, raw_temp=None, rate=None):
         """
-        Agrega datos dividiéndolos en capa visual y capa histórica.
+        Agrega una muestra a las columnas del historial.
+        temp es la temperatura filtrada; raw_temp la cruda (por defecto igual).
         """
         # Actualizamos la potencia actual para que el Dashboard la lea
         self.last_power = power
+        self.last_rate = rate
+        self.raw_temp_data.append(temp if raw_temp is None else raw_temp)
+
+        self.time_data.append(elapsed_time)
+        self.temp_data.append(temp)
+        self.sp_data.append(sp)
+        self.power_data.append(power)
 
-        # 1. Guardar en Historial Completo (Sin límite, o límite muy alto)
-        self.full_temp_history.append((elapsed_time, temp))
-        self.full_sp_history.append((elapsed_time, sp))
+    def __len__(self):
+        return len(self.time_data)
 
-        # 2. Guardar en Capa Visual (Sliding Window / Ventana Deslizante)
-        # Límite de puntos visibles simultáneamente. 
-        # 300 puntos a 0.5s/sample = 2.5 minutos de alta resolución en pantalla.
-        # Si la gráfica es de 60s, esto sobra y basta, manteniendo la UI fluida.
-        MAX_UI_POINTS = 300 
+    # --- ÍNDICE POR RANGO DE TIEMPO ---
+    # time_data es creciente: búsqueda binaria, O(log n) sin índices auxiliares.
+    def index_range(self, t0=None, t1=None):
+        """(i0, i1) tal que time_data[i0:i1] cae dentro de [t0, t1] (None = sin límite)."""
+        i0 = 0 if t0 is None else bisect_left(self.time_data, t0)
+        i1 = len(self.time_data) if t1 is None else bisect_right(self.time_data, t1)
+        return i0, max(i0, i1)
 
-        self.data_temp.append(ft.LineChartDataPoint(x=elapsed_time, y=temp))
-        self.data_sp.append(ft.LineChartDataPoint(x=elapsed_time, y=sp))
-        
-        # Algoritmo Anti-Lag: Si excedemos el límite visual, borramos los más viejos
-        # de la lista visual (pero quedan guardados en full_history).
-        if len(self.data_temp) > MAX_UI_POINTS:
-            self.data_temp.pop(0)
-            self.data_sp.pop(0)
+    def snapshot(self, t0=None, t1=None):
+        """
+        Copia (tiempo, temperatura, setpoint, potencia) del rango pedido.
+        Copiar un slice de array es un memcpy: se hace en el hilo del bucle y
+        el análisis pesado trabaja sobre la copia (las columnas siguen creciendo).
+        """
+        i0, i1 = self.index_range(t0, t1)
+        return (self.time_data[i0:i1], self.temp_data[i0:i1],
+                self.sp_data[i0:i1], self.power_data[i0:i1])
 
     def get_export_data(self):
         """
-        Retorna las listas completas para generar el CSV.
+        Retorna las columnas completas (tiempo, temperatura, setpoint, cruda) para el CSV.
         """
-        return self.full_temp_history, self.full_sp_history
+        return self.time_data, self.temp_data, self.sp_data, self.raw_temp_data
 
     def clear_data(self):
         """Borra todo y reinicia el contador de tiempo"""
-        self.data_temp.clear()
-        self.data_sp.clear()
-        
-        self.full_temp_history.clear()
-        self.full_sp_history.clear()
-        
+        # array no tiene clear(): vaciamos por slice (conserva la referencia)
+        del self.time_data[:]
+        del self.temp_data[:]
+        del self.sp_data[:]
+        del self.power_data[:]
+        del self.raw_temp_data[:]
+
         self.start_time = None # Resetear tiempo
-        self.last_power = 0    # Resetear potencia
\ No newline at end of file
+        self.last_power = 0    # Resetear potencia
+        self.last_rate = None
@@ -28,6 +28,10 @@ class ESP32Interface:
         self.auto_reconnect = True
         self.last_known_ip = None
         self.last_known_port = 80
+
+        # Capacidades del firmware (campo 'caps' del ESTADO, p.ej. caps=M)
+        self.manual_power_supported = False
+        self.regex_caps = re.compile(r"caps=([A-Za-z]+)")
         
         # REGEX: temp=25.00,setpoint=50.0,dimmer=128,...
         self.regex_status = re.compile(
@@ -104,6 +108,7 @@ class ESP32Interface:
         with self.lock:
             self.connected = False
             self.mode = "NONE"
+            self.manual_power_supported = False   # Otro equipo puede tener otro firmware
             
             if self.serial_conn:
                 try: self.serial_conn.close()
@@ -178,10 +183,22 @@ class ESP32Interface:
         return self._send_raw(cmd)
 
     def send_manual_power(self, power_percent):
-        """Para pruebas manuales si fuera necesario (no usado en PID normal)"""
-        # Tu firmware actual usa el PID, pero si implementas modo manual:
-        # return self._send_raw(f"M{power_percent}")
-        pass
+        """
+        Potencia manual (Comando M, 0-100%). Solo tiene efecto con el modo
+        Auto-Tune/Manual activo (send_auto_tune_cmd(True)); lo usan el relé y
+        la secuencia multi-punto.
+
+        REQUIERE FIRMWARE: el firmware base NO implementa 'M' (en modo E aplica
+        potencia fija), así que el relé sería un escalón sin control. El
+        firmware debe aceptar "M<0-100>" en modo E y anunciarlo agregando
+        ",caps=M" a la línea ESTADO. Sin ese anuncio no se envía nada y se
+        retorna False.
+        """
+        if not self.manual_power_supported:
+            print("[ESP32] Potencia manual no soportada por el firmware (falta caps=M).")
+            return False
+        power = max(0.0, min(100.0, float(power_percent)))
+        return self._send_raw(f"M{power:.0f}")
 
     # --- 4. TELEMETRÍA (LECTURA) ---
     def read_telemetry(self):
@@ -215,6 +232,9 @@ class ESP32Interface:
                     
                     # Convertir a % para la UI
                     out_percent = (raw_dimmer / 255.0) * 100.0
+
+                    caps = self.regex_caps.search(response_line)
+                    self.manual_power_supported = bool(caps and "M" in caps.group(1).upper())
                     
                     return {
                         'temp': temp,
@@ -0,0 +1,149 @@
+# src/core/filters.py
+"""
+Filtros de telemetría en flujo (una muestra a la vez).
+
+Cada filtro guarda su estado en buffers de tamaño fijo y cuesta O(1)
+(EMA) u O(ventana) por muestra (mediana, Hampel, derivada SG). Se encadenan
+con una especificación de texto, p.ej. "hampel:7:3,median:5,ema:0.5":
+
+- ema:alpha            Media móvil exponencial.
+- median:n             Mediana de las últimas n muestras.
+- hampel:n:k           Rechazo de atípicos: si |x - mediana| > k * 1.4826 * MAD
+                       la muestra se reemplaza por la mediana.
+La derivada (Savitzky–Golay) va aparte: TelemetryPipeline la calcula sobre
+la señal ya filtrada.
+"""
+from bisect import insort, bisect_left
+from collections import deque
+import numpy as np
+
+DEFAULT_FILTER_CHAIN = "hampel:7:3,ema:0.5"
+
+
+# --- 1. FILTROS ---
+class EMAFilter:
+    def __init__(self, alpha=0.5):
+        if not 0.0 < alpha <= 1.0: raise ValueError("alpha debe estar en (0, 1]")
+        self.alpha = alpha
+        self.value = None
+
+    def __call__(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class _SortedWindow:
+    """Ventana deslizante que mantiene además una copia ordenada (inserción/borrado O(n))."""
+
+    def __init__(self, size):
+        if size < 1: raise ValueError("la ventana debe tener al menos 1 muestra")
+        self.fifo = deque(maxlen=size)
+        self.ordered = []
+
+    def push(self, x):
+        if len(self.fifo) == self.fifo.maxlen:
+            del self.ordered[bisect_left(self.ordered, self.fifo[0])]
+        self.fifo.append(x)
+        insort(self.ordered, x)
+
+    @property
+    def median(self):
+        o, n = self.ordered, len(self.ordered)
+        return o[n // 2] if n % 2 else 0.5 * (o[n // 2 - 1] + o[n // 2])
+
+
+class MedianFilter:
+    def __init__(self, size=5):
+        self.window = _SortedWindow(int(size))
+
+    def __call__(self, x):
+        self.window.push(x)
+        return self.window.median
+
+
+class HampelFilter:
+    def __init__(self, size=7, n_sigmas=3.0):
+        self.window = _SortedWindow(int(size))
+        self.n_sigmas = float(n_sigmas)
+
+    def __call__(self, x):
+        # La ventana guarda siempre el dato crudo: reemplazar por la mediana
+        # colapsaría el MAD y rechazaría muestras legítimas en cascada.
+        w = self.window
+        w.push(x)
+        if len(w.fifo) < 3: return x
+        med = w.median
+        mad = sorted(abs(v - med) for v in w.fifo)[len(w.fifo) // 2]
+        if mad > 0 and abs(x - med) > self.n_sigmas * 1.4826 * mad:
+            return med
+        return x
+
+
+FILTER_TYPES = {"ema": EMAFilter, "median": MedianFilter, "hampel": HampelFilter}
+
+
+# --- 2. DERIVADA ---
+class SavitzkyGolayDerivative:
+    """
+    Pendiente (unidades/s) por ajuste polinómico de grado 'order' sobre las
+    últimas 'size' muestras, evaluada en la muestra MÁS RECIENTE (causal, sin
+    retraso). Los coeficientes se precalculan una vez; cada muestra es un
+    producto escalar O(ventana). Asume muestreo aproximadamente uniforme.
+    """
+
+    def __init__(self, size=9, order=2):
+        if size <= order: raise ValueError("la ventana debe superar el grado")
+        k = np.arange(size) - (size - 1)          # ..., -2, -1, 0 (0 = última muestra)
+        V = np.vander(k, order + 1, increasing=True)
+        self.coeffs = np.linalg.pinv(V)[1].tolist()   # fila de la derivada en k = 0
+        self.values = deque(maxlen=size)
+        self.times = deque(maxlen=size)
+
+    def __call__(self, t, x):
+        self.values.append(x)
+        self.times.append(t)
+        n = len(self.values)
+        if n < len(self.coeffs): return None
+        dt = (self.times[-1] - self.times[0]) / (n - 1)
+        if dt <= 0: return None
+        return sum(c * v for c, v in zip(self.coeffs, self.values)) / dt
+
+
+# --- 3. CADENA ---
+def build_filter_chain(spec):
+    """Construye la lista de filtros desde la especificación de texto (ValueError si es inválida)."""
+    chain = []
+    for item in filter(None, (s.strip() for s in (spec or "").split(","))):
+        name, *args = item.split(":")
+        cls = FILTER_TYPES.get(name.strip().lower())
+        if cls is None: raise ValueError(f"Filtro desconocido: {name}")
+        try:
+            chain.append(cls(*(float(a) for a in args)))
+        except TypeError:
+            raise ValueError(f"Parámetros inválidos: {item}")
+    return chain
+
+
+class TelemetryPipeline:
+    """
+    Se ubica entre read_telemetry() y los consumidores (DataStore, Tuner).
+    process() retorna (temperatura filtrada, pendiente °C/s o None).
+    """
+
+    def __init__(self, spec=DEFAULT_FILTER_CHAIN, derivative_size=9):
+        self.derivative_size = derivative_size
+        self.configure(spec)
+
+    def configure(self, spec):
+        """Reemplaza la cadena (el estado de los filtros se reinicia)."""
+        self.chain = build_filter_chain(spec)
+        self.spec = spec
+        self.derivative = SavitzkyGolayDerivative(self.derivative_size)
+        self.last_rate = None
+
+    def process(self, t, temp):
+        value = temp
+        for f in self.chain:
+            value = f(value)
+        self.last_rate = self.derivative(t, value)
+        return value, self.last_rate
@@ -0,0 +1,87 @@
+# src/core/frequency.py
+"""
+Respuesta en frecuencia y márgenes de estabilidad del lazo FOPDT + PID.
+
+    G(jw) = K * exp(-jw*theta) / (jw*tau + 1)
+    C(jw) = kp + ki/(jw) + kd*jw
+    L(jw) = C(jw) * G(jw)
+
+L se evalúa en una grilla logarítmica como UNA operación NumPy vectorizada;
+los cruces se interpolan entre puntos de la grilla. Sirve para saber qué tan
+cerca de la inestabilidad está un juego de ganancias (el horno es estable en
+lazo abierto, así que MG > 0 dB y MF > 0° implican lazo cerrado estable).
+"""
+import numpy as np
+
+GRID_POINTS = 2000
+
+
+def frequency_grid(model, n=GRID_POINTS):
+    """Grilla logarítmica que cubre desde mucho antes de 1/tau hasta bien pasado 1/theta."""
+    tau = max(model['tau'], 1e-3)
+    fast = max(min(model['theta'], tau), tau / 100.0, 1e-3)
+    return np.logspace(np.log10(1e-3 / tau), np.log10(100.0 / fast), n)
+
+
+def loop_response(model, kp, ki, kd, w):
+    """L(jw) compleja sobre la grilla w."""
+    jw = 1j * w
+    G = model['Kp'] * np.exp(-jw * model['theta']) / (jw * model['tau'] + 1.0)
+    C = kp + ki / jw + kd * jw
+    return C * G
+
+
+def _crossings(x, y, level):
+    """Abscisas (interpoladas en log) donde y cruza 'level'."""
+    s = np.sign(y - level)
+    idx = np.nonzero(s[:-1] * s[1:] < 0)[0]
+    if idx.size == 0: return np.empty(0), idx
+    lx0, lx1 = np.log10(x[idx]), np.log10(x[idx + 1])
+    frac = (level - y[idx]) / (y[idx + 1] - y[idx])
+    return 10 ** (lx0 + frac * (lx1 - lx0)), idx
+
+
+def stability_margins(model, kp, ki, kd, n=GRID_POINTS):
+    """
+    Retorna {"gm_db", "wpc", "pm_deg", "wgc", "ms", "stable", "bode", "nyquist"}.
+    - gm_db / wpc: margen de ganancia y frecuencia de cruce de fase (-180°).
+    - pm_deg / wgc: margen de fase y frecuencia de cruce de ganancia (|L| = 1).
+    - ms: sensibilidad máxima max|1/(1+L)| (robustez; < 2 es razonable).
+    Con varios cruces se reporta el peor margen. None si no hay cruce.
+    """
+    w = frequency_grid(model, n)
+    L = loop_response(model, kp, ki, kd, w)
+    mag_db = 20.0 * np.log10(np.maximum(np.abs(L), 1e-300))
+    phase_deg = np.degrees(np.unwrap(np.angle(L)))
+
+    # Cruce de ganancia -> margen de fase
+    wgc, idx = _crossings(w, mag_db, 0.0)
+    pm = wgc_best = None
+    if wgc.size:
+        ph = np.interp(np.log10(wgc), np.log10(w), phase_deg)
+        # Margen respecto del -180° más cercano (fase desenrollada)
+        margins = ((ph + 180.0) + 180.0) % 360.0 - 180.0
+        k = int(np.argmin(margins))
+        pm, wgc_best = float(margins[k]), float(wgc[k])
+
+    # Cruces de fase por -180° (+ k*360°) -> margen de ganancia
+    wrapped = (phase_deg + 180.0) % 360.0 - 180.0
+    jumps = np.abs(np.diff(wrapped)) > 180.0
+    s = np.sign(wrapped)
+    idx = np.nonzero((s[:-1] * s[1:] < 0) & jumps)[0]
+    gm = wpc_best = None
+    if idx.size:
+        gms = -(mag_db[idx] + mag_db[idx + 1]) / 2.0
+        k = int(np.argmin(gms))
+        gm, wpc_best = float(gms[k]), float(np.sqrt(w[idx[k]] * w[idx[k] + 1]))
+
+    ms = float(np.max(1.0 / np.abs(1.0 + L)))
+    stable = (gm is None or gm > 0) and (pm is None or pm > 0)
+
+    return {
+        "gm_db": gm, "wpc": wpc_best,
+        "pm_deg": pm, "wgc": wgc_best,
+        "ms": ms, "stable": stable,
+        "bode": {"w": w, "mag_db": mag_db, "phase_deg": phase_deg},
+        "nyquist": {"re": L.real, "im": L.imag},
+    }
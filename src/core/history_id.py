@@ -0,0 +1,178 @@
+# src/core/history_id.py
+"""
+Identificación en lazo cerrado a partir del historial del DataStore.
+
+Cada cambio de setpoint y cada tramo con el dimmer saturado es una excitación
+gratuita. Aquí se recorre el historial (arreglos NumPy, detección de eventos
+vectorizada), se recorta un segmento por evento y se ajusta un FOPDT por
+mínimos cuadrados en forma integral:
+
+    y(t) - y(t0) = -1/tau * ∫y + K/tau * ∫u(t-theta) + amb/tau * (t - t0)
+
+Es lineal en los parámetros como un ARX, pero los regresores integrados
+promedian el ruido del termopar (el ARX de ecuación de error, con muestreo
+rápido frente a tau, queda muy sesgado). Los mínimos cuadrados de TODOS los
+retardos candidatos se resuelven a la vez (ecuaciones normales 3x3
+apiladas). El modelo se valida simulándolo en lazo abierto con la potencia
+medida. Los modelos aceptados se acumulan entre sesiones y se resumen con la
+mediana.
+"""
+import math
+import numpy as np
+
+RESAMPLE_DT = 1.0        # s, grilla uniforme del ajuste
+MIN_SP_STEP = 1.0        # °C, salto mínimo de SP considerado excitación
+SAT_LEVEL = 99.5         # % potencia considerada saturación
+MERGE_S = 30.0           # Eventos más cercanos que esto son la misma excitación
+PRE_ROLL_S = 30.0        # Historia previa al evento (estado inicial y retardo)
+MIN_SEGMENT_S = 120.0
+MAX_SEGMENT_S = 1800.0
+MAX_GAP_S = 5.0          # Hueco de muestreo que corta segmentos (reconexión)
+MAX_DELAY_S = 60.0
+MIN_INPUT_SPAN = 5.0     # % de variación mínima de potencia en el segmento
+MIN_R2 = 0.9
+HISTORY_LIMIT = 500      # Modelos guardados entre sesiones
+
+
+# --- 1. DETECCIÓN DE SEGMENTOS ---
+def find_segments(t, sp, power):
+    """
+    Segmentos excitados del historial como lista de (i0, i_evento, i1, tipo),
+    con tipo "sp" (escalón de setpoint) o "sat" (entrada en saturación).
+    """
+    if len(t) < 3: return []
+    sp_events = np.flatnonzero(np.abs(np.diff(sp)) >= MIN_SP_STEP) + 1
+    sat = power >= SAT_LEVEL
+    sat_events = np.flatnonzero(sat[1:] & ~sat[:-1]) + 1
+    gaps = np.flatnonzero(np.diff(t) > MAX_GAP_S) + 1
+
+    events = np.concatenate((sp_events, sat_events))
+    kinds = np.concatenate((np.zeros(sp_events.size, bool), np.ones(sat_events.size, bool)))
+    order = np.lexsort((kinds, events))       # A igual índice, "sp" primero
+    events, kinds = events[order], kinds[order]
+    if events.size == 0: return []
+
+    # Un escalón de SP suele saturar el dimmer enseguida: es UNA excitación
+    keep = np.ones(events.size, bool)
+    keep[1:] = np.diff(t[events]) > MERGE_S
+    events, kinds = events[keep], kinds[keep]
+
+    # Límites: siguiente evento, siguiente hueco o MAX_SEGMENT_S
+    boundaries = np.union1d(events, gaps)
+    nxt = boundaries[np.minimum(np.searchsorted(boundaries, events, side="right"), boundaries.size - 1)]
+    nxt = np.where(nxt > events, nxt, len(t))
+    limit = np.searchsorted(t, t[events] + MAX_SEGMENT_S, side="right")
+    ends = np.minimum(nxt, limit)
+
+    prev = boundaries[np.maximum(np.searchsorted(boundaries, events, side="left") - 1, 0)]
+    prev = np.where(prev < events, prev, 0)
+    starts = np.maximum(np.searchsorted(t, t[events] - PRE_ROLL_S, side="left"), prev)
+
+    long_enough = t[ends - 1] - t[events] >= MIN_SEGMENT_S
+    return [(int(a), int(e), int(b), "sat" if k else "sp")
+            for a, e, b, k, ok in zip(starts, events, ends, kinds, long_enough) if ok]
+
+
+# --- 2. AJUSTE INTEGRAL (todos los retardos a la vez) ---
+def _simulate(K, tau, theta_steps, ambient, y0, u, dt):
+    """Respuesta en lazo abierto (ZOH exacta) desde y0 con la potencia medida."""
+    a = math.exp(-dt / tau)
+    b, c = K * (1.0 - a), ambient * (1.0 - a)
+    y = np.empty(u.size)
+    y[0] = y0
+    for k in range(u.size - 1):
+        y[k + 1] = a * y[k] + b * u[max(k - theta_steps, 0)] + c
+    return y
+
+
+def fit_segment(t, y, u, dt=RESAMPLE_DT, max_delay=MAX_DELAY_S):
+    """Modelo {"Kp", "tau", "theta", "r2"} del segmento, o None si no es identificable."""
+    grid = np.arange(t[0], t[-1], dt)
+    D = int(max_delay / dt)
+    if grid.size < D + 30: return None
+    y = np.interp(grid, t, y)
+    u = u[np.maximum(np.searchsorted(t, grid, side="right") - 1, 0)]   # La potencia es escalonada (ZOH)
+    if np.ptp(u[D:]) < MIN_INPUT_SPAN: return None
+
+    # Regresores integrados desde k = D (el ruido se promedia en la integral):
+    #   y - y_D = -1/tau * ∫y + K/tau * ∫u(t-theta) + amb/tau * t
+    k = np.arange(D, grid.size)
+    z = y[k] - y[D]
+    Iy = np.concatenate(([0.0], np.cumsum((y[k][1:] + y[k][:-1]) * 0.5))) * dt
+    tt = (k - D) * dt
+    U = u[k[None, :] - 1 - np.arange(D + 1)[:, None]]        # (D+1, n): u[k-1-d] (ZOH)
+    Iu = np.cumsum(U, axis=1) * dt
+    Iu -= Iu[:, :1]
+
+    # Ecuaciones normales 3x3 apiladas, una por retardo
+    n_d = D + 1
+    A = np.empty((n_d, 3, 3))
+    A[:, 0, 0], A[:, 0, 1], A[:, 0, 2] = Iy @ Iy, Iu @ Iy, Iy @ tt
+    A[:, 1, 0], A[:, 1, 1], A[:, 1, 2] = A[:, 0, 1], np.einsum("dk,dk->d", Iu, Iu), Iu @ tt
+    A[:, 2, 0], A[:, 2, 1], A[:, 2, 2] = A[:, 0, 2], A[:, 1, 2], tt @ tt
+    rhs = np.stack((np.full(n_d, Iy @ z), Iu @ z, np.full(n_d, tt @ z)), axis=1)
+    try:
+        p = np.linalg.solve(A, rhs[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return None
+    sse = z @ z - 2.0 * (p * rhs).sum(1) + np.einsum("di,dij,dj->d", p, A, p)
+
+    d = int(np.argmin(sse))
+    alpha, beta, gamma = p[d]
+    if alpha >= 0.0 or beta <= 0.0: return None
+    tau = -1.0 / alpha
+    K, ambient = beta * tau, gamma * tau
+
+    sim = _simulate(K, tau, d, ambient, y[D], u[D - 1:], dt)[1:]
+    ref = y[D:]
+    sst = float(((ref - ref.mean()) ** 2).sum())
+    r2 = 1.0 - float(((ref - sim) ** 2).sum()) / sst if sst > 0 else 0.0
+    if r2 < MIN_R2: return None
+
+    return {
+        "Kp": round(float(K), 4),
+        "tau": round(float(tau), 2),
+        "theta": round(d * dt, 2),
+        "r2": round(r2, 4),
+    }
+
+
+# --- 3. ANÁLISIS DEL HISTORIAL ---
+def analyze_history(time_data, temp_data, sp_data, power_data, epoch0=0.0):
+    """
+    Identifica un modelo por segmento excitado. 'epoch0' es la hora (epoch)
+    de time_data[0] == 0, para reconocer el mismo segmento entre sesiones.
+    Retorna una lista de {"start", "kind", "temp", "Kp", "tau", "theta", "r2"}.
+    """
+    t = np.asarray(time_data, dtype=float)
+    y = np.asarray(temp_data, dtype=float)
+    sp = np.asarray(sp_data, dtype=float)
+    u = np.asarray(power_data, dtype=float)
+
+    models = []
+    for i0, ie, i1, kind in find_segments(t, sp, u):
+        model = fit_segment(t[i0:i1], y[i0:i1], u[i0:i1])
+        if model:
+            model.update(start=round(float(epoch0 + t[ie]), 1), kind=kind, temp=round(float(y[ie:i1].mean()), 1))
+            models.append(model)
+    return models
+
+
+def merge_models(stored, new, limit=HISTORY_LIMIT):
+    """Une los modelos de sesiones previas con los nuevos (sin duplicar segmentos)."""
+    by_start = {m["start"]: m for m in stored or []}
+    by_start.update((m["start"], m) for m in new)
+    return sorted(by_start.values(), key=lambda m: m["start"])[-limit:]
+
+
+def aggregate_models(models, temp=None, band=10.0):
+    """
+    Mediana de K, tau y theta (robusta a segmentos malos). Con 'temp' solo
+    usa segmentos a ±band °C de esa temperatura. None si no hay modelos.
+    """
+    if temp is not None:
+        models = [m for m in models if abs(m["temp"] - temp) <= band]
+    if not models: return None
+    arr = np.array([[m["Kp"], m["tau"], m["theta"]] for m in models])
+    med = np.median(arr, axis=0)
+    return {"Kp": float(med[0]), "tau": float(med[1]), "theta": float(med[2]), "count": len(models)}
@@ -0,0 +1,253 @@
+# src/core/identification.py
+"""
+Identificación de modelos FOPDT / SOPDT por mínimos cuadrados sobre TODA la
+respuesta al escalón (vectorizado con NumPy).
+
+Para (theta, tau) fijos el modelo es lineal en la ganancia, así que la
+ganancia óptima y el error cuadrático salen en forma cerrada. La búsqueda
+de theta/tau es una grilla gruesa (sobre datos diezmados) seguida de
+grillas finas alrededor del mejor punto (sobre todas las muestras).
+
+bootstrap_fopdt() estima intervalos de confianza re-ajustando el modelo sobre
+respuestas sintéticas (curva ajustada + residuos remuestreados por bloques).
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+
+COARSE_MAX_SAMPLES = 2000   # Diezmado solo para la etapa gruesa
+REFINE_ROUNDS = 4           # Cada ronda divide el paso a la mitad
+MIN_R2 = 0.5                # Por debajo, el ajuste no explica los datos
+MAX_RATIO = 0.95            # tau2/tau1 (evita la singularidad de polos iguales)
+BOOTSTRAP_REPLICAS = 200
+BOOTSTRAP_MAX_SAMPLES = 2000   # Cada réplica se ajusta sobre datos diezmados
+BOOTSTRAP_ROUNDS = 6           # Refinamiento local desde el ajuste nominal
+BOOTSTRAP_LEVEL = 0.90
+BOOTSTRAP_PROCESS_THRESHOLD = 200000   # Réplicas x muestras a partir de las cuales se usa el pool
+
+
+# --- 1. BASES (respuesta unitaria al escalón) ---
+def _fopdt_basis(t, theta, tau):
+    """Filas: 1 - exp(-(t-theta)/tau) para cada par candidato (theta[i], tau[i])."""
+    s = np.maximum(t[None, :] - theta[:, None], 0.0)
+    return -np.expm1(-s / tau[:, None])
+
+
+def _sopdt_basis(t, theta, tau1, tau2):
+    """Dos polos reales distintos (tau1 > tau2; la razón se limita a < 1)."""
+    s = np.maximum(t[None, :] - theta[:, None], 0.0)
+    t1, t2 = tau1[:, None], tau2[:, None]
+    return 1.0 - (t1 * np.exp(-s / t1) - t2 * np.exp(-s / t2)) / (t1 - t2)
+
+
+def _solve_gains(G, y, yy):
+    """Ganancia LS y SSE por fila de G (modelo y ~ k * g)."""
+    gy = G @ y
+    gg = np.einsum("ij,ij->i", G, G)
+    valid = gg > 1e-12
+    k = np.where(valid, gy / np.where(valid, gg, 1.0), 0.0)
+    sse = np.where(valid, yy - gy * k, np.inf)
+    return k, sse
+
+
+def _decimate(t, y, max_samples):
+    if len(t) <= max_samples:
+        return t, y
+    idx = np.linspace(0, len(t) - 1, max_samples).astype(np.intp)
+    return t[idx], y[idx]
+
+
+def _quality(sse, y):
+    n = len(y)
+    sst = float(np.sum((y - y.mean()) ** 2))
+    rmse = float(np.sqrt(max(sse, 0.0) / n))
+    r2 = 1.0 - sse / sst if sst > 0 else 0.0
+    return rmse, float(r2)
+
+
+# --- 2. FOPDT ---
+def fit_fopdt(time_data, temp_data, base_temp, step_power, start=None, rounds=REFINE_ROUNDS):
+    """
+    Ajusta y = base + K*u*(1 - exp(-(t-theta)/tau)) con todas las muestras.
+    start=(theta, tau): omite la grilla gruesa y refina alrededor de ese punto
+    (réplicas del bootstrap, cuyo óptimo está cerca del ajuste nominal).
+    Retorna dict {"Kp", "tau", "theta", "delta_temp", "rmse", "r2"} o None.
+    """
+    t = np.asarray(time_data, dtype=float)
+    y = np.asarray(temp_data, dtype=float) - base_temp
+    if len(t) < 10 or step_power == 0: return None
+
+    t_end = float(t[-1] - t[0]) or 1.0
+    dt = max(t_end / len(t), 1e-3)
+
+    if start is None:
+        # A) Grilla gruesa (theta lineal, tau logarítmico) sobre datos diezmados
+        tc, yc = _decimate(t, y, COARSE_MAX_SAMPLES)
+        theta_grid = np.linspace(0.0, 0.5 * t_end, 24)
+        tau_grid = np.geomspace(max(dt, 0.5), 10.0 * t_end, 32)
+        th, ta = (g.ravel() for g in np.meshgrid(theta_grid, tau_grid, indexing="ij"))
+        _, sse = _solve_gains(_fopdt_basis(tc, th, ta), yc, float(yc @ yc))
+        best = int(np.argmin(sse))
+        theta, log_tau = th[best], np.log(ta[best])
+        d_theta = theta_grid[1] - theta_grid[0]
+        d_log_tau = np.log(tau_grid[1] / tau_grid[0])
+    else:
+        theta, log_tau = float(start[0]), np.log(max(start[1], 0.5))
+        d_theta = max(0.25 * theta, 4.0 * dt)
+        d_log_tau = np.log(1.25)
+
+    # B) Refinamiento sobre TODAS las muestras
+    yy = float(y @ y)
+    offsets = np.linspace(-1.0, 1.0, 5)
+    for _ in range(rounds):
+        th = np.clip(theta + d_theta * offsets, 0.0, None)
+        lt = log_tau + d_log_tau * offsets
+        th, lt = (g.ravel() for g in np.meshgrid(th, lt, indexing="ij"))
+        k, sse = _solve_gains(_fopdt_basis(t, th, np.exp(lt)), y, yy)
+        best = int(np.argmin(sse))
+        theta, log_tau = th[best], lt[best]
+        d_theta *= 0.5
+        d_log_tau *= 0.5
+
+    gain, tau = float(k[best]), float(np.exp(log_tau))
+    rmse, r2 = _quality(float(sse[best]), y)
+    if gain <= 0 or r2 < MIN_R2: return None
+
+    return {
+        "Kp": round(gain / step_power, 4),
+        "tau": round(max(tau, 1.0), 2),
+        "theta": round(max(float(theta), 0.1), 2),
+        "delta_temp": round(gain, 1),
+        "rmse": round(rmse, 3),
+        "r2": round(r2, 4),
+    }
+
+
+# --- 3. SOPDT ---
+def fit_sopdt(time_data, temp_data, base_temp, step_power, fopdt=None):
+    """
+    Ajusta y = base + K*u*(1 - (tau1*e^(-s/tau1) - tau2*e^(-s/tau2))/(tau1-tau2)).
+    La grilla se siembra con el FOPDT (tau1 + tau2 + theta ~ tau_f + theta_f).
+    Retorna dict {"Kp", "tau1", "tau2", "theta", "rmse", "r2"} o None.
+    """
+    t = np.asarray(time_data, dtype=float)
+    y = np.asarray(temp_data, dtype=float) - base_temp
+    if len(t) < 10 or step_power == 0: return None
+    if fopdt is None:
+        fopdt = fit_fopdt(time_data, temp_data, base_temp, step_power)
+        if fopdt is None: return None
+
+    tau_f, theta_f = fopdt["tau"], fopdt["theta"]
+
+    # A) Grilla gruesa: theta, razón r = tau2/tau1 y escala del tiempo total
+    tc, yc = _decimate(t, y, COARSE_MAX_SAMPLES)
+    theta_grid = np.linspace(0.0, theta_f, 10)
+    ratio_grid = np.linspace(0.05, MAX_RATIO, 8)
+    scale_grid = np.geomspace(0.5, 2.0, 7)
+    th, r, sc = (g.ravel() for g in np.meshgrid(theta_grid, ratio_grid, scale_grid, indexing="ij"))
+    total = np.maximum(sc * (tau_f + theta_f - th), 0.5)
+    t1 = total / (1.0 + r)
+    _, sse = _solve_gains(_sopdt_basis(tc, th, t1, r * t1), yc, float(yc @ yc))
+    best = int(np.argmin(sse))
+    theta, ratio, log_t1 = th[best], r[best], np.log(t1[best])
+
+    # B) Refinamiento sobre TODAS las muestras
+    d_theta = max(theta_grid[1] - theta_grid[0], 0.1)
+    d_ratio = ratio_grid[1] - ratio_grid[0]
+    d_log = np.log(scale_grid[1] / scale_grid[0])
+    yy = float(y @ y)
+    offsets = np.linspace(-1.0, 1.0, 3)
+    for _ in range(REFINE_ROUNDS):
+        th = np.clip(theta + d_theta * offsets, 0.0, None)
+        r = np.clip(ratio + d_ratio * offsets, 0.01, MAX_RATIO)
+        lt = log_t1 + d_log * offsets
+        th, r, lt = (g.ravel() for g in np.meshgrid(th, r, lt, indexing="ij"))
+        t1 = np.exp(lt)
+        k, sse = _solve_gains(_sopdt_basis(t, th, t1, r * t1), y, yy)
+        best = int(np.argmin(sse))
+        theta, ratio, log_t1 = th[best], r[best], lt[best]
+        d_theta *= 0.5
+        d_ratio *= 0.5
+        d_log *= 0.5
+
+    gain, tau1 = float(k[best]), float(np.exp(log_t1))
+    rmse, r2 = _quality(float(sse[best]), y)
+    if gain <= 0 or r2 < MIN_R2: return None
+
+    return {
+        "Kp": round(gain / step_power, 4),
+        "tau1": round(tau1, 2),
+        "tau2": round(tau1 * float(ratio), 2),
+        "theta": round(float(theta), 2),
+        "rmse": round(rmse, 3),
+        "r2": round(r2, 4),
+    }
+
+
+# --- 4. INTERVALOS DE CONFIANZA (BOOTSTRAP DE RESIDUOS) ---
+def _bootstrap_chunk(t, y_fit, resid, base_temp, step_power, start, block, seed, count):
+    """Ajusta 'count' réplicas; retorna filas (Kp, tau, theta) de las que convergieron."""
+    rng = np.random.default_rng(seed)
+    n = len(resid)
+    n_blocks = -(-n // block)
+    rows = []
+    for _ in range(count):
+        # Bloques móviles: conservan la autocorrelación del ruido térmico
+        starts = rng.integers(0, n - block + 1, n_blocks)
+        sample = resid[(starts[:, None] + np.arange(block)).ravel()[:n]]
+        fit = fit_fopdt(t, y_fit + sample, base_temp, step_power, start=start, rounds=BOOTSTRAP_ROUNDS)
+        if fit: rows.append((fit["Kp"], fit["tau"], fit["theta"]))
+    return rows
+
+
+def bootstrap_fopdt(time_data, temp_data, base_temp, step_power, model,
+                    replicas=BOOTSTRAP_REPLICAS, level=BOOTSTRAP_LEVEL, seed=0):
+    """
+    Intervalos de confianza de {"Kp", "tau", "theta"} para un ajuste FOPDT.
+    Con mucho trabajo (réplicas x muestras >= BOOTSTRAP_PROCESS_THRESHOLD)
+    las réplicas se reparten en un pool de procesos; con poco, arrancar el
+    pool cuesta más que el ajuste y se hace en el mismo proceso (también es
+    el respaldo si la plataforma no permite procesos).
+    Retorna {"Kp": (lo, hi), "tau": (lo, hi), "theta": (lo, hi),
+             "rel_width": max. semiancho relativo, "replicas": n válidas} o None.
+    """
+    t = np.asarray(time_data, dtype=float)
+    y = np.asarray(temp_data, dtype=float)
+    if len(t) < 10 or not model: return None
+    t, y = _decimate(t, y, BOOTSTRAP_MAX_SAMPLES)
+
+    gain = model["Kp"] * step_power
+    y_fit = base_temp + gain * _fopdt_basis(t, np.array([model["theta"]]), np.array([model["tau"]]))[0]
+    resid = y - y_fit
+    block = max(1, int(np.sqrt(len(t))))
+
+    workers = os.cpu_count() or 2
+    per_chunk = -(-replicas // workers)
+    start = (model["theta"], model["tau"])
+    chunks = [(t, y_fit, resid, base_temp, step_power, start, block, seed + i, min(per_chunk, replicas - i * per_chunk))
+              for i in range(workers) if replicas - i * per_chunk > 0]
+
+    results = None
+    if replicas * len(t) >= BOOTSTRAP_PROCESS_THRESHOLD:
+        try:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+                results = list(pool.map(_bootstrap_chunk, *zip(*chunks)))
+        except Exception as e:
+            print(f"[Bootstrap] Pool no disponible ({e}), modo local.")
+    if results is None:
+        results = [_bootstrap_chunk(*c) for c in chunks]
+
+    rows = np.array([r for chunk in results for r in chunk])
+    if len(rows) < max(10, replicas // 4): return None
+
+    alpha = (1.0 - level) / 2.0
+    lo, hi = np.quantile(rows, (alpha, 1.0 - alpha), axis=0)
+    ci = {}
+    widths = []
+    for i, key in enumerate(("Kp", "tau", "theta")):
+        ci[key] = (round(float(lo[i]), 4), round(float(hi[i]), 4))
+        widths.append((hi[i] - lo[i]) / 2.0 / max(abs(model[key]), 1e-6))
+    ci["rel_width"] = round(float(max(widths)), 3)
+    ci["replicas"] = len(rows)
+    ci["level"] = level
+    return ci
@@ -0,0 +1,74 @@
+# src/core/lru_cache.py
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    """
+    Caché LRU de tamaño acotado y segura entre hilos (la llenan los hilos de
+    trabajo y la lee el hilo de la UI).
+
+    - max_entries: tope de elementos.
+    - max_bytes: tope de memoria opcional; requiere 'sizeof(valor) -> bytes'.
+    - hits / misses: contadores para el diagnóstico.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.data = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None, count=True):
+        with self.lock:
+            if key not in self.data:
+                if count: self.misses += 1
+                return default
+            if count: self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.sizeof else 0
+        with self.lock:
+            if key in self.data:
+                self.bytes -= self.sizes[key]
+            self.data[key] = value
+            self.sizes[key] = size
+            self.bytes += size
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self.data) > 1
+            ):
+                old_key, _ = self.data.popitem(last=False)
+                self.bytes -= self.sizes.pop(old_key)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.sizes.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Resumen para el diagnóstico: entradas, memoria y tasa de aciertos."""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.data),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
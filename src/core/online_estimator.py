@@ -0,0 +1,133 @@
+# src/core/online_estimator.py
+import math
+
+
+class _RLSFilter:
+    """
+    RLS de 3 parámetros para el ARX de primer orden con retardo fijo d:
+        y[k] = a*y[k-1] + b*u[k-1-d] + c
+    (c absorbe la temperatura ambiente). Todo en Python puro: 3x3 es más
+    rápido así que con NumPy.
+    """
+
+    def __init__(self, delay, p0=1000.0):
+        self.delay = delay
+        self.theta = [0.9, 0.0, 0.0]
+        self.P = [[p0, 0.0, 0.0], [0.0, p0, 0.0], [0.0, 0.0, p0]]
+        self.err_ew = None  # Error de predicción a priori (media exponencial de e²)
+
+    def update(self, phi, y, lam, p_max):
+        P, th = self.P, self.theta
+        Pphi = [P[i][0] * phi[0] + P[i][1] * phi[1] + P[i][2] * phi[2] for i in range(3)]
+        denom = lam + phi[0] * Pphi[0] + phi[1] * Pphi[1] + phi[2] * Pphi[2]
+        err = y - (th[0] * phi[0] + th[1] * phi[1] + th[2] * phi[2])
+
+        gain = [v / denom for v in Pphi]
+        for i in range(3):
+            th[i] += gain[i] * err
+
+        # Anti "wind-up" de la covarianza: sin excitación no olvidamos
+        trace = P[0][0] + P[1][1] + P[2][2]
+        inv_lam = 1.0 / lam if trace < p_max else 1.0
+        for i in range(3):
+            for j in range(3):
+                P[i][j] = (P[i][j] - gain[i] * Pphi[j]) * inv_lam
+
+        e2 = err * err
+        self.err_ew = e2 if self.err_ew is None else 0.995 * self.err_ew + 0.005 * e2
+
+
+class OnlineFOPDTEstimator:
+    """
+    Estimador FOPDT en línea a partir de la operación normal (lazo cerrado).
+
+    - update() cuesta O(1) por muestra: acumula en un "bin" de sample_period
+      segundos; al cerrar el bin actualiza un banco FIJO de filtros RLS (uno
+      por retardo candidato) con factor de olvido.
+    - El retardo con menor error de predicción define theta.
+    - estimate() convierte (a, b) a {Kp, tau, theta} con una confianza 0..1.
+    """
+
+    DEFAULT_DELAYS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+
+    def __init__(self, sample_period=2.0, forgetting=0.995, delays=DEFAULT_DELAYS, p_max=1e4):
+        self.sample_period = float(sample_period)
+        self.forgetting = float(forgetting)
+        self.p_max = p_max
+        self.delays = tuple(delays)
+        self.reset()
+
+    def reset(self):
+        self.filters = [_RLSFilter(d) for d in self.delays]
+        self.max_delay = max(self.delays)
+        # Buffer circular de entradas pasadas (tamaño fijo)
+        self.u_hist = [0.0] * (self.max_delay + 2)
+        self.u_pos = 0
+        self.y_prev = None
+        self.samples = 0
+
+        # Bin de remuestreo
+        self.bin_start = None
+        self.bin_y = 0.0
+        self.bin_u = 0.0
+        self.bin_n = 0
+
+    # --- 1. ALIMENTACIÓN ---
+    def update(self, t, y, u):
+        """Agrega una muestra cruda (t en segundos monotónicos, y en °C, u en %)."""
+        if self.bin_start is None:
+            self.bin_start = t
+        self.bin_y += y
+        self.bin_u += u
+        self.bin_n += 1
+
+        if t - self.bin_start >= self.sample_period:
+            self._step(self.bin_y / self.bin_n, self.bin_u / self.bin_n)
+            self.bin_start = t
+            self.bin_y = self.bin_u = 0.0
+            self.bin_n = 0
+
+    def _step(self, y, u):
+        n = len(self.u_hist)
+        if self.y_prev is not None:
+            for f in self.filters:
+                # u[k-1-d]: el último u guardado está en u_pos-1
+                u_delayed = self.u_hist[(self.u_pos - 1 - f.delay) % n]
+                f.update((self.y_prev, u_delayed, 1.0), y, self.forgetting, self.p_max)
+            self.samples += 1
+
+        self.u_hist[self.u_pos] = u
+        self.u_pos = (self.u_pos + 1) % n
+        self.y_prev = y
+
+    # --- 2. ESTIMACIÓN ---
+    def estimate(self):
+        """
+        Retorna {"Kp", "tau", "theta", "confidence"} o None si aún no hay un
+        modelo físicamente plausible (0 < a < 1, ganancia positiva).
+        """
+        if self.samples < self.max_delay + 5: return None
+
+        best = min(self.filters, key=lambda f: f.err_ew if f.err_ew is not None else math.inf)
+        a, b, _ = best.theta
+        if not (0.0 < a < 1.0) or b <= 0: return None
+
+        Ts = self.sample_period
+        tau = -Ts / math.log(a)
+        K = b / (1.0 - a)
+        theta = best.delay * Ts + 0.5 * Ts  # ZOH: medio periodo de retardo extra
+
+        # Confianza: incertidumbre relativa de b y de (1 - a) (covarianza RLS
+        # escalada por el ruido de predicción) y "calentamiento" del estimador
+        sigma2 = best.err_ew or 0.0
+        rel_b = math.sqrt(max(best.P[1][1], 0.0) * sigma2) / b
+        rel_a = math.sqrt(max(best.P[0][0], 0.0) * sigma2) / (1.0 - a)
+        warmup = min(1.0, self.samples / 60.0)
+        confidence = max(0.0, min(1.0, 1.0 - max(rel_a, rel_b))) * warmup
+
+        return {
+            "Kp": round(K, 4),
+            "tau": round(max(tau, 1.0), 2),
+            "theta": round(theta, 2),
+            "confidence": round(confidence, 2),
+        }
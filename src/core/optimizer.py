@@ -0,0 +1,134 @@
+# src/core/optimizer.py
+"""
+Optimizador por barrido de ganancias PID (vectorizado).
+
+Simula miles de candidatos (Kp, Ki, Kd) contra el modelo identificado en un
+solo lote NumPy (simulate_closed_loop_batch), los puntúa por ITAE,
+sobrepico, tiempo de establecimiento y esfuerzo pico del dimmer, y devuelve
+el frente de Pareto. Las grillas grandes se reparten en un pool de procesos
+(con respaldo en el mismo proceso si la plataforma no lo permite).
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+
+from src.core.simulation import simulate_closed_loop_batch
+
+PROCESS_THRESHOLD = 50000   # Candidatos a partir de los cuales se usa el pool
+CHUNK_SIZE = 2048
+SETTLING_BAND = 0.02        # ±2% del salto
+
+
+# --- 1. CANDIDATOS ---
+def generate_candidates(base_gains, n_kp=16, n_ki=16, n_kd=8):
+    """Grilla logarítmica alrededor de unas ganancias base (p.ej. IMC)."""
+    kp0, ki0, kd0 = (max(g, 1e-3) for g in base_gains)
+    kp = kp0 * np.geomspace(0.25, 4.0, n_kp)
+    ki = ki0 * np.geomspace(0.1, 4.0, n_ki)
+    kd = np.concatenate(([0.0], kd0 * np.geomspace(0.25, 4.0, n_kd - 1)))
+    KP, KI, KD = np.meshgrid(kp, ki, kd, indexing="ij")
+    return KP.ravel(), KI.ravel(), KD.ravel()
+
+
+# --- 2. MÉTRICAS ---
+def score_responses(t, Y, U, sp, start_temp):
+    """Métricas por fila: itae, overshoot (%), settling (s), peak_effort (%)."""
+    step = abs(sp - start_temp) or 1.0
+    dt = t[1] - t[0] if len(t) > 1 else 1.0
+    err = np.abs(sp - Y) / step
+
+    itae = (err * t[None, :]).sum(axis=1) * dt
+    peak_dev = (Y - sp).max(axis=1) if sp >= start_temp else (sp - Y).max(axis=1)
+    overshoot = np.maximum(0.0, peak_dev) / step * 100.0
+
+    # Tiempo de establecimiento: después de la última salida de la banda
+    outside = err > SETTLING_BAND
+    last_out = np.where(outside.any(axis=1), outside.shape[1] - 1 - np.argmax(outside[:, ::-1], axis=1), -1)
+    settling = np.where(last_out + 1 < len(t), t[np.minimum(last_out + 1, len(t) - 1)], np.inf)
+
+    return {
+        "itae": itae,
+        "overshoot": overshoot,
+        "settling": settling,
+        "peak_effort": U.max(axis=1),
+    }
+
+
+def pareto_front(objectives):
+    """
+    Índices no dominados (minimización en todas las columnas).
+    Con los puntos en orden lexicográfico, uno posterior nunca domina a uno
+    anterior: basta comparar cada punto contra el frente acumulado.
+    """
+    obj = np.asarray(objectives, dtype=float)
+    order = np.lexsort(obj.T[::-1])
+    front = np.empty_like(obj)
+    indices = []
+    for i in order:
+        p = obj[i]
+        F = front[:len(indices)]
+        if len(indices) and ((F <= p).all(axis=1) & (F < p).any(axis=1)).any():
+            continue
+        front[len(indices)] = p
+        indices.append(i)
+    return np.array(indices, dtype=np.intp)
+
+
+# --- 3. BARRIDO ---
+def _simulate_chunk(model, kp, ki, kd, sp, start_temp, horizon):
+    t, Y, U = simulate_closed_loop_batch(
+        model["Kp"], model["tau"], model["theta"], kp, ki, kd, sp, start_temp, horizon
+    )
+    return score_responses(t, Y, U, sp, start_temp)
+
+
+def _score_all(model, kp, ki, kd, sp, start_temp, horizon):
+    n = len(kp)
+    chunks = [(model, kp[i:i + CHUNK_SIZE], ki[i:i + CHUNK_SIZE], kd[i:i + CHUNK_SIZE], sp, start_temp, horizon)
+              for i in range(0, n, CHUNK_SIZE)]
+
+    results = None
+    if n >= PROCESS_THRESHOLD:
+        try:
+            with ProcessPoolExecutor(max_workers=os.cpu_count() or 2) as pool:
+                results = list(pool.map(_simulate_chunk, *zip(*chunks)))
+        except Exception as e:
+            # Android / entornos sin fork: seguimos en el mismo proceso
+            print(f"[Optimizer] Pool no disponible ({e}), modo local.")
+            results = None
+    if results is None:
+        results = [_simulate_chunk(*c) for c in chunks]
+
+    return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+
+def sweep_pid_gains(model, sp, start_temp, base_gains, horizon=None, candidates=None):
+    """
+    Barre los candidatos y devuelve el frente de Pareto COMPLETO ordenado por
+    ITAE: lista de dicts {"kp", "ki", "kd", "itae", "overshoot", "settling",
+    "peak_effort"} ("settling" es inf si no se establece en el horizonte).
+    Cuántos mostrar lo decide la vista.
+    """
+    if horizon is None:
+        horizon = max(60.0, 6.0 * (model["tau"] + model["theta"]))
+    kp, ki, kd = candidates if candidates is not None else generate_candidates(base_gains)
+
+    scores = _score_all(model, kp, ki, kd, sp, start_temp, horizon)
+    settling = np.where(np.isfinite(scores["settling"]), scores["settling"], 10.0 * horizon)
+    objectives = np.column_stack((scores["itae"], scores["overshoot"], settling, scores["peak_effort"]))
+
+    front = pareto_front(objectives)
+    front = front[np.argsort(scores["itae"][front])]
+
+    return [
+        {
+            "kp": round(float(kp[i]), 3),
+            "ki": round(float(ki[i]), 4),
+            "kd": round(float(kd[i]), 3),
+            "itae": round(float(scores["itae"][i]), 1),
+            "overshoot": round(float(scores["overshoot"][i]), 1),
+            "settling": round(float(scores["settling"][i]), 1),
+            "peak_effort": round(float(scores["peak_effort"][i]), 1),
+        }
+        for i in front
+    ]
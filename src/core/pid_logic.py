@@ -0,0 +1,195 @@
+# src/core/pid_logic.py
+"""
+Núcleo compartido de control y planta térmica.
+
+- PIDController: PID de posición con salida recortada (0-100%), anti-windup
+  por integración condicional, derivada sobre la medida (sin "patada" al
+  cambiar el SP) con filtro de primer orden, y reset().
+- ThermalSimulator: horno FOPDT con pérdidas al ambiente y tiempo muerto,
+  discretización ZOH exacta (x -> a*x + K*(1-a)*u[k-d]).
+- advance(n_steps): lazo cerrado de n pasos en un solo bucle (sin llamadas
+  por paso), arreglo de salida.
+- closed_loop_batch(): el mismo lazo para muchos (planta, PID) a la vez con
+  NumPy (un eje por candidato).
+
+Lo usan SimulationView, el motor de simulación (TuningView, optimizador,
+caché de lambda) y, por ende, el tuner: una sola implementación.
+"""
+from array import array
+from collections import deque
+import math
+import numpy as np
+
+
+# --- 1. CONTROLADOR ---
+class PIDController:
+    def __init__(self, kp=2.0, ki=0.1, kd=1.0, setpoint=0.0,
+                 out_min=0.0, out_max=100.0, derivative_tau=0.0, dt=0.1):
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.setpoint = setpoint
+        self.out_min, self.out_max = out_min, out_max
+        self.derivative_tau = derivative_tau   # s; 0 = sin filtro
+        self.dt = dt
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.prev_meas = None
+        self.d_filtered = 0.0
+        self.output = 0.0
+
+    def compute(self, measurement, dt=None):
+        dt = dt or self.dt
+        err = self.setpoint - measurement
+
+        # Derivada sobre la medida, filtrada
+        if self.prev_meas is None:
+            d_raw = 0.0
+        else:
+            d_raw = -(measurement - self.prev_meas) / dt
+        self.prev_meas = measurement
+        alpha = dt / (self.derivative_tau + dt)
+        self.d_filtered += alpha * (d_raw - self.d_filtered)
+
+        # Anti-windup: solo se integra si no empuja más allá de la saturación
+        pd = self.kp * err + self.kd * self.d_filtered
+        integral = self.integral + err * dt
+        out = pd + self.ki * integral
+        if (out > self.out_max and err > 0) or (out < self.out_min and err < 0):
+            out = pd + self.ki * self.integral
+        else:
+            self.integral = integral
+
+        self.output = min(self.out_max, max(self.out_min, out))
+        return self.output
+
+
+# --- 2. PLANTA ---
+class ThermalSimulator:
+    """
+    Horno de primer orden con tiempo muerto y pérdidas al ambiente:
+        T = ambient + x,   tau * dx/dt = -x + gain * u(t - dead_time)
+    'temperature' es asignable (p.ej. perturbación de puerta abierta).
+    """
+
+    def __init__(self, gain=1.0, tau=60.0, dead_time=3.0, ambient=25.0, dt=0.1, initial_temp=None):
+        self.gain = gain
+        self.tau = tau
+        self.dead_time = dead_time
+        self.ambient = ambient
+        self.x = 0.0 if initial_temp is None else initial_temp - ambient
+        self._dt = None
+        self._configure(dt)
+
+    def _configure(self, dt):
+        """Coeficientes ZOH y línea de retardo para el paso dt (solo si cambia)."""
+        if dt == self._dt: return
+        self._dt = dt
+        self.a = math.exp(-dt / self.tau)
+        self.b = self.gain * (1.0 - self.a)
+        delay_steps = int(round(self.dead_time / dt))
+        self.delay_line = deque([0.0] * delay_steps, maxlen=delay_steps + 1)
+
+    @property
+    def temperature(self):
+        return self.ambient + self.x
+
+    @temperature.setter
+    def temperature(self, value):
+        self.x = value - self.ambient
+
+    def reset(self, temperature=None):
+        self.x = 0.0 if temperature is None else temperature - self.ambient
+        self.delay_line = deque([0.0] * (self.delay_line.maxlen - 1), maxlen=self.delay_line.maxlen)
+
+    def update(self, power, dt=None):
+        """Un paso con la potencia dada (%). Retorna la temperatura nueva."""
+        self._configure(dt or self._dt)
+        self.delay_line.append(power)
+        self.x = self.a * self.x + self.b * self.delay_line.popleft()
+        return self.ambient + self.x
+
+    def advance(self, n_steps, controller=None, powers=None):
+        """
+        n pasos de dt en un solo bucle. Con 'controller' cierra el lazo (el PID
+        lee la temperatura y decide la potencia); si no, usa 'powers' (un
+        arreglo de n potencias o un escalar constante).
+        Retorna (temperaturas, potencias) como array('d').
+        """
+        temps = array('d', bytes(8 * n_steps))
+        outs = array('d', bytes(8 * n_steps))
+        a, b, ambient = self.a, self.b, self.ambient
+        line = self.delay_line
+        push, pop = line.append, line.popleft
+        x = self.x
+        dt = self._dt
+
+        if controller is not None:
+            compute = controller.compute
+            for i in range(n_steps):
+                u = compute(ambient + x, dt)
+                push(u)
+                x = a * x + b * pop()
+                temps[i] = ambient + x
+                outs[i] = u
+        else:
+            const = powers if isinstance(powers, (int, float)) else None
+            for i in range(n_steps):
+                u = const if const is not None else powers[i]
+                push(u)
+                x = a * x + b * pop()
+                temps[i] = ambient + x
+                outs[i] = u
+
+        self.x = x
+        return temps, outs
+
+
+# --- 3. LOTE VECTORIZADO ---
+def closed_loop_batch(K, tau, theta, kp, ki, kd, sp, start_temp, dt, steps,
+                      out_min=0.0, out_max=100.0, derivative_tau=0.0):
+    """
+    Mismo lazo que PIDController + ThermalSimulator para n candidatos a la vez.
+    Cada argumento de planta/ganancias puede ser escalar o arreglo de largo n.
+    Retorna (Y[n, steps], U[n, steps]).
+    """
+    K, tau, theta, kp, ki, kd = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (K, tau, theta, kp, ki, kd))
+    )
+    n = K.shape[0]
+    a = np.exp(-dt / tau)
+    b = K * (1.0 - a)
+
+    delay = np.rint(theta / dt).astype(np.intp)
+    depth = int(delay.max()) + 1
+    ring = np.zeros((n, depth))        # Línea de retardo circular por candidato
+    rows = np.arange(n)
+    alpha = dt / (derivative_tau + dt)
+
+    Y = np.empty((n, steps))
+    U = np.empty((n, steps))
+    x = np.zeros(n)
+    temp = np.full(n, float(start_temp))
+    prev_temp = temp.copy()
+    integral = np.zeros(n)
+    d_filtered = np.zeros(n)
+
+    for i in range(steps):
+        err = sp - temp
+        d_filtered += alpha * (-(temp - prev_temp) / dt - d_filtered)
+        prev_temp = temp
+
+        pd = kp * err + kd * d_filtered
+        candidate = integral + err * dt
+        out = pd + ki * candidate
+        windup = ((out > out_max) & (err > 0)) | ((out < out_min) & (err < 0))
+        integral = np.where(windup, integral, candidate)
+        out = np.clip(np.where(windup, pd + ki * integral, out), out_min, out_max)
+
+        ring[:, i % depth] = out
+        x = a * x + b * ring[rows, (i - delay) % depth]
+        temp = start_temp + x
+        Y[:, i] = temp
+        U[:, i] = out
+
+    return Y, U
@@ -0,0 +1,205 @@
+# src/core/recipe.py
+"""
+Ejecutor de perfiles de setpoint (recetas rampa/meseta).
+
+Una receta es una cadena de segmentos separados por coma, como la cadena de
+filtros de telemetría:
+    ramp:T:R   rampa hasta T °C a R °C/min (SP enviado en escalones)
+    soak:M     meseta de M minutos en la última temperatura (banda ±SOAK_BAND)
+    cool:T     SP a T °C y esperar a que la temperatura baje de T
+Ejemplo: "ramp:40:2,soak:20,ramp:65:1.5,soak:45,cool:30"
+
+El SP de rampa se reenvía con send_setpoint_only en plazos del reloj
+monotónico (como mucho cada SEND_INTERVAL s). El tiempo de meseta solo corre
+con la temperatura dentro de la banda ("holdback"), así que tampoco avanza
+sin telemetría: tras una reconexión la receta sigue donde quedó y se reenvía
+el SP. El progreso se guarda en client_storage y sobrevive a un reinicio;
+tick() corre en el event loop, así que 'storage' debe ser un StorageWriter
+(src/core/storage_writer.py), que escribe desde su propio hilo.
+"""
+
+SEND_INTERVAL = 5.0      # s entre actualizaciones de SP durante la rampa
+SOAK_BAND = 1.0          # °C
+MAX_TICK_S = 2.0         # Un hueco mayor (desconexión) no cuenta como tiempo
+SAVE_INTERVAL = 10.0     # s entre guardados del progreso
+STATE_KEY = "recipe_state"
+RECIPES_KEY = "recipes"
+
+
+# --- 1. RECETAS ---
+def parse_recipe(spec):
+    """
+    Convierte la cadena en una lista de segmentos {"kind", ...}.
+    Lanza ValueError si la cadena es inválida.
+    """
+    segments = []
+    for token in spec.replace(" ", "").split(","):
+        if not token: continue
+        name, *args = token.split(":")
+        try:
+            values = [float(a) for a in args]
+        except ValueError:
+            raise ValueError(f"Parámetro no numérico en '{token}'")
+
+        if name == "ramp" and len(values) == 2 and values[1] > 0:
+            segments.append({"kind": "ramp", "target": values[0], "rate": values[1]})
+        elif name == "soak" and len(values) == 1 and values[0] > 0:
+            segments.append({"kind": "soak", "minutes": values[0]})
+        elif name == "cool" and len(values) == 1:
+            segments.append({"kind": "cool", "target": values[0]})
+        else:
+            raise ValueError(f"Segmento inválido: '{token}'")
+
+        target = segments[-1].get("target")
+        if target is not None and not 0 <= target < 80:
+            raise ValueError(f"Temperatura fuera de rango en '{token}' (0-80 °C)")
+
+    if not segments:
+        raise ValueError("Receta vacía")
+    if segments[0]["kind"] == "soak":
+        raise ValueError("La receta debe empezar con una rampa")
+    return segments
+
+
+# --- 2. EJECUTOR ---
+class RecipeRunner:
+    def __init__(self, esp_interface, storage=None):
+        self.esp = esp_interface
+        self.storage = storage
+        self.segments = []
+        self.spec = None
+        self.name = None
+        self._clear()
+
+        # Receta interrumpida (cierre de la app): se reanuda en el mismo punto
+        saved = storage.get(STATE_KEY) if storage is not None else None
+        if saved:
+            try:
+                self.segments = parse_recipe(saved["spec"])
+                self.spec, self.name = saved["spec"], saved.get("name")
+                self.index = saved["index"]
+                self.ramp_sp = saved.get("ramp_sp")
+                self.soak_elapsed = saved.get("soak_elapsed", 0.0)
+                self.running = True
+                self.status = f"Receta reanudada: {self.describe()}"
+                print(f"[Receta] {self.status}")
+            except (KeyError, ValueError) as e:
+                print(f"[Receta] Estado guardado inválido ({e}), descartado.")
+                self._clear()
+
+    def _clear(self):
+        self.running = False
+        self.index = 0
+        self.ramp_sp = None        # SP actual de la rampa (None = aún no empieza)
+        self.soak_elapsed = 0.0    # s de meseta dentro de la banda
+        self.last_tick = None
+        self.next_send = 0.0
+        self.next_save = 0.0
+        self.sent_sp = None
+        self.status = "Sin receta en curso."
+
+    @property
+    def segment(self):
+        return self.segments[self.index] if self.running and self.index < len(self.segments) else None
+
+    # --- CONTROL ---
+    def start(self, spec, name=None):
+        """Arranca la receta (ValueError si la cadena es inválida)."""
+        segments = parse_recipe(spec)
+        self._clear()
+        self.segments, self.spec, self.name = segments, spec, name
+        self.running = True
+        self.status = f"Receta iniciada: {self.describe()}"
+        self._save()
+        print(f"[Receta] {self.status}")
+
+    def stop(self, reason="Detenida"):
+        if not self.running: return
+        self._clear()
+        self.status = f"Receta {reason.lower()}."
+        if self.storage is not None: self.storage.remove(STATE_KEY)
+        print(f"[Receta] {self.status}")
+
+    def describe(self):
+        seg = self.segment
+        if seg is None: return "--"
+        step = f"{self.index + 1}/{len(self.segments)}"
+        if seg["kind"] == "ramp":
+            sp = self.ramp_sp if self.ramp_sp is not None else seg["target"]
+            return f"[{step}] Rampa a {seg['target']:.0f}°C ({seg['rate']:g}°C/min) · SP {sp:.1f}°C"
+        if seg["kind"] == "soak":
+            left = max(0.0, seg["minutes"] * 60.0 - self.soak_elapsed)
+            return f"[{step}] Meseta {self._soak_target():.0f}°C · faltan {int(left // 60):02d}:{int(left % 60):02d}"
+        return f"[{step}] Enfriando a {seg['target']:.0f}°C"
+
+    # --- BUCLE (llamado con cada muestra de telemetría) ---
+    def tick(self, now, temp):
+        """'now' es time.monotonic(). Retorna True si la receta terminó en este tick."""
+        seg = self.segment
+        if seg is None: return False
+
+        # Tras un hueco (desconexión) se reenvía el SP enseguida y el hueco no cuenta
+        dt = 0.0 if self.last_tick is None else now - self.last_tick
+        if dt > MAX_TICK_S:
+            dt = 0.0
+            self.sent_sp = None     # El ESP32 pudo reiniciarse con otro SP
+        self.last_tick = now
+
+        done = False
+        if seg["kind"] == "ramp":
+            if self.ramp_sp is None:
+                self.ramp_sp = temp           # La rampa parte de la temperatura actual
+            step = seg["rate"] / 60.0 * dt
+            if seg["target"] >= self.ramp_sp:
+                self.ramp_sp = min(seg["target"], self.ramp_sp + step)
+            else:
+                self.ramp_sp = max(seg["target"], self.ramp_sp - step)
+            done = self.ramp_sp == seg["target"]
+            self._send(now, self.ramp_sp, force=done)
+
+        elif seg["kind"] == "soak":
+            target = self._soak_target()
+            self._send(now, target)
+            if abs(temp - target) <= SOAK_BAND:
+                self.soak_elapsed += dt
+            done = self.soak_elapsed >= seg["minutes"] * 60.0
+
+        else:  # cool
+            self._send(now, seg["target"])
+            done = temp <= seg["target"]
+
+        if done:
+            self.index += 1
+            self.ramp_sp, self.soak_elapsed = None, 0.0
+            self.next_send = now
+            if self.index >= len(self.segments):
+                self.stop("Terminada")
+                return True
+            self._save()
+        elif now >= self.next_save:
+            self.next_save = now + SAVE_INTERVAL
+            self._save()
+
+        self.status = self.describe()
+        return False
+
+    def _soak_target(self):
+        """La meseta mantiene el objetivo del segmento de rampa anterior."""
+        for seg in reversed(self.segments[:self.index]):
+            if "target" in seg: return seg["target"]
+        return 0.0
+
+    def _send(self, now, sp, force=False):
+        """SP por el canal seguro, como mucho cada SEND_INTERVAL s (o si cambia el segmento)."""
+        sp = round(sp, 1)
+        if sp == self.sent_sp or (now < self.next_send and not force): return
+        if self.esp.send_setpoint_only(sp):
+            self.sent_sp = sp
+            self.next_send = now + SEND_INTERVAL
+
+    def _save(self):
+        if self.storage is None: return
+        self.storage.set(STATE_KEY, {
+            "spec": self.spec, "name": self.name, "index": self.index,
+            "ramp_sp": self.ramp_sp, "soak_elapsed": round(self.soak_elapsed, 1),
+        })
@@ -0,0 +1,174 @@
+# src/core/relay_tuner.py
+"""
+Autosintonía por realimentación de relé (Åström–Hägglund).
+
+El host conmuta la potencia entre dos niveles alrededor del setpoint; la
+temperatura entra en un ciclo límite cuyo periodo y amplitud dan el punto
+crítico de la planta:
+    Ku = 4d / (pi * sqrt(a² - eps²)),   Pu = periodo de la oscilación
+(d = semiamplitud del relé, a = semiamplitud de la temperatura, eps = histéresis).
+
+Todo es en flujo: cada muestra cuesta O(1) y el resultado aparece tras unos
+pocos ciclos consistentes, sin esperar el régimen estacionario del escalón.
+"""
+from collections import deque
+import math
+
+
+# --- 1. DETECTOR DE OSCILACIÓN ---
+class OscillationDetector:
+    """
+    Detecta cruces ascendentes de 'center' (con histéresis) y mide por ciclo
+    el periodo y la semiamplitud pico a valle. Converge cuando los últimos
+    'min_cycles' ciclos coinciden dentro de 'tolerance' (relativa).
+    """
+
+    def __init__(self, center, hysteresis=0.5, min_cycles=3, tolerance=0.1):
+        self.center = center
+        self.hysteresis = hysteresis
+        self.tolerance = tolerance
+        self.periods = deque(maxlen=min_cycles)
+        self.amplitudes = deque(maxlen=min_cycles)
+
+        self.sign = 0           # +1 semiciclo superior, -1 inferior, 0 sin definir
+        self.last_up = None     # Instante del último cruce ascendente
+        self.peak = -math.inf
+        self.trough = math.inf
+        self.cycles = 0
+
+    def update(self, t, y):
+        """Agrega una muestra. Retorna True si la oscilación ya es estable."""
+        e = y - self.center
+        if y > self.peak: self.peak = y
+        if y < self.trough: self.trough = y
+
+        if self.sign <= 0 and e > self.hysteresis:
+            # Cruce ascendente: cierra un ciclo completo (semiciclo superior + inferior)
+            if self.last_up is not None and self.sign < 0:
+                self.periods.append(t - self.last_up)
+                self.amplitudes.append((self.peak - self.trough) / 2.0)
+                self.cycles += 1
+            self.last_up = t
+            self.sign = 1
+            self.peak = self.trough = y
+        elif self.sign >= 0 and e < -self.hysteresis:
+            self.sign = -1
+            self.trough = y
+
+        return self.converged
+
+    @staticmethod
+    def _spread(values):
+        mean = sum(values) / len(values)
+        return (max(values) - min(values)) / mean if mean > 0 else math.inf
+
+    @property
+    def converged(self):
+        if len(self.periods) < self.periods.maxlen: return False
+        return (self._spread(self.periods) <= self.tolerance
+                and self._spread(self.amplitudes) <= self.tolerance)
+
+    @property
+    def period(self):
+        return sum(self.periods) / len(self.periods) if self.periods else None
+
+    @property
+    def amplitude(self):
+        return sum(self.amplitudes) / len(self.amplitudes) if self.amplitudes else None
+
+
+# --- 2. RELÉ ---
+class RelayAutotuner:
+    """
+    Relé con histéresis alrededor del setpoint. update() devuelve la nueva
+    potencia (%) SOLO cuando hay que conmutar (y en la primera muestra), para
+    no saturar el enlace con comandos repetidos.
+    """
+
+    def __init__(self, setpoint, amplitude=50.0, bias=50.0, hysteresis=0.5,
+                 min_cycles=3, tolerance=0.1, timeout=3600.0):
+        self.setpoint = float(setpoint)
+        self.high = min(100.0, bias + amplitude)
+        self.low = max(0.0, bias - amplitude)
+        self.hysteresis = hysteresis
+        self.timeout = timeout
+        self.detector = OscillationDetector(setpoint, hysteresis, min_cycles, tolerance)
+
+        self.output = None
+        self.t0 = None
+        self.finished = False
+        self.failed = False
+
+    @property
+    def relay_amplitude(self):
+        """Semiamplitud efectiva del relé (tras recortar a 0-100%)."""
+        return (self.high - self.low) / 2.0
+
+    def update(self, t, temp):
+        if self.finished: return None
+        if self.t0 is None: self.t0 = t
+
+        if self.detector.update(t, temp):
+            self.finished = True
+            return None
+        if t - self.t0 > self.timeout:
+            print(f"[Relay] Sin oscilación estable tras {self.timeout:.0f}s. Abortando.")
+            self.finished = self.failed = True
+            return None
+
+        # Conmutación con histéresis
+        new_output = self.output
+        if temp < self.setpoint - self.hysteresis:
+            new_output = self.high
+        elif temp > self.setpoint + self.hysteresis:
+            new_output = self.low
+        elif new_output is None:
+            new_output = self.high if temp < self.setpoint else self.low
+
+        if new_output != self.output:
+            self.output = new_output
+            return new_output
+        return None
+
+    def result(self, static_gain=None):
+        """
+        {"Ku", "Pu", "amplitude", "kp", "ki", "kd"[, "model"]} o None.
+        Con una ganancia estática conocida se deduce además un FOPDT
+        equivalente que pasa por el mismo punto crítico.
+        """
+        if not self.finished or self.failed: return None
+        a, Pu = self.detector.amplitude, self.detector.period
+        if not a or not Pu or a <= self.hysteresis: return None
+
+        Ku = 4.0 * self.relay_amplitude / (math.pi * math.sqrt(a * a - self.hysteresis ** 2))
+        kp, ki, kd = ziegler_nichols_pid(Ku, Pu)
+        res = {
+            "Ku": round(Ku, 3), "Pu": round(Pu, 1), "amplitude": round(a, 2),
+            "kp": kp, "ki": ki, "kd": kd,
+        }
+        if static_gain:
+            model = fopdt_from_ultimate(static_gain, Ku, Pu)
+            if model: res["model"] = model
+        return res
+
+
+# --- 3. REGLAS DE SINTONÍA ---
+def ziegler_nichols_pid(Ku, Pu):
+    """PID clásico de Ziegler–Nichols: Kc=0.6Ku, Ti=Pu/2, Td=Pu/8."""
+    Kc = 0.6 * Ku
+    Ti = Pu / 2.0
+    Td = Pu / 8.0
+    return round(Kc, 2), round(Kc / Ti, 3), round(Kc * Td, 2)
+
+
+def fopdt_from_ultimate(K, Ku, Pu):
+    """
+    FOPDT con ganancia K y el mismo punto crítico (Ku, Pu):
+        |G(jw)| = 1/Ku  ->  tau = sqrt((K*Ku)² - 1) / w
+        arg G(jw) = -pi ->  theta = (pi - atan(w*tau)) / w
+    """
+    if K <= 0 or K * Ku <= 1.0: return None
+    w = 2.0 * math.pi / Pu
+    tau = math.sqrt((K * Ku) ** 2 - 1.0) / w
+    theta = (math.pi - math.atan(w * tau)) / w
+    return {"Kp": round(K, 4), "tau": round(max(tau, 1.0), 2), "theta": round(max(theta, 0.1), 2)}
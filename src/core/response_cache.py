@@ -0,0 +1,63 @@
+# src/core/response_cache.py
+"""
+Respuestas precalculadas para el slider Lambda (IMC).
+
+Al identificar un modelo se simula en segundo plano, en un solo lote NumPy,
+la curva ideal de cada posición del slider (tau*0.2 .. tau*3.0). Mover el
+slider pasa a ser una búsqueda en la caché LRU.
+
+La clave incluye los intervalos de confianza del modelo ('ci'): con ellos la
+sugerencia IMC es la del peor caso y las ganancias cambian. Además cada
+invalidate() abre una generación nueva y un precálculo de una generación
+vieja (su hilo sigue corriendo aunque se cancele la tarea) descarta lo suyo.
+"""
+from src.core.lru_cache import LRUCache
+from src.core.simulation import simulate_closed_loop_batch
+
+
+def lambda_grid(lam_min, lam_max, divisions):
+    """Posiciones exactas del slider (mismo cuantizado que ft.Slider)."""
+    step = (lam_max - lam_min) / divisions
+    return [lam_min + i * step for i in range(divisions + 1)]
+
+
+def lambda_cache_key(model, lam, sp, start_temp, horizon):
+    ci = model.get('ci')
+    return (
+        round(model['Kp'], 4), round(model['tau'], 2), round(model['theta'], 2),
+        (ci['Kp'][1], ci['theta'][1]) if ci else None,   # Extremos que usa la sintonía IMC
+        round(lam, 3), round(sp, 2), round(start_temp, 2), round(horizon, 1),
+    )
+
+
+class LambdaResponseCache:
+    def __init__(self, max_entries=512):
+        self.lru = LRUCache(max_entries)
+        self.generation = 0
+
+    def invalidate(self):
+        """Vacía la caché; los precálculos en vuelo ya no guardan nada."""
+        self.generation += 1
+        self.lru.clear()
+
+    def get(self, model, lam, sp, start_temp, horizon):
+        """(gains, tiempos, temperaturas) o None si no está precalculado."""
+        return self.lru.get(lambda_cache_key(model, lam, sp, start_temp, horizon))
+
+    def precompute(self, tuner, model, lambdas, sp, start_temp, horizon):
+        """
+        Simula todas las posiciones de lambda de una vez y las guarda.
+        Pensado para correr en un hilo de trabajo.
+        """
+        generation = self.generation
+        gains = [tuner.calculate_imc_pid(model, lam) for lam in lambdas]
+        kp, ki, kd = zip(*gains)
+        t, Y, _ = simulate_closed_loop_batch(
+            model['Kp'], model['tau'], model['theta'], kp, ki, kd, sp, start_temp, horizon
+        )
+        times = t.tolist()
+        if generation != self.generation: return 0   # Invalidada mientras simulábamos
+        for lam, g, row in zip(lambdas, gains, Y):
+            key = lambda_cache_key(model, lam, sp, start_temp, horizon)
+            self.lru.put(key, (g, times, row.tolist()))
+        return len(lambdas)
@@ -0,0 +1,54 @@
+# src/core/robustness.py
+"""
+Análisis de robustez Monte Carlo.
+
+La curva "ideal" supone que el modelo identificado es exacto; un horno real
+cambia con la carga, el sello de la puerta, etc. Aquí se simulan las mismas
+ganancias contra cientos de plantas perturbadas (±K, ±tau, ±theta) en UN
+solo lote NumPy y se resume el resultado como banda de percentiles 5–95%
+más las métricas de peor caso.
+"""
+import numpy as np
+
+from src.core.simulation import simulate_closed_loop_batch
+from src.core.optimizer import score_responses
+
+DEFAULT_SAMPLES = 300
+DEFAULT_SPREAD = {"Kp": 0.2, "tau": 0.3, "theta": 0.3}   # ± relativo (uniforme)
+
+
+def perturbed_models(model, n=DEFAULT_SAMPLES, spread=None, seed=None):
+    """Arreglos (K, tau, theta) de n plantas alrededor de 'model'. La fila 0 es el nominal."""
+    spread = spread or DEFAULT_SPREAD
+    rng = np.random.default_rng(seed)
+    params = []
+    for key, minimum in (("Kp", 1e-4), ("tau", 1.0), ("theta", 0.0)):
+        factor = 1.0 + rng.uniform(-spread[key], spread[key], n)
+        factor[0] = 1.0
+        params.append(np.maximum(model[key] * factor, minimum))
+    return tuple(params)
+
+
+def robustness_envelope(model, kp, ki, kd, sp, start_temp, horizon,
+                        n=DEFAULT_SAMPLES, spread=None, seed=0):
+    """
+    Retorna {"t", "p5", "p50", "p95" (listas), "worst_overshoot", "p95_overshoot",
+    "worst_settling", "unsettled", "samples"}.
+    """
+    K, tau, theta = perturbed_models(model, n, spread, seed)
+    t, Y, U = simulate_closed_loop_batch(K, tau, theta, kp, ki, kd, sp, start_temp, horizon)
+
+    p5, p50, p95 = np.percentile(Y, (5, 50, 95), axis=0)
+    scores = score_responses(t, Y, U, sp, start_temp)
+    settling = scores["settling"]
+    finite = np.isfinite(settling)
+
+    return {
+        "t": t.tolist(),
+        "p5": p5.tolist(), "p50": p50.tolist(), "p95": p95.tolist(),
+        "worst_overshoot": round(float(scores["overshoot"].max()), 1),
+        "p95_overshoot": round(float(np.percentile(scores["overshoot"], 95)), 1),
+        "worst_settling": float(settling[finite].max()) if finite.any() else None,
+        "unsettled": int((~finite).sum()),
+        "samples": n,
+    }
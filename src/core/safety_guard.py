@@ -0,0 +1,88 @@
+# src/core/safety_guard.py
+from collections import deque
+import math
+
+MODEL_CHANGE_TOL = 0.1   # Cambio relativo de Kp/tau/theta que invalida los estados
+
+
+class PredictiveSafetyGuard:
+    """
+    Corte de seguridad predictivo (estilo predictor de Smith).
+
+    Con el modelo FOPDT vigente se simulan en paralelo dos estados de la
+    planta: uno SIN retardo (x_now) y otro con la entrada retrasada theta
+    segundos (x_delayed). La diferencia es el calor que ya se aplicó y todavía
+    no se ve en el termopar, así que:
+        T(t + theta) ≈ T_medida + (x_now - x_delayed)
+    Si se corta la potencia ahora, ese es (aprox.) el pico que alcanzará el
+    horno. Cada muestra cuesta O(1) amortizado: la línea de retardo solo
+    guarda las entradas de los últimos theta segundos.
+    """
+
+    def __init__(self, limit=80.0, latency=0.5):
+        self.limit = limit
+        self.latency = latency      # Antigüedad de la muestra (periodo del bucle global)
+        self.reset()
+
+    def reset(self):
+        self.u_queue = deque()      # (t, u) aplicados en los últimos theta segundos
+        self.u_delayed = None
+        self.x_now = 0.0
+        self.x_delayed = 0.0
+        self.t_prev = None
+        self.y_prev = None
+        self.slope_ew = 0.0
+        self.prediction = None
+        self.model_key = None       # (Kp, tau, theta) con que se simularon los estados
+
+    def update(self, t, temp, out_percent, model):
+        """
+        Avanza los estados con la muestra (t monotónico, °C, %) y retorna la
+        temperatura proyectada al final del tiempo muerto.
+        Sin modelo la proyección es la propia medida (solo corte duro).
+        """
+        key = (model['Kp'], model['tau'], model['theta']) if model else None
+        if self.t_prev is None or not self._same_model(key):
+            # Sin modelo o con otro: la línea de retardo y los estados del
+            # anterior no valen (p.ej. al pasar al ajuste en curso a mitad del
+            # ensayo). La deriva fina del estimador en línea no cuenta como cambio.
+            self.u_queue.clear()
+            self.x_now = self.x_delayed = 0.0
+            self.model_key = key
+            self.t_prev, self.y_prev = t, temp
+            self.u_delayed = out_percent
+            self.prediction = temp
+            return temp
+
+        dt = t - self.t_prev
+        if dt <= 0: return self.prediction
+
+        K, tau, theta = model['Kp'], max(model['tau'], 1e-3), max(model['theta'], 0.0)
+
+        # Línea de retardo: sale lo que lleva más de theta segundos en cola
+        self.u_queue.append((t, out_percent))
+        while self.u_queue and t - self.u_queue[0][0] >= theta:
+            self.u_delayed = self.u_queue.popleft()[1]
+
+        # Discretización ZOH exacta para el dt real de la muestra
+        a = math.exp(-dt / tau)
+        b = K * (1.0 - a)
+        self.x_now = a * self.x_now + b * out_percent
+        self.x_delayed = a * self.x_delayed + b * self.u_delayed
+
+        # Pendiente medida (suavizada contra el ruido): compensa la antigüedad de la muestra
+        self.slope_ew = 0.8 * self.slope_ew + 0.2 * (temp - self.y_prev) / dt
+        self.t_prev, self.y_prev = t, temp
+
+        heat_in_transit = max(0.0, self.x_now - self.x_delayed)
+        self.prediction = temp + heat_in_transit + max(0.0, self.slope_ew) * self.latency
+        return self.prediction
+
+    def _same_model(self, key):
+        if key is None or self.model_key is None: return False
+        return all(abs(new - old) <= MODEL_CHANGE_TOL * max(abs(old), 1e-6)
+                   for new, old in zip(key, self.model_key))
+
+    @property
+    def tripped(self):
+        return self.prediction is not None and self.prediction >= self.limit
@@ -0,0 +1,179 @@
+# src/core/sequencer.py
+"""
+Secuenciador de autosintonía multi-punto.
+
+Recorre una lista de temperaturas de operación (p.ej. 30→45→60→75 °C) en una
+sola sesión desatendida. En cada punto:
+  1. ESTABILIZANDO: el PID del ESP32 lleva el horno al punto; se espera el
+     régimen estacionario (SteadyStateDetector) y se mide la potencia de
+     sostenimiento.
+  2. ESCALÓN: modo manual con potencia = sostenimiento + delta; el
+     StepResponseAnalyzer graba y se detiene solo (régimen o convergencia).
+  3. El modelo identificado se guarda en la tabla {temperatura: modelo},
+     persistida en client_storage (con un StorageWriter: tick() corre en el
+     event loop, donde client_storage bloquea).
+Lo avanza tick() desde el bucle global (O(1) por muestra). El escalón usa
+potencia manual (comando M): sin firmware que la anuncie no se arranca.
+"""
+from src.core.steady_state import SteadyStateDetector
+
+STORAGE_KEY = "model_table"
+SETTLE_BAND = 1.0          # °C alrededor del punto
+SETTLE_TIMEOUT = 1800.0    # s por punto para estabilizar
+STEP_TIMEOUT = 3600.0      # s por ensayo de escalón
+DEFAULT_STEP = 20.0        # % de potencia si no hay modelo previo
+MAX_STEP = 40.0
+MIN_STEP = 1.0             # Por debajo no hay margen para un escalón útil
+SAFETY_LIMIT = 78.0        # Subida máxima prevista por debajo del corte de 80°C
+
+IDLE, SETTLING, STEPPING, DONE, ABORTED = "reposo", "estabilizando", "escalón", "terminado", "abortado"
+
+
+def parse_points(text):
+    """'30, 45,60' -> [30.0, 45.0, 60.0] (ValueError si no son números válidos 0-80)."""
+    points = [float(p) for p in text.replace(";", ",").split(",") if p.strip()]
+    if not points or any(not 0 < p < 80 for p in points):
+        raise ValueError("Los puntos deben estar entre 0 y 80 °C")
+    return points
+
+
+def model_for_temperature(table, temp):
+    """Modelo del punto de operación más cercano a 'temp' (o None con la tabla vacía)."""
+    if not table: return None
+    key = min(table, key=lambda k: abs(float(k) - temp))
+    return table[key]
+
+
+class AutotuneSequencer:
+    def __init__(self, tuner, esp_interface, storage=None):
+        self.tuner = tuner
+        self.esp = esp_interface
+        self.storage = storage
+        self.table = (storage.get(STORAGE_KEY) if storage is not None else None) or {}
+
+        self.state = IDLE
+        self.points = []
+        self.index = 0
+        self.status = "Listo."
+        self.detector = SteadyStateDetector(window_s=120.0, abs_tol=0.3, min_rise=0.0)
+        self.initial_sp = None
+        self.last_sp = None
+        self._reset_point()
+
+    @property
+    def active(self):
+        return self.state in (SETTLING, STEPPING)
+
+    @property
+    def current_point(self):
+        return self.points[self.index] if self.index < len(self.points) else None
+
+    def _reset_point(self):
+        self.state_since = None
+        self.hold_power = None
+        self.step_power = None
+        self.detector.reset()
+
+    # --- CONTROL ---
+    def start(self, points):
+        """Arranca la secuencia (False si hay un ensayo en curso o el firmware no tiene potencia manual)."""
+        if self.active or self.tuner.testing: return False
+        if not self.esp.manual_power_supported: return False
+        self.points = sorted(points)
+        self.index = 0
+        self.initial_sp = self.last_sp   # Se restaura al terminar
+        self._goto_point()
+        return True
+
+    def abort(self, reason="Cancelado"):
+        if not self.active: return
+        if self.tuner.recording:
+            self.tuner.stop_recording()
+        self.esp.send_auto_tune_cmd(False)
+        self._restore_setpoint()
+        self.state = ABORTED
+        self.status = f"Secuencia abortada: {reason}"
+        print(f"[Secuencia] {self.status}")
+
+    def _goto_point(self):
+        self._reset_point()
+        if self.current_point is None:
+            self._restore_setpoint()
+            self.state = DONE
+            self.status = f"Secuencia terminada: {len(self.table)} puntos en la tabla."
+            return
+        self.state = SETTLING
+        self.esp.send_setpoint_only(self.current_point)
+        self.status = f"Punto {self.index + 1}/{len(self.points)}: estabilizando en {self.current_point:.0f}°C..."
+
+    def _restore_setpoint(self):
+        if self.initial_sp is not None:
+            self.esp.send_setpoint_only(self.initial_sp)
+
+    # --- BUCLE (llamado por cada muestra) ---
+    def tick(self, t, temp, sp, out_percent):
+        self.last_sp = sp
+        if not self.active: return
+        if self.state_since is None: self.state_since = t
+        elapsed = t - self.state_since
+
+        if self.state == SETTLING:
+            self.detector.update(t, temp)
+            # Potencia de sostenimiento: media exponencial de la salida del PID
+            self.hold_power = out_percent if self.hold_power is None else 0.98 * self.hold_power + 0.02 * out_percent
+
+            near = self.detector.mean is not None and abs(self.detector.mean - self.current_point) <= SETTLE_BAND
+            if near and self.detector.settled:
+                self._start_step(temp)
+            elif elapsed > SETTLE_TIMEOUT:
+                self.abort(f"no se estabilizó en {self.current_point:.0f}°C")
+
+        elif self.state == STEPPING:
+            if self.tuner.recording:
+                if elapsed > STEP_TIMEOUT:
+                    self.tuner.auto_stop("Tiempo máximo de escalón")
+            elif not self.tuner.identifying:
+                # El ajuste final corre fuera del loop: se espera su resultado
+                self._finish_step()
+
+    def _step_size(self, point):
+        """Delta de potencia: que la subida prevista no pase de SAFETY_LIMIT."""
+        model = self.tuner.safety_model()
+        if model and model['Kp'] > 0:
+            room = min(10.0, SAFETY_LIMIT - point)
+            step = min(MAX_STEP, room / model['Kp'])
+        else:
+            step = DEFAULT_STEP
+        return min(step, 100.0 - (self.hold_power or 0.0))
+
+    def _start_step(self, temp):
+        point = self.current_point
+        self.step_power = self._step_size(point)
+        if self.step_power < MIN_STEP:
+            self.abort("sin margen de potencia para el escalón")
+            return
+
+        self.esp.send_auto_tune_cmd(True)
+        if not self.esp.send_manual_power(self.hold_power + self.step_power):
+            self.abort("el firmware rechazó la potencia manual")
+            return
+        self.tuner.start_recording(temp, step_power=self.step_power)
+        self.state = STEPPING
+        self.state_since = None
+        self.status = (f"Punto {self.index + 1}/{len(self.points)}: escalón "
+                       f"{self.hold_power:.0f}%→{self.hold_power + self.step_power:.0f}% en {point:.0f}°C...")
+
+    def _finish_step(self):
+        model = self.tuner.last_identified_model
+        self.esp.send_auto_tune_cmd(False)
+        if model:
+            entry = {k: model.get(k) for k in ("Kp", "tau", "theta", "r2")}
+            entry["hold_power"] = round(self.hold_power, 1)
+            entry["step_power"] = round(self.step_power, 1)
+            self.table[f"{self.current_point:g}"] = entry
+            if self.storage is not None: self.storage.set(STORAGE_KEY, self.table)
+            print(f"[Secuencia] {self.current_point:g}°C -> {entry}")
+        else:
+            print(f"[Secuencia] {self.current_point:g}°C: sin modelo válido")
+        self.index += 1
+        self._goto_point()
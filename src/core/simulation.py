@@ -0,0 +1,112 @@
+# src/core/simulation.py
+"""
+Motor de simulación en lazo cerrado: planta FOPDT + PID (salida 0-100%).
+
+La planta usa la discretización EXACTA con retenedor de orden cero (ZOH):
+    x[k+1] = a*x[k] + K*(1-a)*u[k-d],   a = exp(-dt/tau),  d = round(theta/dt)
+Es exacta para cualquier dt (no diverge con tau pequeño frente a dt como
+Euler), así que el paso puede ser mucho más grueso para la misma precisión.
+
+- simulate_closed_loop(): una curva (PIDController + ThermalSimulator.advance).
+- simulate_closed_loop_batch(): muchas curvas a la vez (closed_loop_batch,
+  NumPy, un eje por candidato).
+- simulate_closed_loop_cached(): simulate_closed_loop() detrás de una caché
+  LRU (memoria acotada) para no repetir curvas con las mismas entradas.
+
+El PID y la planta viven en src/core/pid_logic.py (compartidos con
+SimulationView): anti-windup y derivada sobre la medida en todos lados.
+Son funciones puras sin Flet: se pueden llamar desde un hilo de trabajo o
+un proceso aparte.
+"""
+import sys
+import numpy as np
+
+from src.core.lru_cache import LRUCache
+from src.core.pid_logic import PIDController, ThermalSimulator, closed_loop_batch
+
+MIN_DT = 0.2
+MAX_STEPS = 300     # Pasos por curva cuando el horizonte lo permite
+MEMO_MAX_ENTRIES = 128
+MEMO_MAX_BYTES = 4 * 1024 * 1024
+
+
+def choose_dt(tau, theta, horizon):
+    """
+    Paso de simulación: ~MAX_STEPS pasos por curva, pero sin superar tau/5
+    (resolución de la dinámica) ni theta/2 (resolución del retardo).
+    """
+    dt = horizon / MAX_STEPS
+    dt = min(dt, tau / 5.0)
+    if theta > 0: dt = min(dt, theta / 2.0)
+    return max(MIN_DT, dt)
+
+
+def simulate_closed_loop(model, kp, ki, kd, sp, start_temp, horizon, dt=None):
+    """
+    Simula la respuesta del horno con el PID dado.
+    model: {"Kp", "tau", "theta"}. Retorna (tiempos, temperaturas) como listas.
+    """
+    K_proc = model.get('Kp', 1.5)
+    tau = model.get('tau', 30.0)
+    theta = model.get('theta', 5.0)
+
+    if dt is None: dt = choose_dt(tau, theta, horizon)
+    steps = int(horizon / dt)
+
+    # Temperatura inicial = equilibrio sin potencia (desviación cero)
+    plant = ThermalSimulator(gain=K_proc, tau=tau, dead_time=theta, ambient=start_temp, dt=dt)
+    pid = PIDController(kp, ki, kd, setpoint=sp, dt=dt)
+    temps, _ = plant.advance(steps, controller=pid)
+
+    return [(i + 1) * dt for i in range(steps)], temps.tolist()
+
+
+def simulate_closed_loop_batch(K, tau, theta, kp, ki, kd, sp, start_temp, horizon, dt=None):
+    """
+    Versión vectorizada: cada argumento de planta/ganancias puede ser escalar
+    o arreglo de largo n (se difunden entre sí).
+    Retorna (t[steps], Y[n, steps], U[n, steps]).
+    """
+    if dt is None:
+        dt = choose_dt(float(np.min(tau)), float(np.min(theta)), horizon)
+    steps = int(horizon / dt)
+    Y, U = closed_loop_batch(K, tau, theta, kp, ki, kd, sp, start_temp, dt, steps)
+    return np.arange(1, steps + 1) * dt, Y, U
+
+
+# --- MEMOIZACIÓN ---
+def _curve_nbytes(curve):
+    """Memoria aproximada de (tiempos, temperaturas): listas + floats."""
+    times, temps = curve
+    per_item = sys.getsizeof(0.0)
+    return sys.getsizeof(times) + sys.getsizeof(temps) + per_item * (len(times) + len(temps))
+
+
+SIMULATION_MEMO = LRUCache(MEMO_MAX_ENTRIES, max_bytes=MEMO_MAX_BYTES, sizeof=_curve_nbytes)
+
+
+def simulation_key(model, kp, ki, kd, sp, start_temp, horizon):
+    """Clave redondeada: cambios por debajo de la resolución de la UI no re-simulan."""
+    return (
+        round(model.get('Kp', 1.5), 4), round(model.get('tau', 30.0), 2), round(model.get('theta', 5.0), 2),
+        round(kp, 4), round(ki, 5), round(kd, 4),
+        round(sp, 2), round(start_temp, 2), round(horizon, 1),
+    )
+
+
+def peek_simulation(model, kp, ki, kd, sp, start_temp, horizon):
+    """Curva memorizada o None (sin simular). Las listas son compartidas: no modificarlas."""
+    return SIMULATION_MEMO.get(simulation_key(model, kp, ki, kd, sp, start_temp, horizon))
+
+
+def simulate_closed_loop_cached(model, kp, ki, kd, sp, start_temp, horizon, count=True):
+    """
+    Igual que simulate_closed_loop() pero consultando primero la caché.
+    count=False: la consulta ya se contabilizó antes (p.ej. con peek_simulation).
+    """
+    key = simulation_key(model, kp, ki, kd, sp, start_temp, horizon)
+    curve = SIMULATION_MEMO.get(key, count=count)
+    if curve is None:
+        curve = simulate_closed_loop(model, kp, ki, kd, sp, start_temp, horizon)
+        SIMULATION_MEMO.put(key, curve)
+    return curve
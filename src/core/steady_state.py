@@ -0,0 +1,82 @@
+# src/core/steady_state.py
+from collections import deque
+import math
+
+
+class SteadyStateDetector:
+    """
+    Detector de régimen estacionario en flujo.
+
+    Mantiene una ventana deslizante de 'window_s' segundos con sumas
+    acumuladas (Σt, Σy, Σt², Σty, Σy²): cada muestra entra y sale una sola
+    vez, así que el costo es O(1) amortizado. De ahí salen la pendiente por
+    mínimos cuadrados y la varianza residual de la ventana.
+
+    La respuesta se considera asentada cuando la deriva de la recta en toda la
+    ventana (|pendiente| * window_s) queda por debajo de
+    max(abs_tol, rel_tol * subida), y la subida total supera 'min_rise'.
+    """
+
+    def __init__(self, window_s=120.0, abs_tol=0.3, rel_tol=0.02, min_rise=2.0):
+        self.window_s = window_s
+        self.abs_tol = abs_tol
+        self.rel_tol = rel_tol
+        self.min_rise = min_rise
+        self.reset()
+
+    def reset(self, base=0.0):
+        self.base = base
+        self.samples = deque()
+        self.n = 0
+        self.st = self.sy = self.stt = self.sty = self.syy = 0.0
+
+    def update(self, t, y):
+        """Agrega (t, y) y descarta lo que salió de la ventana. Retorna True si está asentada."""
+        self.samples.append((t, y))
+        self._accumulate(t, y, 1.0)
+        while t - self.samples[0][0] > self.window_s:
+            t_old, y_old = self.samples.popleft()
+            self._accumulate(t_old, y_old, -1.0)
+        return self.settled
+
+    def _accumulate(self, t, y, sign):
+        self.n += int(sign)
+        self.st += sign * t
+        self.sy += sign * y
+        self.stt += sign * t * t
+        self.sty += sign * t * y
+        self.syy += sign * y * y
+
+    # --- ESTADÍSTICOS DE LA VENTANA ---
+    @property
+    def span(self):
+        return self.samples[-1][0] - self.samples[0][0] if self.samples else 0.0
+
+    @property
+    def slope(self):
+        """Pendiente (°C/s) por mínimos cuadrados en la ventana."""
+        if self.n < 3: return None
+        sxx = self.stt - self.st * self.st / self.n
+        if sxx <= 0: return None
+        return (self.sty - self.st * self.sy / self.n) / sxx
+
+    @property
+    def mean(self):
+        return self.sy / self.n if self.n else None
+
+    @property
+    def std(self):
+        """Desviación típica de la ventana (ruido + deriva)."""
+        if self.n < 2: return None
+        var = (self.syy - self.sy * self.sy / self.n) / (self.n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    @property
+    def settled(self):
+        if self.span < 0.9 * self.window_s: return False
+        slope = self.slope
+        if slope is None: return False
+        rise = abs(self.mean - self.base)
+        if rise < self.min_rise: return False
+        drift = abs(slope) * self.window_s
+        return drift <= max(self.abs_tol, self.rel_tol * rise)
@@ -0,0 +1,35 @@
+# src/core/storage_writer.py
+"""
+Escritura de client_storage fuera del event loop.
+
+client_storage.set/remove de Flet son bloqueantes: esperan la respuesta del
+cliente, que llega por el mismo event loop. Llamados desde el loop (bucle
+global, tareas del TaskRegistry) lo congelan hasta el timeout y lanzan
+TimeoutError. Aquí las escrituras se encolan en UN hilo dedicado, así que se
+aplican en el orden pedido (un set seguido de un remove no se invierte).
+"""
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StorageWriter:
+    def __init__(self, storage):
+        self.storage = storage
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+
+    def get(self, key):
+        """Lectura directa (solo desde hilos fuera del loop, p.ej. al arrancar)."""
+        return self.storage.get(key)
+
+    def set(self, key, value):
+        # Copia: el llamador puede seguir modificando el objeto mientras se encola
+        self._executor.submit(self._run, "set", key, copy.deepcopy(value))
+
+    def remove(self, key):
+        self._executor.submit(self._run, "remove", key)
+
+    def _run(self, op, key, *args):
+        try:
+            getattr(self.storage, op)(key, *args)
+        except Exception as e:
+            print(f"[Storage] Error en {op}('{key}'): {e}")
@@ -0,0 +1,174 @@
+# src/core/task_registry.py
+import asyncio
+import threading
+import time
+
+
+class _TaskEntry:
+    """Ficha contable de una tarea de fondo."""
+
+    def __init__(self, name, owner):
+        self.name = name
+        self.owner = owner
+        self.future = None        # concurrent.futures.Future devuelto por page.run_task
+        self.gate = None          # asyncio.Event (abierto = corriendo, cerrado = en pausa)
+        self.paused = False
+        self.started_at = time.monotonic()
+
+        # --- Contabilidad ---
+        self.cpu_time = 0.0       # Segundos de CPU consumidos en el hilo del event loop
+        self.wakeups = 0          # Veces que la corrutina fue reanudada
+
+
+class _InstrumentedCoroutine:
+    """
+    Envoltura que conduce a la corrutina real paso a paso y mide cuánto CPU
+    consume cada reanudación. Cancelaciones y excepciones se reenvían tal cual.
+    """
+
+    def __init__(self, coro, entry):
+        self.coro = coro
+        self.entry = entry
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            t0 = time.thread_time()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.entry.cpu_time += time.thread_time() - t0
+                self.entry.wakeups += 1
+
+            try:
+                value, error = (yield yielded), None
+            except BaseException as ex:
+                value, error = None, ex
+
+
+class TaskRegistry:
+    """
+    Dueño único de todas las corrutinas de larga duración de la app.
+
+    - spawn(): lanza la tarea en el loop de Flet (reemplaza a page.run_task).
+    - pause()/resume(): congela las tareas de un dueño sin despertarlas.
+    - cancel()/cancel_owner()/shutdown(): cancelación real (asyncio.CancelledError).
+    - stats(): tareas vivas con su tiempo de CPU y número de despertares.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.lock = threading.Lock()
+        self.entries = {}                 # name -> _TaskEntry
+        self.by_task = {}                 # asyncio.Task -> _TaskEntry (para checkpoint)
+
+    # --- 1. CICLO DE VIDA ---
+    def spawn(self, name, coro_func, *args, owner=None):
+        """
+        Lanza coro_func(*args) como tarea registrada.
+        Si ya existe una tarea viva con el mismo nombre, se cancela primero
+        (evita fugas cuando una vista o petición se relanza).
+        """
+        self.cancel(name)
+
+        entry = _TaskEntry(name, owner)
+        with self.lock:
+            self.entries[name] = entry
+        entry.future = self.page.run_task(self._run, entry, coro_func, args)
+        return entry.future
+
+    async def _run(self, entry, coro_func, args):
+        task = asyncio.current_task()
+        entry.gate = asyncio.Event()
+        if not entry.paused:
+            entry.gate.set()
+
+        with self.lock:
+            self.by_task[task] = entry
+        try:
+            return await _InstrumentedCoroutine(coro_func(*args), entry)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[Tasks] '{entry.name}' terminó con error: {e}")
+        finally:
+            with self.lock:
+                self.by_task.pop(task, None)
+                if self.entries.get(entry.name) is entry:
+                    del self.entries[entry.name]
+
+    def cancel(self, name):
+        with self.lock:
+            entry = self.entries.pop(name, None)
+        if entry and entry.future:
+            entry.future.cancel()
+
+    def cancel_owner(self, owner):
+        with self.lock:
+            names = [n for n, e in self.entries.items() if e.owner is owner]
+        for name in names:
+            self.cancel(name)
+
+    def shutdown(self):
+        """Cancela todo (cierre de la app)."""
+        with self.lock:
+            names = list(self.entries)
+        for name in names:
+            self.cancel(name)
+
+    # --- 2. PAUSA / REANUDACIÓN ---
+    def pause(self, owner):
+        self._set_paused(owner, True)
+
+    def resume(self, owner):
+        self._set_paused(owner, False)
+
+    def _set_paused(self, owner, paused):
+        with self.lock:
+            targets = [e for e in self.entries.values() if e.owner is owner]
+        for entry in targets:
+            entry.paused = paused
+            if entry.gate is None:
+                continue  # _run todavía no arrancó; leerá entry.paused
+            action = entry.gate.clear if paused else entry.gate.set
+            # Los handlers de Flet corren en hilos: el Event se toca desde el loop
+            self.page.loop.call_soon_threadsafe(action)
+
+    async def checkpoint(self):
+        """
+        Llamar al inicio de cada iteración de un bucle registrado.
+        Si la tarea está en pausa, espera aquí sin consumir despertares.
+        """
+        entry = self.by_task.get(asyncio.current_task())
+        if entry and entry.gate and not entry.gate.is_set():
+            await entry.gate.wait()
+
+    # --- 3. CONTABILIDAD ---
+    def live_count(self):
+        with self.lock:
+            return len(self.entries)
+
+    def stats(self):
+        """Lista de tareas vivas ordenada por CPU consumido (mayor primero)."""
+        now = time.monotonic()
+        with self.lock:
+            entries = list(self.entries.values())
+
+        rows = []
+        for e in entries:
+            age = max(now - e.started_at, 1e-6)
+            rows.append({
+                "name": e.name,
+                "state": "pausada" if e.paused else "activa",
+                "cpu_ms": round(e.cpu_time * 1000.0, 1),
+                "wakeups": e.wakeups,
+                "wakeups_per_s": round(e.wakeups / age, 2),
+                "age_s": round(age, 1),
+            })
+        rows.sort(key=lambda r: r["cpu_ms"], reverse=True)
+        return rows
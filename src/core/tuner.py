@@ -1,12 +1,36 @@
 # src/core/tuner.py
+import asyncio
 import math
 import time
+from bisect import bisect_left
+from src.core.identification import fit_fopdt, fit_sopdt
+from src.core.online_estimator import OnlineFOPDTEstimator
+from src.core.relay_tuner import RelayAutotuner
+from src.core.steady_state import SteadyStateDetector
+from src.core.safety_guard import PredictiveSafetyGuard
+
+FIT_CHECK_INTERVAL = 30.0   # s de grabación entre ajustes de convergencia
+FIT_CONVERGED_TOL = 0.03    # Cambio relativo máx. de K y tau entre ajustes
+FIT_CONVERGED_RUNS = 3      # Ajustes consecutivos estables para dar por terminado
+FIT_MIN_R2 = 0.98
+
+
+def _identify_fopdt(time_data, temp_data, base_temp, step_power):
+    """Ajustes FOPDT + SOPDT de la grabación (corre en el executor, no en el loop)."""
+    model = fit_fopdt(time_data, temp_data, base_temp, step_power)
+    if model is None: return None
+    model["sopdt"] = fit_sopdt(time_data, temp_data, base_temp, step_power, model)
+    return model
 
 class StepResponseAnalyzer:
-    def __init__(self):
+    def __init__(self, esp_interface=None):
+        # Interfaz opcional: permite cortar el ensayo por sí mismo (parada automática)
+        self.esp = esp_interface
+
         # --- Datos Históricos (Gráfica) ---
         self.time_data = []
         self.temp_data = []
+        self._envelope = None   # Índice de cruces (se reconstruye si cambian los datos)
         
         # --- Estado en Vivo (Para UI sin leer socket) ---
         self.latest_temp = 0.0
@@ -20,86 +44,313 @@ class StepResponseAnalyzer:
         
         # --- Resultado (Persistencia) ---
         self.last_identified_model = None
+        self.identifying = False   # Ajuste final en curso (fuera del loop)
+        self._session = 0          # Descarta resultados de ensayos anteriores
+
+        # --- Parada automática ---
+        self.steady_detector = SteadyStateDetector()
+        self.auto_stop_enabled = True
+        self.stop_reason = None
+        self._last_fit_check = 0.0
+        self._last_fit = None
+        self._stable_fits = 0
+        self._fit_pending = False
+
+        # --- Estimador en línea (RLS, funciona en operación normal) ---
+        self.online_estimator = OnlineFOPDTEstimator()
+
+        # --- Seguridad predictiva (proyección sobre el tiempo muerto) ---
+        self.safety_guard = PredictiveSafetyGuard(limit=80.0)
+
+        # --- Autosintonía por relé ---
+        self.relay = None
+        self.relay_result = None
+
+    @property
+    def relay_active(self):
+        return self.relay is not None
+
+    @property
+    def testing(self):
+        """Hay un ensayo en curso (escalón o relé): el horno no está bajo el PID."""
+        return self.recording or self.relay_active
+
+    @property
+    def current_model_estimate(self):
+        """Modelo FOPDT en línea {"Kp", "tau", "theta", "confidence"} o None."""
+        return self.online_estimator.estimate()
 
     def start_recording(self, current_temp, step_power=100.0):
         """Inicia sesión de grabación."""
         self.time_data = []
         self.temp_data = []
+        self._envelope = None
         self.base_temp = current_temp
         self.step_power = float(step_power)
         
         self.recording = True
         self.start_time = time.time()
         self.last_identified_model = None
+        self.identifying = False
+        self._session += 1
+
+        self.steady_detector.reset(base=current_temp)
+        self.stop_reason = None
+        self._last_fit_check = 0.0
+        self._last_fit = None
+        self._stable_fits = 0
+        self._fit_pending = False
         
         print(f"[Tuner] Rec ON. T0: {current_temp}°C")
 
-    def update_live_data(self, temp, out_percent):
+    def update_live_data(self, temp, out_percent, safety_temp=None):
         """
         Actualiza los datos en vivo.
         Llamado desde main.py constantemente (aunque no estemos grabando).
+        'safety_temp' es la lectura para la proyección de seguridad (la cruda:
+        el filtro de telemetría atrasa y recorta picos); por defecto, 'temp'.
         """
         self.latest_temp = temp
         self.latest_out = out_percent
 
-        # Si estamos grabando, guardamos en el historial también
-        if self.recording:
+        # Estimador RLS: O(1) por muestra, también en lazo cerrado
+        t_mono = time.monotonic()
+        self.online_estimator.update(t_mono, temp, out_percent)
+
+        # Proyección de seguridad: O(1) por muestra
+        self.safety_guard.update(t_mono, temp if safety_temp is None else safety_temp,
+                                 out_percent, self.safety_model())
+
+        # Si estamos grabando (o en ensayo de relé), guardamos en el historial también
+        if self.testing:
             t_rel = time.time() - self.start_time
             self.time_data.append(t_rel)
             self.temp_data.append(temp)
 
+            if self.recording and self.auto_stop_enabled:
+                self._check_auto_stop(t_rel, temp)
+
+    @property
+    def predicted_temp(self):
+        """Temperatura proyectada al final del tiempo muerto (o None)."""
+        return self.safety_guard.prediction
+
+    def safety_model(self):
+        """
+        Mejor modelo disponible para la proyección de seguridad: el ajuste en
+        curso del ensayo, el último identificado o el estimador en línea.
+        """
+        if self.recording and self._last_fit and self._last_fit['r2'] >= FIT_MIN_R2:
+            return self._last_fit
+        if self.last_identified_model:
+            return self.last_identified_model
+        estimate = self.online_estimator.estimate()
+        if estimate and estimate['confidence'] >= 0.3:
+            return estimate
+        return None
+
+    # --- PARADA AUTOMÁTICA DEL ESCALÓN ---
+    def _check_auto_stop(self, t_rel, temp):
+        """O(1) por muestra (detector); el ajuste de convergencia solo cada FIT_CHECK_INTERVAL."""
+        if self.steady_detector.update(t_rel, temp):
+            self.auto_stop("Régimen estacionario alcanzado")
+            return
+
+        if t_rel - self._last_fit_check >= FIT_CHECK_INTERVAL and not self._fit_pending:
+            # El ajuste corre en el executor sobre una copia; el resultado llega después
+            self._last_fit_check = t_rel
+            self._fit_pending = True
+            session = self._session
+            args = (list(self.time_data), list(self.temp_data), self.base_temp, self.step_power)
+            self._off_loop(fit_fopdt, args, lambda fit: self._on_convergence_fit(session, t_rel, fit))
+
+    def _on_convergence_fit(self, session, t_rel, fit):
+        if session != self._session: return
+        self._fit_pending = False
+        if self.recording and self._fit_converged(fit, t_rel):
+            self.auto_stop("Modelo convergido")
+
+    def _fit_converged(self, fit, t_rel):
+        """
+        True si los últimos ajustes FOPDT coinciden (K y tau dentro de
+        FIT_CONVERGED_TOL) y la grabación ya cubre theta + 2*tau (86%).
+        """
+        prev, self._last_fit = self._last_fit, fit
+        if not fit or not prev or fit['r2'] < FIT_MIN_R2:
+            self._stable_fits = 0
+            return False
+
+        stable = all(abs(fit[k] - prev[k]) <= FIT_CONVERGED_TOL * abs(prev[k]) for k in ("Kp", "tau"))
+        self._stable_fits = self._stable_fits + 1 if stable else 0
+        return self._stable_fits >= FIT_CONVERGED_RUNS and t_rel >= fit['theta'] + 2.0 * fit['tau']
+
+    def auto_stop(self, reason):
+        """Termina la grabación por sí mismo y devuelve el control al PID del ESP32."""
+        print(f"[Tuner] Parada automática: {reason}")
+        self.stop_reason = reason
+        self.stop_recording()
+        if self.esp: self.esp.send_auto_tune_cmd(False)
+
+    # --- AUTOSINTONÍA POR RELÉ ---
+    def start_relay(self, setpoint, amplitude=50.0, bias=50.0):
+        """Inicia el ensayo de relé alrededor del setpoint (la potencia la manda main.py)."""
+        self.time_data = []
+        self.temp_data = []
+        self._envelope = None
+        self.base_temp = self.latest_temp
+        self.start_time = time.time()
+        self.relay_result = None
+        self.identifying = False
+        self._session += 1
+        self.relay = RelayAutotuner(setpoint, amplitude, bias)
+        print(f"[Tuner] Relé ON. SP: {setpoint}°C")
+
+    def relay_step(self, temp):
+        """
+        Avanza el relé con la muestra nueva. Retorna la potencia (%) a enviar
+        si hay que conmutar, o None. Al converger deja el resultado en
+        relay_result y el relé queda inactivo.
+        """
+        if self.relay is None: return None
+        power = self.relay.update(time.monotonic(), temp)
+        if self.relay.finished:
+            self.relay_result = self.relay.result(static_gain=self._static_gain_hint())
+            self.relay = None
+            print(f"[Tuner] Relé OFF. Resultado: {self.relay_result}")
+        return power
+
+    def stop_relay(self):
+        """Cancela el ensayo de relé sin resultado."""
+        self.relay = None
+
+    def _static_gain_hint(self):
+        """Ganancia estática conocida (escalón previo o estimador en línea confiable)."""
+        if self.last_identified_model:
+            return self.last_identified_model['Kp']
+        estimate = self.online_estimator.estimate()
+        if estimate and estimate['confidence'] >= 0.5:
+            return estimate['Kp']
+        return None
+
     def stop_recording(self):
-        """Detiene y calcula el modelo."""
+        """
+        Detiene la grabación y calcula el modelo: Kp, Tau, Theta por mínimos
+        cuadrados sobre TODAS las muestras (ver src/core/identification.py),
+        más el ajuste SOPDT y la calidad (RMSE, R²). Los ajustes corren fuera
+        del loop: el modelo queda en last_identified_model cuando
+        'identifying' vuelve a False.
+        """
+        if not self.recording: return
         self.recording = False
-        self.last_identified_model = self._identify_fopdt_model()
-        return self.last_identified_model
+        self.identifying = True
+        session = self._session
+        # Sin copia: detenida la grabación nadie agrega muestras (un ensayo nuevo crea otras listas)
+        args = (self.time_data, self.temp_data, self.base_temp, self.step_power)
+        self._off_loop(_identify_fopdt, args, lambda model: self._on_identified(session, model))
 
-    def _identify_fopdt_model(self):
-        """Calcula Kp, Tau, Theta (Método 2 puntos)."""
-        if len(self.temp_data) < 10: return None
+    def _on_identified(self, session, model):
+        if session != self._session: return   # Empezó otro ensayo entretanto
+        if model:
+            model["multipoint"] = self.multipoint_estimates(model["delta_temp"])
+        self.last_identified_model = model
+        self.identifying = False
+        print(f"[Tuner] Modelo identificado: {model}")
 
-        final_temp = sum(self.temp_data[-5:]) / 5.0
-        delta_temp = final_temp - self.base_temp
+    def _off_loop(self, fn, args, on_done):
+        """
+        Corre fn(*args) en el executor del event loop y entrega el resultado a
+        on_done en el hilo del loop. Fuera del loop (handlers de Flet) corre
+        directo: ahí no bloquea nada.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            on_done(fn(*args))
+            return
 
-        if delta_temp <= 2.0: return None
+        def _done(future):
+            try:
+                result = future.result()
+            except (Exception, asyncio.CancelledError) as e:
+                print(f"[Tuner] Error en el ajuste: {e}")
+                result = None
+            on_done(result)
 
-        Kp = delta_temp / self.step_power
+        loop.run_in_executor(None, fn, *args).add_done_callback(_done)
 
-        target_t1 = self.base_temp + (delta_temp * 0.283)
-        target_t2 = self.base_temp + (delta_temp * 0.632)
+    # --- ÍNDICE DE CRUCES (ENVOLVENTE MONÓTONA) ---
+    def _crossing_index(self):
+        """
+        Envolvente inferior monótona: env[i] = min(temp[i:]).
+        Es no decreciente, así que cualquier cruce se resuelve con búsqueda
+        binaria, y un pico espurio hacia arriba NO adelanta el cruce (cuenta
+        el último instante en que la señal estuvo por debajo del objetivo).
+        Se construye una vez (O(n)) y se reutiliza hasta que lleguen muestras.
+        """
+        n = len(self.temp_data)
+        if self._envelope is None or len(self._envelope) != n:
+            env = [0.0] * n
+            running = math.inf
+            for i in range(n - 1, -1, -1):
+                v = self.temp_data[i]
+                if v < running: running = v
+                env[i] = running
+            self._envelope = env
+        return self._envelope
 
-        t1 = self._find_time_at_temp(target_t1)
-        t2 = self._find_time_at_temp(target_t2)
+    def _find_time_at_temp(self, target_temp):
+        env = self._crossing_index()
+        i = bisect_left(env, target_temp)
+        if i == 0 or i >= len(env): return None
 
-        if t1 is None or t2 is None: return None
+        lo, hi = env[i - 1], env[i]
+        ratio = (target_temp - lo) / (hi - lo) if hi > lo else 1.0
+        return self.time_data[i - 1] + (self.time_data[i] - self.time_data[i - 1]) * ratio
 
-        tau = 1.5 * (t2 - t1)
-        theta = t2 - tau
+    def crossing_times(self, fractions, delta_temp):
+        """Tiempos en que la respuesta alcanza cada fracción de delta_temp (None si no llega)."""
+        return [self._find_time_at_temp(self.base_temp + delta_temp * f) for f in fractions]
 
-        if theta < 0.1: theta = 0.5
-        if tau < 1.0: tau = 1.0
+    def multipoint_estimates(self, delta_temp, step_power=None):
+        """
+        Estimaciones FOPDT por métodos de dos puntos sobre el índice de cruces:
+        - Smith (28.3% / 63.2%)
+        - Sundaresan–Krishnaswamy (35.3% / 85.3%)
+        - Promedio de los métodos disponibles
+        """
+        if delta_temp <= 0 or not self.temp_data: return {}
+        step_power = step_power or self.step_power
+        Kp = delta_temp / step_power
 
-        return {
-            "Kp": round(Kp, 4),    
-            "tau": round(tau, 2),  
-            "theta": round(theta, 2), 
-            "delta_temp": round(delta_temp, 1)
-        }
+        t283, t353, t632, t853 = self.crossing_times((0.283, 0.353, 0.632, 0.853), delta_temp)
+        results = {}
+        if t283 is not None and t632 is not None:
+            tau = 1.5 * (t632 - t283)
+            results["smith"] = {"Kp": Kp, "tau": tau, "theta": t632 - tau}
+        if t353 is not None and t853 is not None:
+            results["sk"] = {"Kp": Kp, "tau": 0.67 * (t853 - t353), "theta": 1.3 * t353 - 0.29 * t853}
 
-    def _find_time_at_temp(self, target_temp):
-        for i in range(len(self.temp_data) - 1):
-            curr = self.temp_data[i]
-            next_t = self.temp_data[i+1]
-            if (curr <= target_temp <= next_t):
-                denom = next_t - curr
-                if denom == 0: continue
-                ratio = (target_temp - curr) / denom
-                return self.time_data[i] + (self.time_data[i+1] - self.time_data[i]) * ratio
-        return None
+        if results:
+            n = len(results)
+            results["average"] = {
+                key: sum(m[key] for m in results.values()) / n for key in ("Kp", "tau", "theta")
+            }
+        for m in results.values():
+            m["Kp"] = round(m["Kp"], 4)
+            m["tau"] = round(max(m["tau"], 1.0), 2)
+            m["theta"] = round(max(m["theta"], 0.1), 2)
+        return results
 
     def calculate_imc_pid(self, model, lambda_val=None):
         if not model: return (0, 0, 0)
         Kp_proc, tau, theta = model['Kp'], model['tau'], model['theta']
+
+        # Modelo incierto (intervalos bootstrap): sintonía para el peor caso
+        # plausible, ganancia y tiempo muerto en su extremo superior.
+        ci = model.get('ci')
+        if ci:
+            Kp_proc = max(Kp_proc, ci['Kp'][1])
+            theta = max(theta, ci['theta'][1])
         
         # --- MODIFICACIÓN 1: Lambda más agresivo por defecto ---
         if lambda_val is None: lambda_val = tau * 0.5 
@@ -0,0 +1,93 @@
+# src/utils/chart_series.py
+from bisect import bisect_left, bisect_right
+import flet as ft
+
+
+class ChartSeries:
+    """
+    Adaptador entre columnas numéricas crudas (listas / array('d')) y un
+    ft.LineChartData.
+
+    - Solo se materializa la ventana visible [x_min, x_max] (búsqueda binaria).
+    - La ventana se diezma a ~1 punto por píxel (mín/máx por tramo para no
+      perder picos).
+    - Los objetos LineChartDataPoint se reutilizan entre cuadros: la memoria
+      de la gráfica no depende del largo del historial.
+    """
+
+    def __init__(self, line: ft.LineChartData, max_points=300):
+        self.line = line
+        self.max_points = max_points
+        self.pool = []  # LineChartDataPoint reutilizables
+
+    def render(self, xs, ys, x_min=None, x_max=None, width_px=None):
+        """
+        Actualiza line.data_points con la ventana visible de (xs, ys).
+        xs debe ser creciente. Retorna la cantidad de puntos dibujados.
+        """
+        lo, hi = self._visible_range(xs, x_min, x_max)
+        budget = self.max_points
+        if width_px:
+            budget = max(2, min(budget, int(width_px)))
+
+        if hi - lo <= budget:
+            indices = range(lo, hi)
+        else:
+            indices = self._decimate(ys, lo, hi, budget)
+
+        # Materializar sobre el pool (se crean objetos solo si el pool es corto)
+        pool = self.pool
+        n = 0
+        for i in indices:
+            if n < len(pool):
+                point = pool[n]
+                point.x, point.y = xs[i], ys[i]
+            else:
+                point = ft.LineChartDataPoint(x=xs[i], y=ys[i])
+                pool.append(point)
+            n += 1
+
+        self.line.data_points = pool[:n]
+        return n
+
+    def clear(self):
+        self.line.data_points = []
+
+    # --- AUXILIARES ---
+    @staticmethod
+    def _visible_range(xs, x_min, x_max):
+        n = len(xs)
+        lo = 0 if x_min is None else bisect_left(xs, x_min)
+        hi = n if x_max is None else bisect_right(xs, x_max)
+        # Un punto extra a cada lado para que la línea llegue a los bordes
+        return max(0, lo - 1), min(n, hi + 1)
+
+    @staticmethod
+    def _decimate(ys, lo, hi, budget):
+        """Índices del mínimo y máximo de cada tramo (en orden temporal)."""
+        buckets = max(1, budget // 2)
+        span = (hi - lo) / buckets
+        indices = []
+        for b in range(buckets):
+            start = lo + int(b * span)
+            end = lo + int((b + 1) * span) if b < buckets - 1 else hi
+            if end <= start:
+                continue
+            i_min = i_max = start
+            y_min = y_max = ys[start]
+            for i in range(start + 1, end):
+                y = ys[i]
+                if y < y_min:
+                    y_min, i_min = y, i
+                elif y > y_max:
+                    y_max, i_max = y, i
+            if i_min == i_max:
+                indices.append(i_min)
+            elif i_min < i_max:
+                indices.extend((i_min, i_max))
+            else:
+                indices.extend((i_max, i_min))
+        # El último punto siempre visible (valor en vivo)
+        if indices and indices[-1] != hi - 1:
+            indices.append(hi - 1)
+        return indices
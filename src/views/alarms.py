@@ -2,24 +2,47 @@
 import flet as ft
 import asyncio
 from src.utils.theme import AppTheme
+from src.core.recipe import RECIPES_KEY, parse_recipe
+from src.core.alarm_manager import DEFAULT_TIMER
+from src.core.alarm_rules import DEFAULT_ALARM_RULES
 
 class AlarmsView(ft.Container):
-    def __init__(self, alarm_manager, page: ft.Page):
+    def __init__(self, alarm_manager, page: ft.Page, task_registry, recipe_runner=None):
         super().__init__()
         self.manager = alarm_manager
+        self.recipes = recipe_runner
         self.page = page
+        self.tasks = task_registry
         self.expand = True
         self.padding = 20
-        self.ui_running = True 
         
+        self.timer_rows = {}   # nombre -> fila de temporizadores secundarios
         self.build_ui()
         
-        # Iniciamos tarea visual para actualizar el cronómetro
-        self.page.run_task(self.update_timer_visuals)
+        # El AlarmManager empuja el tiempo restante (sin sondeo)
+        self.manager.subscribe(self.on_timer_push)
+        self.restore_timers()
+
+        # Progreso de la receta y alarmas activas (los avanza el bucle global)
+        self.tasks.spawn("alarms.status_visuals", self.update_status_visuals, owner=self)
 
     def did_unmount(self):
         # Detener el bucle visual al salir de la pantalla
-        self.ui_running = False
+        self.manager.unsubscribe(self.on_timer_push)
+        self.tasks.cancel_owner(self)
+
+    # --- CICLO DE VIDA (CACHÉ DE VISTAS) ---
+    def suspend(self):
+        """Oculta: deja de recibir tics y pausa el bucle de la receta."""
+        self.manager.unsubscribe(self.on_timer_push)
+        self.tasks.pause(self)
+
+    def resume(self):
+        """Al volver a la pestaña: re-suscribirse y redibujar el estado actual."""
+        self.manager.subscribe(self.on_timer_push)
+        self.restore_timers()
+        self.tasks.resume(self)
+        if self.page: self.update()
 
     def build_ui(self):
         # --- INPUTS ---
@@ -58,6 +81,18 @@ class AlarmsView(ft.Container):
         
         self.lbl_status = ft.Text("Listo", color="grey", size=16)
 
+        # --- TEMPORIZADORES SECUNDARIOS (con nombre, sin tocar el SP) ---
+        self.tf_timer_name = ft.TextField(
+            label="Nombre", width=130, text_size=14,
+            border_color="white54", color="white", cursor_color="white"
+        )
+        self.tf_timer_minutes = ft.TextField(
+            label="min", value="10", width=80, text_size=14,
+            keyboard_type=ft.KeyboardType.NUMBER,
+            border_color="white54", color="white", cursor_color="white"
+        )
+        self.timer_list = ft.Column(spacing=2)
+
         # --- ESTILO DE BOTONES (GHOST / TRANSPARENTES) ---
         ghost_style = ft.ButtonStyle(
             color="white",
@@ -105,6 +140,71 @@ class AlarmsView(ft.Container):
             alignment=ft.alignment.center
         )
 
+        # --- RECETAS (RAMPA / MESETA) ---
+        saved = self.page.client_storage.get(RECIPES_KEY) or {}
+        self.dd_recipes = ft.Dropdown(
+            label="Recetas", width=200,
+            options=[ft.dropdown.Option(name) for name in sorted(saved)],
+            on_change=self.handle_recipe_select
+        )
+        self.tf_recipe_name = ft.TextField(
+            label="Nombre", width=150, text_size=14,
+            border_color="white54", color="white", cursor_color="white"
+        )
+        self.tf_recipe_spec = ft.TextField(
+            label="Segmentos",
+            value=self.recipes.spec if self.recipes and self.recipes.running else "ramp:40:2,soak:20,ramp:65:1.5,soak:45,cool:30",
+            text_size=13, expand=True, font_family=AppTheme.font_mono,
+            border_color="white54", color="white", cursor_color="white"
+        )
+        self.lbl_recipe = ft.Text(
+            self.recipes.status if self.recipes else "", size=13, color="grey",
+            font_family=AppTheme.font_mono
+        )
+
+        recipe_card = ft.ExpansionTile(
+            title=ft.Text("Recetas Rampa / Meseta", size=14),
+            visible=self.recipes is not None,
+            initially_expanded=bool(self.recipes and self.recipes.running),
+            controls=[
+                ft.Container(padding=10, content=ft.Column([
+                    ft.Text("ramp:T:°C/min · soak:min · cool:T (separados por coma)", size=11, color="grey"),
+                    ft.Row([self.dd_recipes, self.tf_recipe_name], wrap=True),
+                    ft.Row([self.tf_recipe_spec]),
+                    ft.Row([
+                        ft.IconButton(icon=ft.Icons.SAVE, tooltip="Guardar receta", on_click=self.handle_recipe_save),
+                        ft.IconButton(icon=ft.Icons.PLAY_ARROW, tooltip="Ejecutar", on_click=self.handle_recipe_start),
+                        ft.IconButton(icon=ft.Icons.STOP, tooltip="Detener", on_click=self.handle_recipe_stop),
+                    ]),
+                    self.lbl_recipe
+                ]))
+            ]
+        )
+
+        # --- REGLAS DE ALARMA ---
+        self.tf_rules = ft.TextField(
+            label="Reglas", value=self.manager.rules.spec,
+            text_size=13, expand=True, font_family=AppTheme.font_mono,
+            border_color="white54", color="white", cursor_color="white"
+        )
+        self.lbl_active_alarms = ft.Text("Sin alarmas activas.", size=13, color="grey", font_family=AppTheme.font_mono)
+
+        rules_card = ft.ExpansionTile(
+            title=ft.Text("Reglas de Alarma", size=14),
+            controls=[
+                ft.Container(padding=10, content=ft.Column([
+                    ft.Text("[horno/]high|low|dev|rate|nodata:límite[:histéresis[:retardo_s]]", size=11, color="grey"),
+                    ft.Row([
+                        self.tf_rules,
+                        ft.IconButton(icon=ft.Icons.CHECK, on_click=self.handle_apply_rules),
+                        ft.IconButton(icon=ft.Icons.RESTART_ALT, tooltip="Predeterminadas",
+                                      on_click=lambda e: self.handle_apply_rules(e, DEFAULT_ALARM_RULES))
+                    ]),
+                    self.lbl_active_alarms
+                ]))
+            ]
+        )
+
         # --- LAYOUT PRINCIPAL ---
         self.content = ft.Column(
             [
@@ -120,9 +220,18 @@ class AlarmsView(ft.Container):
                 ft.Container(height=30),
                 
                 # Fila de Botones
-                ft.Row([self.btn_on, self.btn_stop, self.btn_delete], alignment=ft.MainAxisAlignment.CENTER, spacing=20)
+                ft.Row([self.btn_on, self.btn_stop, self.btn_delete], alignment=ft.MainAxisAlignment.CENTER, spacing=20),
+                ft.Container(height=20),
+                ft.Row([
+                    self.tf_timer_name, self.tf_timer_minutes,
+                    ft.IconButton(icon=ft.Icons.ADD_ALARM, tooltip="Agregar temporizador", on_click=self.handle_add_timer)
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                self.timer_list,
+                recipe_card,
+                rules_card
             ], 
-            horizontal_alignment="center"
+            horizontal_alignment="center",
+            scroll=ft.ScrollMode.AUTO
         )
 
     # --- LÓGICA DE BOTONES ---
@@ -160,35 +269,144 @@ class AlarmsView(ft.Container):
         self.update()
         self.show_snack("Temporizador Borrado", "grey")
 
+    # --- TEMPORIZADORES (EMPUJADOS POR EL ALARMMANAGER) ---
+    def handle_add_timer(self, e):
+        name = (self.tf_timer_name.value or "").strip()
+        try:
+            minutes = float(self.tf_timer_minutes.value)
+        except (TypeError, ValueError):
+            minutes = 0
+        if not name or name == DEFAULT_TIMER or minutes <= 0:
+            self.show_snack("Error: nombre y minutos válidos", "red")
+            return
+        self.manager.start_timer(name, minutes)
+        self.tf_timer_name.value = ""
+        self.tf_timer_name.update()
+
+    def restore_timers(self):
+        """Dibuja los temporizadores vivos (al construir o volver a la pestaña)."""
+        for name in list(self.timer_rows):
+            if name not in self.manager.timers: self._remove_timer_row(name)
+        for name, secs in self.manager.active_timers().items():
+            self.on_timer_push(name, secs, False, update=False)
+
+    def on_timer_push(self, name, secs_left, fired, update=True):
+        """Suscriptor del AlarmManager (hilo del loop): un llamado por segundo y al vencer."""
+        if name == DEFAULT_TIMER:
+            self.lbl_timer.value = f"{secs_left // 60:02d}:{secs_left % 60:02d}"
+            if fired:
+                self.lbl_timer.color = AppTheme.color_alarm # Rojo
+                self.lbl_status.value = "¡FINALIZADO!"
+                self.lbl_status.color = AppTheme.color_alarm
+            else:
+                self.lbl_timer.color = "white"
+                # Mantenemos el status que puso el botón ON
+            if update and self.lbl_timer.page:
+                self.lbl_timer.update()
+                self.lbl_status.update()
+            return
+
+        # Temporizador secundario: 0 sin vencer = cancelado
+        if secs_left <= 0 and not fired:
+            self._remove_timer_row(name)
+        else:
+            label = self._timer_row(name).controls[0]
+            label.value = f"{name}: {'¡FINALIZADO!' if fired else f'{secs_left // 60:02d}:{secs_left % 60:02d}'}"
+            label.color = AppTheme.color_alarm if fired else "white"
+        if update and self.timer_list.page: self.timer_list.update()
+
+    def _timer_row(self, name):
+        row = self.timer_rows.get(name)
+        if row is None:
+            row = ft.Row([
+                ft.Text("", size=16, font_family=AppTheme.font_mono),
+                ft.IconButton(icon=ft.Icons.CLOSE, tooltip="Detener",
+                              on_click=lambda e, n=name: self.manager.stop_process(n))
+            ], alignment=ft.MainAxisAlignment.CENTER)
+            self.timer_rows[name] = row
+            self.timer_list.controls.append(row)
+        return row
+
+    def _remove_timer_row(self, name):
+        row = self.timer_rows.pop(name, None)
+        if row: self.timer_list.controls.remove(row)
+
+    # --- RECETAS ---
+    def handle_recipe_select(self, e):
+        saved = self.page.client_storage.get(RECIPES_KEY) or {}
+        name = self.dd_recipes.value
+        if name in saved:
+            self.tf_recipe_name.value = name
+            self.tf_recipe_spec.value = saved[name]
+            self.update()
+
+    def handle_recipe_save(self, e):
+        name = (self.tf_recipe_name.value or "").strip()
+        if not name:
+            self.show_snack("Ponle un nombre a la receta", "red")
+            return
+        try:
+            parse_recipe(self.tf_recipe_spec.value)
+        except ValueError as ex:
+            self.show_snack(f"Receta inválida: {ex}", "red")
+            return
+
+        saved = self.page.client_storage.get(RECIPES_KEY) or {}
+        saved[name] = self.tf_recipe_spec.value
+        self.page.client_storage.set(RECIPES_KEY, saved)
+        self.dd_recipes.options = [ft.dropdown.Option(n) for n in sorted(saved)]
+        self.dd_recipes.value = name
+        self.update()
+        self.show_snack(f"Receta '{name}' guardada", "green")
+
+    def handle_recipe_start(self, e):
+        try:
+            self.recipes.start(self.tf_recipe_spec.value, name=self.tf_recipe_name.value or None)
+        except ValueError as ex:
+            self.show_snack(f"Receta inválida: {ex}", "red")
+            return
+        self.lbl_recipe.value = self.recipes.status
+        self.lbl_recipe.update()
+        self.show_snack("Receta INICIADA", "green")
+
+    def handle_recipe_stop(self, e):
+        self.recipes.stop()
+        self.lbl_recipe.value = self.recipes.status
+        self.lbl_recipe.update()
+        self.show_snack("Receta DETENIDA", "orange")
+
+    # --- REGLAS DE ALARMA ---
+    def handle_apply_rules(self, e, spec=None):
+        spec = self.tf_rules.value if spec is None else spec
+        try:
+            self.manager.configure_rules(spec)
+        except ValueError as ex:
+            self.show_snack(f"Reglas inválidas: {ex}", "red")
+            return
+        self.tf_rules.value = spec
+        self.tf_rules.update()
+        self.show_snack(f"{len(self.manager.rules.rules)} reglas activas", "green")
+
     def show_snack(self, msg, color):
         self.page.snack_bar = ft.SnackBar(ft.Text(msg), bgcolor=color, duration=1000)
         self.page.snack_bar.open = True
         self.page.update()
 
-    async def update_timer_visuals(self):
-        """Bucle que actualiza el texto del cronómetro cada 0.2s"""
-        while self.ui_running:
-            if self.manager.is_running:
-                # 1. Obtener segundos restantes reales
-                secs_left = self.manager.get_remaining_seconds()
-                
-                # 2. Formato MM:SS
-                m = secs_left // 60
-                s = secs_left % 60
-                self.lbl_timer.value = f"{m:02d}:{s:02d}"
-                
-                # 3. Colores de estado
-                if secs_left <= 0:
-                    self.lbl_timer.color = AppTheme.color_alarm # Rojo
-                    self.lbl_status.value = "¡FINALIZADO!"
-                    self.lbl_status.color = AppTheme.color_alarm
-                else:
-                    self.lbl_timer.color = "white"
-                    # Mantenemos el status que puso el botón ON
-
-                # 4. Actualizar solo si el control sigue vivo
-                if self.lbl_timer.page:
-                    self.lbl_timer.update()
-                    self.lbl_status.update()
+    async def update_status_visuals(self):
+        """Bucle lento para la receta y las alarmas activas (el cronómetro lo empuja el AlarmManager)."""
+        while True:
+            # Vista oculta (en caché): la tarea queda en pausa aquí
+            await self.tasks.checkpoint()
+
+            if self.recipes and self.lbl_recipe.value != self.recipes.status:
+                self.lbl_recipe.value = self.recipes.status
+                if self.lbl_recipe.page: self.lbl_recipe.update()
+
+            active = self.manager.rules.active_alarms()
+            text = "\n".join(rule.message for rule in active) or "Sin alarmas activas."
+            if self.lbl_active_alarms.value != text:
+                self.lbl_active_alarms.value = text
+                self.lbl_active_alarms.color = AppTheme.color_alarm if active else "grey"
+                if self.lbl_active_alarms.page: self.lbl_active_alarms.update()
             
-            await asyncio.sleep(0.2)
\ No newline at end of file
+            await asyncio.sleep(1.0)
\ No newline at end of file
@@ -7,28 +7,37 @@ import datetime
 from src.utils.theme import AppTheme
 from src.components.kpi_card import KPICard
 from src.utils.validators import InputValidator
+from src.utils.chart_series import ChartSeries
 
 class DashboardView(ft.Container):
-    def __init__(self, esp_interface, page: ft.Page, data_store):
+    def __init__(self, esp_interface, page: ft.Page, data_store, task_registry):
         super().__init__()
         self.esp = esp_interface
         self.page = page
         self.data_store = data_store
+        self.tasks = task_registry
         self.expand = True
         self.padding = 10
         
-        self.running = True
-        
         # Gestor de archivos
         self.file_picker = ft.FilePicker(on_result=self.handle_save_csv)
         self.page.overlay.append(self.file_picker)
         self.page.update()
 
         self.build_ui()
-        self.page.run_task(self.update_loop)
+        self.tasks.spawn("dashboard.update_loop", self.update_loop, owner=self)
 
     def did_unmount(self):
-        self.running = False
+        self.tasks.cancel_owner(self)
+
+    # --- CICLO DE VIDA (CACHÉ DE VISTAS) ---
+    def suspend(self):
+        """Pausa el bucle visual mientras la pestaña está oculta."""
+        self.tasks.pause(self)
+
+    def resume(self):
+        """Reanuda el bucle visual al volver a la pestaña."""
+        self.tasks.resume(self)
 
     def build_ui(self):
         # 1. TARJETAS KPI
@@ -84,20 +93,25 @@ class DashboardView(ft.Container):
         )
 
         # 3. GRÁFICA
+        # Las series se materializan desde las columnas crudas del DataStore
+        # (solo la ventana visible, diezmada al ancho de la gráfica).
+        line_temp = ft.LineChartData(
+            data_points=[], 
+            stroke_width=3, color=AppTheme.color_pv, 
+            curved=True, stroke_cap_round=True,
+            below_line_bgcolor=f"#1A{AppTheme.color_pv.lstrip('#')}" 
+        )
+        line_sp = ft.LineChartData(
+            data_points=[],
+            stroke_width=2, color=AppTheme.color_sp, 
+            curved=False
+        )
+        self.series_temp = ChartSeries(line_temp)
+        self.series_sp = ChartSeries(line_sp)
+        self.last_rendered_count = -1
+
         self.chart = ft.LineChart(
-            data_series=[
-                ft.LineChartData(
-                    data_points=self.data_store.data_temp, 
-                    stroke_width=3, color=AppTheme.color_pv, 
-                    curved=True, stroke_cap_round=True,
-                    below_line_bgcolor=f"#1A{AppTheme.color_pv.lstrip('#')}" 
-                ),
-                ft.LineChartData(
-                    data_points=self.data_store.data_sp,
-                    stroke_width=2, color=AppTheme.color_sp, 
-                    curved=False
-                )
-            ],
+            data_series=[line_temp, line_sp],
             min_y=0, max_y=100, min_x=0, max_x=60,
             expand=True, 
             border=ft.border.all(1, AppTheme.card_border),
@@ -180,6 +194,9 @@ class DashboardView(ft.Container):
     def handle_clear_chart(self, e):
         self.data_store.clear_data()
         self.data_store.start_time = time.time()
+        self.series_temp.clear()
+        self.series_sp.clear()
+        self.last_rendered_count = 0
         self.chart.update()
         self.page.snack_bar = ft.SnackBar(ft.Text("Gráfica reiniciada"), bgcolor="orange")
         self.page.snack_bar.open = True
@@ -192,16 +209,12 @@ class DashboardView(ft.Container):
     def handle_save_csv(self, e: ft.FilePickerResultEvent):
         if e.path:
             try:
-                full_temps, full_sps = self.data_store.get_export_data()
+                times, temps, sps, raws = self.data_store.get_export_data()
                 with open(e.path, mode='w', newline='') as f:
                     writer = csv.writer(f)
-                    writer.writerow(["Tiempo (s)", "Temperatura (°C)", "Setpoint (°C)"])
-                    for i in range(len(full_temps)):
-                        t_val = full_temps[i][0]
-                        temp_val = full_temps[i][1]
-                        sp_val = 0
-                        if i < len(full_sps): sp_val = full_sps[i][1]
-                        writer.writerow([f"{t_val:.2f}", f"{temp_val:.2f}", f"{sp_val:.2f}"])
+                    writer.writerow(["Tiempo (s)", "Temperatura (°C)", "Setpoint (°C)", "Temperatura cruda (°C)"])
+                    for t_val, temp_val, sp_val, raw_val in zip(times, temps, sps, raws):
+                        writer.writerow([f"{t_val:.2f}", f"{temp_val:.2f}", f"{sp_val:.2f}", f"{raw_val:.2f}"])
                 self.page.snack_bar = ft.SnackBar(ft.Text(f"Guardado: {e.path}"), bgcolor="green")
             except Exception as ex:
                 self.page.snack_bar = ft.SnackBar(ft.Text(f"Error: {str(ex)}"), bgcolor="red")
@@ -213,16 +226,17 @@ class DashboardView(ft.Container):
         """
         Lee de DataStore (llenado por main.py) para no crear conflicto de sockets.
         """
-        while self.running:
-            # Verificamos si hay datos en la lista visual
-            if self.data_store.data_temp:
+        while True:
+            # Vista oculta (en caché): la tarea queda en pausa aquí
+            await self.tasks.checkpoint()
+
+            # Verificamos si hay muestras nuevas desde el último cuadro
+            count = len(self.data_store)
+            if count and count != self.last_rendered_count:
                 # Obtenemos los últimos valores registrados
-                latest_temp_point = self.data_store.data_temp[-1]
-                latest_sp_point = self.data_store.data_sp[-1]
-                
-                temp = latest_temp_point.y
-                sp = latest_sp_point.y
-                elapsed = latest_temp_point.x
+                temp = self.data_store.temp_data[-1]
+                sp = self.data_store.sp_data[-1]
+                elapsed = self.data_store.time_data[-1]
 
                 if self.chart.page:
                     self.card_temp.set_value(temp)
@@ -237,7 +251,14 @@ class DashboardView(ft.Container):
                         self.chart.min_x = elapsed - 60
                         self.chart.max_x = elapsed
                     else:
+                        self.chart.min_x = 0
                         self.chart.max_x = 60
+
+                    # Materializar solo la ventana visible
+                    width_px = self.page.width if self.page and self.page.width else None
+                    ds = self.data_store
+                    self.series_temp.render(ds.time_data, ds.temp_data, self.chart.min_x, self.chart.max_x, width_px)
+                    self.series_sp.render(ds.time_data, ds.sp_data, self.chart.min_x, self.chart.max_x, width_px)
                     
                     # Autoescala Y
                     current_max = max(temp, sp)
@@ -247,5 +268,6 @@ class DashboardView(ft.Container):
                     self.chart.update()
                     self.card_temp.update()
                     self.card_out.update() # Asegurar actualización visual
+                    self.last_rendered_count = count
             
             await asyncio.sleep(0.5)
\ No newline at end of file
@@ -2,12 +2,16 @@
 import flet as ft
 import socket
 from src.utils.theme import AppTheme
+from src.core.simulation import SIMULATION_MEMO
+from src.core.filters import DEFAULT_FILTER_CHAIN
 
 class SettingsView(ft.Container):
-    def __init__(self, esp_interface, page: ft.Page):
+    def __init__(self, esp_interface, page: ft.Page, task_registry, telemetry_filter):
         super().__init__()
         self.esp = esp_interface 
         self.page_ref = page 
+        self.tasks = task_registry
+        self.telemetry_filter = telemetry_filter
         self.expand = True
         self.padding = 20
         
@@ -17,10 +21,27 @@ class SettingsView(ft.Container):
         # Sincronización inicial (Sin actualizar gráfico para evitar error)
         self.scan_ports(None, update_ui=False)
         self.refresh_state_visuals(update_ui=False)
+        self.refresh_task_stats(update_ui=False)
         
         # Chequeo silencioso de AP
         self.check_ap_availability(update_ui=False)
 
+    # --- CICLO DE VIDA (CACHÉ DE VISTAS) ---
+    def suspend(self):
+        """Sin bucles propios: nada que pausar."""
+        pass
+
+    def resume(self):
+        """
+        Al volver a la pestaña solo refrescamos el estado de conexión.
+        El escaneo de puertos queda en el botón manual y la sonda del AP
+        (si no hay conexión) corre en un hilo para no frenar el cambio de pestaña.
+        """
+        self.refresh_state_visuals(update_ui=True)
+        self.refresh_task_stats(update_ui=True)
+        if not self.esp.connected:
+            self.page_ref.run_thread(self.check_ap_availability)
+
     def build_ui(self):
         # --- 1. TARJETA DE ESTADO PRINCIPAL ---
         self.status_text = ft.Text("Estado: DESCONECTADO", color=AppTheme.color_alarm, size=18, weight="bold")
@@ -114,6 +135,45 @@ class SettingsView(ft.Container):
             ]
         )
 
+        # --- 5. DIAGNÓSTICO DE TAREAS DE FONDO ---
+        self.lbl_task_count = ft.Text("Tareas vivas: --", size=14, weight="bold")
+        self.task_stats_list = ft.Column(spacing=2)
+        self.lbl_sim_cache = ft.Text("Caché de simulación: --", size=11, font_family=AppTheme.font_mono, color="grey")
+
+        diagnostics_card = ft.ExpansionTile(
+            title=ft.Text("Diagnóstico de Tareas", size=14),
+            controls=[
+                ft.Container(padding=10, content=ft.Column([
+                    ft.Row([
+                        self.lbl_task_count,
+                        ft.IconButton(icon=ft.Icons.REFRESH, on_click=lambda e: self.refresh_task_stats())
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                    self.task_stats_list,
+                    self.lbl_sim_cache
+                ]))
+            ]
+        )
+
+        # --- 6. FILTROS DE TELEMETRÍA ---
+        self.tf_filter_chain = ft.TextField(
+            label="Cadena de filtros", value=self.telemetry_filter.spec, expand=True, text_size=13,
+            hint_text=DEFAULT_FILTER_CHAIN
+        )
+        filter_card = ft.ExpansionTile(
+            title=ft.Text("Filtros de Telemetría", size=14),
+            controls=[
+                ft.Container(padding=10, content=ft.Column([
+                    ft.Text("ema:alpha · median:n · hampel:n:k (separados por coma)", size=11, color="grey"),
+                    ft.Row([
+                        self.tf_filter_chain,
+                        ft.IconButton(icon=ft.Icons.CHECK, on_click=self.handle_apply_filters),
+                        ft.IconButton(icon=ft.Icons.RESTART_ALT, tooltip="Predeterminada",
+                                      on_click=lambda e: self.handle_apply_filters(e, DEFAULT_FILTER_CHAIN))
+                    ])
+                ]))
+            ]
+        )
+
         # ENSAMBLAJE
         self.content = ft.Column(
             controls=[
@@ -124,12 +184,11 @@ class SettingsView(ft.Container):
                 ft.Container(height=10),
                 config_card, 
                 ft.Container(height=10),
-                manual_card 
+                manual_card,
+                filter_card,
+                diagnostics_card
             ], scroll=ft.ScrollMode.AUTO
         )
-        
-        # Escaneo inicial
-        self.scan_ports(None, update_ui=False)
 
     # --- LÓGICA DE ASISTENCIA ---
 
@@ -233,6 +292,36 @@ class SettingsView(ft.Container):
             
         if update_ui and self.page_ref: self.update()
 
+    def refresh_task_stats(self, update_ui=True):
+        """Muestra las tareas vivas con su CPU y despertares (detecta fugas y bucles ocupados)."""
+        rows = self.tasks.stats()
+        self.lbl_task_count.value = f"Tareas vivas: {len(rows)}"
+        self.task_stats_list.controls = [
+            ft.Text(
+                f"{r['name']:<24} {r['state']:<8} CPU {r['cpu_ms']:>8.1f} ms  {r['wakeups_per_s']:>6.2f} wk/s",
+                size=11, font_family=AppTheme.font_mono, color="grey"
+            )
+            for r in rows
+        ]
+        c = SIMULATION_MEMO.stats()
+        self.lbl_sim_cache.value = (
+            f"Caché de simulación: {c['entries']} curvas, {c['bytes'] / 1024:.0f} KB, "
+            f"{c['hits']} aciertos / {c['misses']} fallos ({c['hit_rate'] * 100:.0f}%)"
+        )
+        if update_ui and self.task_stats_list.page: self.update()
+
+    def handle_apply_filters(self, e, spec=None):
+        spec = spec if spec is not None else self.tf_filter_chain.value.strip()
+        try:
+            self.telemetry_filter.configure(spec)
+        except ValueError as ex:
+            self.show_snack(f"Filtro inválido: {ex}", "red")
+            return
+        self.page_ref.client_storage.set("filter_chain", spec)
+        self.tf_filter_chain.value = spec
+        if self.tf_filter_chain.page: self.tf_filter_chain.update()
+        self.show_snack("Filtros aplicados", "green")
+
     def scan_ports(self, e, update_ui=True):
         ports = self.esp.scan_serial_ports()
         self.port_dropdown.options = [ft.dropdown.Option(p) for p in ports]
@@ -2,63 +2,85 @@
 import flet as ft
 import asyncio
 import time
-import random
+from array import array
 from src.utils.theme import AppTheme
+from src.utils.chart_series import ChartSeries
 from src.core.pid_logic import PIDController, ThermalSimulator
 
+SIM_DT = 0.1                 # Paso de la física (s de simulación)
+FRAME_S = 0.1                # Periodo de refresco de la UI (s reales)
+WINDOW_REAL_S = 30           # Ventana visible a 1x; se estira con la velocidad
+MAX_STEPS_PER_FRAME = 20000  # Tope por cuadro (evita ráfagas si el loop se atrasó)
+SPEEDS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
 class SimulationView(ft.Container):
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, task_registry):
         super().__init__()
         self.page = page
+        self.tasks = task_registry
         self.expand = True
         self.padding = 20
-        
+
         # --- MOTOR DE SIMULACIÓN ---
-        self.pid = PIDController(kp=2.0, ki=0.1, kd=1.0)
-        self.sim = ThermalSimulator()
-        
-        self.running = True
-        self.start_time = time.time()
-        
+        self.pid = PIDController(kp=2.0, ki=0.1, kd=1.0, dt=SIM_DT)
+        self.sim = ThermalSimulator(dt=SIM_DT)
+
+        # Reloj de simulación (desacoplado del reloj real)
+        self.sim_time = 0.0
+        self.step_count = 0
+        self.speed = 1
+
         self.setpoint = 50.0
-        self.disturbance = 0.0 
-        
+        self.disturbance = 0.0
+
         # --- UI ELEMENTS ---
         self.build_ui()
-        
-        self.page.run_task(self.sim_loop)
+
+        self.tasks.spawn("simulation.loop", self.sim_loop, owner=self)
 
     def did_unmount(self):
-        self.running = False
+        self.tasks.cancel_owner(self)
+
+    # --- CICLO DE VIDA (CACHÉ DE VISTAS) ---
+    def suspend(self):
+        """Pausa la física mientras la pestaña está oculta."""
+        self.tasks.pause(self)
+
+    def resume(self):
+        self.tasks.resume(self)
 
     def build_ui(self):
         # 1. GRÁFICA DE RESPUESTA
-        self.data_temp = []
-        self.data_sp = []
+        # Columnas crudas; ChartSeries materializa solo la ventana visible
+        self.data_t = array('d')
+        self.data_temp = array('d')
+        self.data_sp = array('d')
+
+        # Serie 1: Temperatura (Rojo)
+        line_temp = ft.LineChartData(
+            data_points=[],
+            stroke_width=3,
+            color=AppTheme.color_pv,
+            curved=True,
+            stroke_cap_round=True,
+        )
+        # Serie 2: Setpoint (Azul)
+        line_sp = ft.LineChartData(
+            data_points=[],
+            stroke_width=2,
+            color=AppTheme.color_sp,
+            # stroke_dash_pattern=[5, 5], <--- ELIMINADO: Causa error en tu versión de Flet
+            curved=False
+        )
+        self.series_temp = ChartSeries(line_temp)
+        self.series_sp = ChartSeries(line_sp)
 
         self.chart = ft.LineChart(
-            data_series=[
-                # Serie 1: Temperatura (Rojo)
-                ft.LineChartData(
-                    data_points=self.data_temp,
-                    stroke_width=3,
-                    color=AppTheme.color_pv,
-                    curved=True,
-                    stroke_cap_round=True,
-                ),
-                # Serie 2: Setpoint (Azul)
-                ft.LineChartData(
-                    data_points=self.data_sp,
-                    stroke_width=2,
-                    color=AppTheme.color_sp,
-                    # stroke_dash_pattern=[5, 5], <--- ELIMINADO: Causa error en tu versión de Flet
-                    curved=False
-                )
-            ],
+            data_series=[line_temp, line_sp],
             min_y=0,
             max_y=100,
             min_x=0,
-            max_x=30,
+            max_x=WINDOW_REAL_S,
             expand=True,
             border=ft.border.all(1, AppTheme.card_border),
             horizontal_grid_lines=ft.ChartGridLines(interval=10, color="#222222"),
@@ -80,6 +102,14 @@ class SimulationView(ft.Container):
         self.slider_kd = self._make_slider("Kd (Freno)", 0, 10, 1.0, "orange")
         self.slider_sp = self._make_slider("Setpoint", 0, 90, 50.0, "blue")
 
+        # 2b. VELOCIDAD (Time-warp)
+        self.speed_selector = ft.Dropdown(
+            label="Velocidad", width=120, value="1",
+            options=[ft.dropdown.Option(str(s), f"{s}x") for s in SPEEDS],
+            on_change=self.on_speed_change
+        )
+        self.lbl_clock = ft.Text("t = 00:00:00", size=14, font_family=AppTheme.font_mono, color="grey")
+
         # 3. BOTONES DE ACCIÓN
         self.btn_disturbance = ft.ElevatedButton(
             "Abrir Puerta (Perturbación)",
@@ -87,7 +117,7 @@ class SimulationView(ft.Container):
             style=ft.ButtonStyle(bgcolor="#444444", color="white"),
             on_click=self.trigger_disturbance
         )
-        
+
         self.btn_reset = ft.TextButton(
             "Reiniciar Simulación",
             icon=ft.Icons.REFRESH,
@@ -96,7 +126,7 @@ class SimulationView(ft.Container):
 
         # 4. INFO TEXT
         self.lbl_info = ft.Text(
-            "Modo Aprendizaje: Ajusta los valores y observa cómo cambia la curva.", 
+            "Modo Aprendizaje: Ajusta los valores y observa cómo cambia la curva.",
             size=12, color="grey"
         )
 
@@ -106,6 +136,7 @@ class SimulationView(ft.Container):
                 ft.Text("Simulador Térmico PID", size=24, weight="bold", color="white"),
                 self.lbl_info,
                 ft.Container(height=10),
+                ft.Row([self.speed_selector, self.lbl_clock], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
                 chart_container,
                 ft.Container(height=10),
                 # Panel de control
@@ -135,8 +166,8 @@ class SimulationView(ft.Container):
                 ft.Text(f"{start_v:.1f}", size=14, font_family=AppTheme.font_mono)
             ]),
             ft.Slider(
-                min=min_v, max=max_v, divisions=100, 
-                value=start_v, 
+                min=min_v, max=max_v, divisions=100,
+                value=start_v,
                 active_color=color,
                 on_change=self.on_slider_change
             )
@@ -149,58 +180,89 @@ class SimulationView(ft.Container):
         self.pid.ki = self.slider_ki.controls[1].value
         self.pid.kd = self.slider_kd.controls[1].value
         self.setpoint = self.slider_sp.controls[1].value
-        
+
         self.slider_kp.controls[0].controls[2].value = f"{self.pid.kp:.1f}"
         self.slider_ki.controls[0].controls[2].value = f"{self.pid.ki:.2f}"
         self.slider_kd.controls[0].controls[2].value = f"{self.pid.kd:.1f}"
         self.slider_sp.controls[0].controls[2].value = f"{self.setpoint:.1f}°C"
-        
+
         self.page.update()
 
+    def on_speed_change(self, e):
+        self.speed = int(self.speed_selector.value)
+
     def trigger_disturbance(self, e):
-        self.sim.temperature -= 15.0 
+        self.sim.temperature -= 15.0
         self.page.snack_bar = ft.SnackBar(ft.Text("¡Aire frío detectado!"), bgcolor="blue")
         self.page.snack_bar.open = True
         self.page.update()
 
     def reset_sim(self, e):
-        self.sim.temperature = 25.0
+        self.sim.reset()
         self.pid.reset()
-        self.data_temp.clear()
-        self.data_sp.clear()
-        self.start_time = time.time()
+        del self.data_t[:], self.data_temp[:], self.data_sp[:]
+        self.series_temp.clear()
+        self.series_sp.clear()
+        self.sim_time = 0.0
+        self.step_count = 0
         self.page.update()
 
+    # --- FÍSICA ACELERADA ---
+    def _advance(self, n_steps):
+        """
+        Avanza n pasos de física en lote y guarda solo 1 de cada 'stride'
+        muestras (la gráfica nunca mostraría más resolución que esa).
+        """
+        self.pid.setpoint = self.setpoint
+        temps, _ = self.sim.advance(n_steps, controller=self.pid)
+
+        stride = max(1, self.speed // 10)
+        first = (-self.step_count) % stride
+        for i in range(first, n_steps, stride):
+            self.data_t.append(self.sim_time + (i + 1) * SIM_DT)
+            self.data_temp.append(temps[i])
+            self.data_sp.append(self.setpoint)
+
+        self.step_count += n_steps
+        self.sim_time += n_steps * SIM_DT
+
     async def sim_loop(self):
-        """Bucle de física acelerada"""
-        while self.running:
-            now = time.time()
-            elapsed = now - self.start_time
-            
-            self.pid.setpoint = self.setpoint
-            output_pwm = self.pid.compute(self.sim.temperature)
-            
-            # Física
-            current_temp = self.sim.update(output_pwm, dt=0.1)
-            
-            # Graficar
-            self.data_temp.append(ft.LineChartDataPoint(x=elapsed, y=current_temp))
-            self.data_sp.append(ft.LineChartDataPoint(x=elapsed, y=self.setpoint))
-            
-            if elapsed > 30:
-                self.chart.min_x = elapsed - 30
-                self.chart.max_x = elapsed
-                if len(self.data_temp) > 300:
-                    self.data_temp.pop(0)
-                    self.data_sp.pop(0)
+        """Bucle de física acelerada: cada cuadro avanza un lote de pasos."""
+        last_frame = time.monotonic()
+        pending = 0.0   # Fracción de paso acumulada entre cuadros
+
+        while True:
+            await self.tasks.checkpoint()
+            now = time.monotonic()
+            frame_dt = min(now - last_frame, 1.0)  # Tras una pausa no "recuperamos" el tiempo perdido
+            last_frame = now
+
+            pending += frame_dt * self.speed / SIM_DT
+            n_steps = min(int(pending), MAX_STEPS_PER_FRAME)
+            pending -= int(pending)
+            if n_steps: self._advance(n_steps)
+
+            # Ventana visible proporcional a la velocidad
+            window = WINDOW_REAL_S * self.speed
+            if self.sim_time > window:
+                self.chart.min_x = self.sim_time - window
+                self.chart.max_x = self.sim_time
+                # Recorte en bloque (amortizado) de lo que ya salió de la ventana
+                if self.data_t and self.data_t[0] < self.sim_time - 2 * window:
+                    cut = len(self.data_t) // 2
+                    del self.data_t[:cut], self.data_temp[:cut], self.data_sp[:cut]
             else:
-                self.chart.max_x = 30
-                
+                self.chart.min_x = 0
+                self.chart.max_x = window
+
             if self.chart.page:
+                width_px = self.page.width if self.page and self.page.width else None
+                self.series_temp.render(self.data_t, self.data_temp, self.chart.min_x, self.chart.max_x, width_px)
+                self.series_sp.render(self.data_t, self.data_sp, self.chart.min_x, self.chart.max_x, width_px)
+
+                h, rem = divmod(int(self.sim_time), 3600)
+                self.lbl_clock.value = f"t = {h:02d}:{rem // 60:02d}:{rem % 60:02d} ({self.speed}x)"
                 self.chart.update()
-            else:
-                # Si no hay página, es seguro asumir que debemos detener el loop
-                self.running = False
-                break 
-            
-            await asyncio.sleep(0.1)
\ No newline at end of file
+                self.lbl_clock.update()
+
+            await asyncio.sleep(FRAME_S)
@@ -4,17 +4,42 @@ import asyncio
 import time
 from src.utils.theme import AppTheme
 from src.utils.validators import InputValidator
+from src.utils.chart_series import ChartSeries
+from src.core.simulation import simulate_closed_loop_cached, peek_simulation
+from src.core.optimizer import sweep_pid_gains
+from src.core.response_cache import LambdaResponseCache, lambda_grid
+from src.core.storage_writer import StorageWriter
+from src.core.robustness import robustness_envelope, DEFAULT_SAMPLES
+from src.core.frequency import stability_margins
+from src.core.identification import bootstrap_fopdt
+from src.core.sequencer import parse_points, model_for_temperature
+from src.core.history_id import analyze_history, merge_models, aggregate_models
+
+SIM_DEBOUNCE_S = 0.15   # Espera tras la última tecla antes de simular
+PARETO_SHOWN = 8        # Candidatos del frente listados (los de menor ITAE)
+IDLE_TEMP_STEP = 0.5    # °C: cuantizado de la temperatura inicial en reposo (claves de caché estables)
+RELAY_MAX_SP = 75.0     # El relé oscila alrededor del SP: margen bajo el corte de 80°C
+RELAY_FIRMWARE_HINT = "El relé requiere firmware con potencia manual (comando M, caps=M)"
 
 class TuningView(ft.Container):
-    def __init__(self, esp_interface, page: ft.Page, global_tuner_instance):
+    def __init__(self, esp_interface, page: ft.Page, global_tuner_instance, task_registry, sequencer=None, data_store=None,
+                 storage_writer=None):
         super().__init__()
         self.esp = esp_interface
         self.page = page
         self.tuner = global_tuner_instance 
+        self.tasks = task_registry
+        self.sequencer = sequencer
+        self.data_store = data_store
+        # Guardado ordenado y fuera del loop de las preferencias (ver _persist_inputs)
+        self.storage = storage_writer or StorageWriter(page.client_storage)
         
         self.expand = True
         self.padding = 20
-        self.running = True
+        self.sim_request_id = 0
+        self.lambda_cache = LambdaResponseCache()
+        self.band_params = None   # Entradas con las que se calculó la banda Monte Carlo
+        self.manual_stop = False  # Parada con DETENER: el resultado se muestra al terminar el ajuste
 
         # Modelo por defecto para la simulación
         self.plant_model = {"Kp": 1.5, "tau": 30.0, "theta": 5.0}
@@ -28,6 +53,7 @@ class TuningView(ft.Container):
         self.saved_ki = self.page.client_storage.get("pid_ki") or "0.5"
         self.saved_kd = self.page.client_storage.get("pid_kd") or "1.0"
         self.saved_sp = self.page.client_storage.get("pid_sp") or "50.0"
+        self.saved_points = self.page.client_storage.get("sequence_points") or "30, 45, 60, 75"
 
         # --- CONSTRUCCIÓN DE UI ---
         self.build_ui()
@@ -37,7 +63,7 @@ class TuningView(ft.Container):
         self.restore_existing_data()
 
         # Iniciar bucle visual
-        self.page.run_task(self.update_visuals_loop)
+        self.tasks.spawn("tuning.visuals_loop", self.update_visuals_loop, owner=self)
 
         # Sincronización inicial
         if self.esp.connected:
@@ -50,24 +76,29 @@ class TuningView(ft.Container):
         """
         # 1. RECUPERAR GRÁFICA ROJA (La Realidad)
         if self.tuner.time_data:
-            points = [
-                ft.LineChartDataPoint(x=self.tuner.time_data[i], y=self.tuner.temp_data[i])
-                for i in range(len(self.tuner.time_data))
-            ]
-            self.line_real.data_points = points
-            
             # Restaurar el ancho correcto (Auto-Escala)
             max_t = self.tuner.time_data[-1]
             self.chart.min_x = 0
             self.chart.max_x = max(60, max_t * 1.05)
+            self.render_real_series()
 
         # 2. RECUPERAR ESTADO DE CONTROLES
-        if self.tuner.recording:
+        if self.tuner.relay_active:
+            self._set_relay_button(True)
+            self.btn_autotune.disabled = True
+            self.lbl_status_info.value = "Ensayo de relé en curso..."
+            self.container_imc.visible = False
+        elif self.tuner.recording:
             # Seguimos grabando
             self.btn_autotune.text = "DETENER"
             self.btn_autotune.style.bgcolor = "red"
             self.lbl_status_info.value = "Grabando..."
             self.container_imc.visible = False
+        elif self.tuner.identifying:
+            # El bucle visual aplica el modelo cuando termine el ajuste
+            self.btn_autotune.disabled = True
+            self.lbl_status_info.value = "Identificando modelo..."
+            self.container_imc.visible = False
         else:
             # Ya terminamos (Modo Análisis)
             self.btn_autotune.text = "Auto-Calibrar"
@@ -82,6 +113,7 @@ class TuningView(ft.Container):
                 self.slider_lambda.min = max(0.1, tau * 0.2)
                 self.slider_lambda.max = tau * 3.0
                 self.slider_lambda.value = tau 
+                self.precompute_lambda_responses()
                 self.lbl_status_info.value = "Modelo cargado. Ajusta PID o reinicia."
                 self.lbl_status_info.color = "green"
 
@@ -89,9 +121,24 @@ class TuningView(ft.Container):
         # Esto asegura que la curva comparativa reaparezca
         self.update_simulation_curve()
 
-        
     def did_unmount(self):
-        self.running = False
+        self.tasks.cancel_owner(self)
+
+    # --- CICLO DE VIDA (CACHÉ DE VISTAS) ---
+    def suspend(self):
+        """Pausa el bucle visual mientras la pestaña está oculta."""
+        self.tasks.pause(self)
+
+    def resume(self):
+        """
+        Reanuda el bucle visual. Solo reconstruimos la escena si el tuner global
+        identificó un modelo nuevo mientras la pestaña estaba oculta.
+        """
+        self.tasks.resume(self)
+        model = self.tuner.last_identified_model
+        if model and model is not self.plant_model and not self.tuner.testing:
+            self.restore_existing_data()
+            if self.page: self.update()
 
     def build_ui(self):
         # 1. INPUTS PID (Usamos los valores cargados de memoria)
@@ -106,10 +153,14 @@ class TuningView(ft.Container):
             alignment=ft.MainAxisAlignment.CENTER
         )
 
+        # Márgenes de estabilidad (respuesta en frecuencia del lazo)
+        self.lbl_margins = ft.Text("MG -- | MF -- | Ms --", size=11, color="grey", font_family=AppTheme.font_mono)
+
         # 2. BOTONES
         # Estado inicial depende de si el Tuner Global ya está grabando
-        btn_text = "DETENER" if self.tuner.recording else "Auto-Calibrar"
-        btn_bgcolor = "red" if self.tuner.recording else AppTheme.color_tuning
+        busy = self.tuner.recording or self.tuner.identifying
+        btn_text = "DETENER" if busy else "Auto-Calibrar"
+        btn_bgcolor = "red" if busy else AppTheme.color_tuning
 
         self.btn_autotune = ft.ElevatedButton(
             text=btn_text,
@@ -118,6 +169,15 @@ class TuningView(ft.Container):
             on_click=self.handle_autotune_click
         )
 
+        self.btn_relay = ft.OutlinedButton(
+            "Relé (rápido)",
+            icon=ft.Icons.WAVES,
+            on_click=self.handle_relay_click,
+            disabled=self.tuner.recording or not self.esp.manual_power_supported,
+            tooltip=None if self.esp.manual_power_supported else RELAY_FIRMWARE_HINT
+        )
+        self.relay_ui_active = self.tuner.relay_active
+
         self.btn_upload = ft.ElevatedButton(
             "Subir al ESP32",
             icon=ft.Icons.UPLOAD,
@@ -133,6 +193,70 @@ class TuningView(ft.Container):
             on_change=self.on_lambda_change
         )
 
+        # 3b. OPTIMIZADOR (FRENTE DE PARETO)
+        self.btn_optimize = ft.OutlinedButton(
+            "Optimizar PID (Pareto)",
+            icon=ft.Icons.SCATTER_PLOT,
+            on_click=self.handle_optimize
+        )
+        self.pareto_list = ft.Column(spacing=2)
+
+        # 3c. ROBUSTEZ (MONTE CARLO)
+        self.btn_robustness = ft.OutlinedButton(
+            "Robustez (Monte Carlo)",
+            icon=ft.Icons.BLUR_ON,
+            on_click=self.handle_robustness
+        )
+
+        # 3d. SECUENCIA MULTI-PUNTO (tabla de modelos por temperatura)
+        self.tf_points = ft.TextField(
+            label="Puntos (°C)", value=self.saved_points, width=180, text_size=14,
+            border_color="grey", color="white"
+        )
+        self.btn_sequence = ft.OutlinedButton(
+            "Iniciar secuencia",
+            icon=ft.Icons.STAIRS,
+            on_click=self.handle_sequence_click
+        )
+        self.lbl_sequence = ft.Text("", size=11, color="grey")
+        self.model_table_list = ft.Column(spacing=2)
+        self.sequence_ui_active = False
+
+        self.sequence_card = ft.ExpansionTile(
+            title=ft.Text("Secuencia multi-punto", size=14),
+            visible=self.sequencer is not None,
+            controls=[
+                ft.Container(padding=10, content=ft.Column([
+                    ft.Row([self.tf_points, self.btn_sequence], wrap=True),
+                    self.lbl_sequence,
+                    self.model_table_list
+                ]))
+            ]
+        )
+        self.refresh_model_table()
+
+        # 3e. IDENTIFICACIÓN DESDE EL HISTORIAL (escalones de SP y saturación)
+        self.btn_history = ft.OutlinedButton(
+            "Analizar historial",
+            icon=ft.Icons.MANAGE_SEARCH,
+            on_click=self.handle_history_analysis
+        )
+        self.btn_use_history = ft.TextButton("Usar mediana", disabled=True, on_click=self.use_history_model)
+        self.lbl_history = ft.Text("", size=11, color="grey", font_family=AppTheme.font_mono)
+        self.history_model = None
+
+        self.history_card = ft.ExpansionTile(
+            title=ft.Text("Identificación desde historial", size=14),
+            visible=self.data_store is not None,
+            controls=[
+                ft.Container(padding=10, content=ft.Column([
+                    ft.Text("Cada cambio de SP o saturación registrada es un ensayo gratuito.", size=11, color="grey"),
+                    ft.Row([self.btn_history, self.btn_use_history], wrap=True),
+                    self.lbl_history
+                ]))
+            ]
+        )
+
         self.container_imc = ft.Column(
             visible=(self.tuner.last_identified_model is not None),
             controls=[
@@ -142,7 +266,9 @@ class TuningView(ft.Container):
                     ft.Container(content=self.slider_lambda, expand=True),
                     ft.Text("Suave", size=10, color="green")
                 ]),
-                ft.Text("Ajusta Lambda para recalcular PID.", size=10, color="grey", italic=True)
+                ft.Text("Ajusta Lambda para recalcular PID.", size=10, color="grey", italic=True),
+                ft.Row([self.btn_optimize, self.btn_robustness], alignment=ft.MainAxisAlignment.CENTER, wrap=True),
+                self.pareto_list
             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER
         )
 
@@ -172,6 +298,13 @@ class TuningView(ft.Container):
         self.lbl_live_temp = ft.Text("-- °C", size=24, weight="bold", color=AppTheme.color_pv, font_family=AppTheme.font_mono)
         self.lbl_live_out = ft.Text("-- %", size=24, weight="bold", color=AppTheme.color_mv, font_family=AppTheme.font_mono)
         
+        # Estimación en línea (RLS) durante la operación normal
+        self.lbl_online_model = ft.Text("Modelo en línea: estimando...", size=11, color="grey", font_family=AppTheme.font_mono)
+        self.btn_use_online = ft.TextButton(
+            "Usar", icon=ft.Icons.AUTO_GRAPH, disabled=True,
+            on_click=self.handle_use_online_model
+        )
+
         self.live_panel = ft.Container(
             bgcolor="#161616", border_radius=12, padding=10, border=ft.border.all(1, "#333"),
             content=ft.Row(
@@ -187,6 +320,17 @@ class TuningView(ft.Container):
         self.line_real = ft.LineChartData(data_points=[], stroke_width=3, color=AppTheme.color_pv, curved=True, stroke_cap_round=True)
         self.line_ideal = ft.LineChartData(data_points=[], stroke_width=2, color=ft.Colors.CYAN_400, curved=True, stroke_cap_round=True)
 
+        # Banda 5–95% de robustez (dos bordes finos)
+        band_color = ft.Colors.with_opacity(0.45, ft.Colors.CYAN_200)
+        self.line_band_lo = ft.LineChartData(data_points=[], stroke_width=1, color=band_color, curved=True)
+        self.line_band_hi = ft.LineChartData(data_points=[], stroke_width=1, color=band_color, curved=True)
+
+        # Adaptadores: puntos Flet solo para lo visible, reutilizados entre cuadros
+        self.series_real = ChartSeries(self.line_real)
+        self.series_ideal = ChartSeries(self.line_ideal)
+        self.series_band_lo = ChartSeries(self.line_band_lo)
+        self.series_band_hi = ChartSeries(self.line_band_hi)
+
         self.line_sp_ref = ft.LineChartData(
             data_points=[], 
             stroke_width=2, 
@@ -195,7 +339,7 @@ class TuningView(ft.Container):
         )
 
         self.chart = ft.LineChart(
-            data_series=[self.line_sp_ref,self.line_ideal, self.line_real],
+            data_series=[self.line_sp_ref, self.line_band_lo, self.line_band_hi, self.line_ideal, self.line_real],
             min_y=0, max_y=100, min_x=0, max_x=60, expand=True,
             border=ft.border.all(1, AppTheme.card_border),
             horizontal_grid_lines=ft.ChartGridLines(interval=10, color="#222"),
@@ -213,6 +357,7 @@ class TuningView(ft.Container):
         legend = ft.Row([
             ft.Row([ft.Container(width=10, height=10, bgcolor=AppTheme.color_pv), ft.Text("Real", size=12)]),
             ft.Row([ft.Container(width=10, height=10, bgcolor=ft.Colors.CYAN_400), ft.Text("Ideal", size=12)]),
+            ft.Row([ft.Container(width=10, height=10, bgcolor=ft.Colors.with_opacity(0.45, ft.Colors.CYAN_200)), ft.Text("Banda 5–95%", size=12)]),
             ft.Row([ft.Container(width=10, height=10, bgcolor=ft.Colors.BLUE_700), ft.Text("Setpoint", size=12)]),
         ], alignment=ft.MainAxisAlignment.CENTER)
 
@@ -224,11 +369,15 @@ class TuningView(ft.Container):
                 ft.Text("Sintonización Avanzada", size=20, weight="bold", color="white"),
                 ft.Container(height=5),
                 pid_row,
+                ft.Row([self.lbl_margins], alignment=ft.MainAxisAlignment.CENTER),
                 ft.Container(height=5),
-                ft.Row([self.btn_autotune, self.btn_upload], alignment=ft.MainAxisAlignment.CENTER),
+                ft.Row([self.btn_autotune, self.btn_relay, self.btn_upload], alignment=ft.MainAxisAlignment.CENTER, wrap=True),
+                self.sequence_card,
+                self.history_card,
                 self.container_imc,
                 ft.Divider(color="grey"),
                 self.live_panel,
+                ft.Row([self.lbl_online_model, self.btn_use_online], alignment=ft.MainAxisAlignment.CENTER),
                 ft.Container(height=10),
                 chart_stack,
                 legend,
@@ -237,6 +386,16 @@ class TuningView(ft.Container):
             scroll=ft.ScrollMode.AUTO
         )
 
+    def _chart_width_px(self):
+        return self.page.width if self.page and self.page.width else None
+
+    def render_real_series(self):
+        """Materializa la grabación del tuner (diezmada al ancho de la gráfica)."""
+        self.series_real.render(
+            self.tuner.time_data, self.tuner.temp_data,
+            self.chart.min_x, self.chart.max_x, self._chart_width_px()
+        )
+
     def _make_input(self, label, val, width=80):
         return ft.TextField(
             label=label, value=val, width=width, text_size=14,
@@ -247,8 +406,10 @@ class TuningView(ft.Container):
 # --- SIMULACIÓN IDEAL + SETPOINT + GUARDADO SEGURO ---
     def update_simulation_curve(self, e=None):
         # 1. VISIBILIDAD: Si estamos grabando, ocultamos Ideal y SP, y salimos.
-        if self.tuner.recording:
-            self.line_ideal.data_points = []
+        if self.tuner.testing:
+            self.sim_request_id += 1  # Descarta simulaciones en vuelo
+            self.series_ideal.clear()
+            self._invalidate_band(None)
             self.line_sp_ref.data_points = [] # <--- NUEVO: Ocultar también la referencia
             if self.chart.page: self.chart.update()
             return
@@ -270,18 +431,7 @@ class TuningView(ft.Container):
         if self.tf_sp.page:
             self.tf_sp.update()
 
-        # 3. GUARDADO DE PREFERENCIAS (BLINDADO)
-        try:
-            if self.tf_sp.border_color == "grey":
-                 self.page.client_storage.set("pid_sp", self.tf_sp.value)
-            
-            if self.tf_kp.value: self.page.client_storage.set("pid_kp", self.tf_kp.value)
-            if self.tf_ki.value: self.page.client_storage.set("pid_ki", self.tf_ki.value)
-            if self.tf_kd.value: self.page.client_storage.set("pid_kd", self.tf_kd.value)
-        except Exception as ex:
-            print(f"Warning: Storage busy ({ex})")
-
-        # 4. PREPARACIÓN DE DATOS MATEMÁTICOS
+        # 3. PREPARACIÓN DE DATOS MATEMÁTICOS
         try:
             kp = float(self.tf_kp.value) if self.tf_kp.value else 0
             ki = float(self.tf_ki.value) if self.tf_ki.value else 0
@@ -289,6 +439,8 @@ class TuningView(ft.Container):
             sp = sp_val # Usamos el valor validado arriba
         except: return
 
+        self.update_stability_margins(kp, ki, kd)
+
         # Obtener modelo FOPDT (Planta)
         K_proc = self.plant_model.get('Kp', 1.5)
         Tau = self.plant_model.get('tau', 30.0)
@@ -297,58 +449,79 @@ class TuningView(ft.Container):
         self.lbl_sim_params.value = f"K={K_proc:.2f} | τ={Tau:.1f}s | θ={Theta:.1f}s"
         if self.lbl_sim_params.page: self.lbl_sim_params.update()
 
-        # 5. SINCRONIZACIÓN DE CONTEXTO
+        # 4. SINCRONIZACIÓN DE CONTEXTO
+        start_temp, final_time = self._simulation_context()
+
+        # 5. CURVA YA SIMULADA: se dibuja al instante, sin antirrebote ni hilo
+        self.sim_request_id += 1
+        params = (dict(self.plant_model), kp, ki, kd, sp, start_temp, final_time)
+        self._invalidate_band(params)
+        cached = peek_simulation(*params)
+        if cached:
+            self.tasks.cancel("tuning.simulation")
+            self._draw_ideal_curve(sp, final_time, *cached)
+            self._schedule_persist()
+            return
+
+        # 6. SIMULACIÓN EN SEGUNDO PLANO (con antirrebote)
+        # Relanzar la tarea con el mismo nombre cancela la petición anterior:
+        # mientras el usuario escribe, solo la última petición llega a simularse.
+        self.tasks.spawn("tuning.simulation", self._run_simulation, self.sim_request_id, params, owner=self)
+        self._schedule_persist()
+
+    def _simulation_context(self):
+        """(temperatura inicial, horizonte) de la curva ideal."""
         if self.tuner.time_data:
             # Usamos los datos de la grabación real
-            start_temp = self.tuner.base_temp
             max_t = self.tuner.time_data[-1]
-            final_time = max(60, max_t * 1.05)
-        else:
-            # Modo reposo
-            start_temp = self.tuner.latest_temp 
-            final_time = 60
+            return self.tuner.base_temp, max(60, max_t * 1.05)
+        # Modo reposo: la lectura en vivo cambia en cada muestra; cuantizada,
+        # las curvas precalculadas siguen sirviendo mientras se mueve el slider
+        return round(self.tuner.latest_temp / IDLE_TEMP_STEP) * IDLE_TEMP_STEP, 60
+
+    def _schedule_persist(self):
+        """Guarda las preferencias tras SIM_DEBOUNCE_S sin cambios (relanzar cancela la anterior)."""
+        self.tasks.spawn("tuning.persist", self._run_persist, owner=self)
+
+    async def _run_persist(self):
+        await asyncio.sleep(SIM_DEBOUNCE_S)
+        self._persist_inputs()
+
+    def _persist_inputs(self):
+        """GUARDADO DE PREFERENCIAS (BLINDADO). El StorageWriter escribe en orden desde su hilo."""
+        if self.tf_sp.border_color == "grey":
+             self.storage.set("pid_sp", self.tf_sp.value)
+
+        if self.tf_kp.value: self.storage.set("pid_kp", self.tf_kp.value)
+        if self.tf_ki.value: self.storage.set("pid_ki", self.tf_ki.value)
+        if self.tf_kd.value: self.storage.set("pid_kd", self.tf_kd.value)
+
+    def _simulate_in_worker(self, params):
+        return simulate_closed_loop_cached(*params, count=False)
 
-        # --- NUEVO: DIBUJAR LÍNEA DE SETPOINT (REFERENCIA) ---
+    async def _run_simulation(self, request_id, params):
+        await asyncio.sleep(SIM_DEBOUNCE_S)
+
+        loop = asyncio.get_running_loop()
+        sim_t, sim_y = await loop.run_in_executor(None, self._simulate_in_worker, params)
+
+        # Solo se dibuja el resultado de la petición más reciente
+        if request_id != self.sim_request_id or self.tuner.testing: return
+
+        self._draw_ideal_curve(params[4], params[6], sim_t, sim_y)
+
+    def _draw_ideal_curve(self, sp, final_time, sim_t, sim_y):
+        # --- DIBUJAR LÍNEA DE SETPOINT (REFERENCIA) ---
         # Creamos dos puntos: Inicio (t=0) y Fin (t=final_time) a la altura de 'sp'
         self.line_sp_ref.data_points = [
             ft.LineChartDataPoint(x=0, y=sp),
             ft.LineChartDataPoint(x=final_time, y=sp)
         ]
 
-        # 6. SIMULACIÓN MATEMÁTICA (Curva Ideal)
-        sim_points = []
-        temp = start_temp 
-        integral = 0.0
-        prev_err = 0.0
-        
-        dt = 0.2
-        steps = int(final_time / dt)
-        delay_steps = max(1, int(Theta / dt))
-        out_buffer = [0.0] * (delay_steps + 2)
-
-        for i in range(steps):
-            t = i * dt
-            err = sp - temp
-            integral += err * dt
-            deriv = (err - prev_err) / dt
-            prev_err = err
-            
-            # PID Output (0-100%)
-            out = max(0.0, min(100.0, (kp * err) + (ki * integral) + (kd * deriv)))
-            
-            # Planta
-            out_buffer.append(out)
-            delayed_out = out_buffer.pop(0)
-            
-            change = ((K_proc * delayed_out) - (temp - start_temp)) / Tau
-            temp += change * dt
-            
-            sim_points.append(ft.LineChartDataPoint(x=t, y=temp))
-
-        # 7. ACTUALIZAR GRÁFICA
-        self.line_ideal.data_points = sim_points
+        # ACTUALIZAR GRÁFICA
         self.chart.min_x = 0
         self.chart.max_x = final_time
+        self.series_ideal.render(sim_t, sim_y, 0, final_time, self._chart_width_px())
         
         if self.chart.page: self.chart.update()
 
@@ -368,6 +541,7 @@ class TuningView(ft.Container):
             return # <--- IMPORTANTE: Detiene la ejecución aquí mismo.
 
         # --- 2. FLUJO NORMAL (Solo si está conectado) ---
+        if self.tuner.identifying: return   # Ajuste final en curso
         if self.tuner.recording:
             self.stop_autotune()
         else:
@@ -386,6 +560,8 @@ class TuningView(ft.Container):
         self.btn_autotune.text = "DETENER"
         self.btn_autotune.style.bgcolor = "red"
         self.btn_autotune.update()
+        self.btn_relay.disabled = True
+        self.btn_relay.update()
         
         # Ocultar controles de análisis mientras se graba
         self.container_imc.visible = False
@@ -402,47 +578,453 @@ class TuningView(ft.Container):
         if hasattr(self.esp, 'send_auto_tune_cmd'):
             self.esp.send_auto_tune_cmd(False)
         
-        # 2. Procesar Datos y detener
-        model = self.tuner.stop_recording()
-        
-        # 3. UI: Regreso a modo reposo
-        self.btn_autotune.text = "Auto-Calibrar"
-        self.btn_autotune.style.bgcolor = AppTheme.color_tuning
+        # 2. Detener: el ajuste corre fuera del loop y la sincronización
+        #    del bucle visual (paso 4) aplica el modelo cuando termina
+        self.tuner.stop_recording()
+        self.manual_stop = True
+
+        self.btn_autotune.disabled = True
         self.btn_autotune.update()
+        self.lbl_status_info.value = "Identificando modelo..."
+        self.lbl_status_info.color = "grey"
+        self.lbl_status_info.update()
 
-        if model:
-            self.plant_model = model
-            tau = model['tau']
-            
-            # Ajustar slider según el modelo detectado
-            self.slider_lambda.min = max(0.1, tau * 0.2)
-            self.slider_lambda.max = tau * 3.0
-            self.slider_lambda.value = tau
-            self.container_imc.visible = True
-            self.container_imc.update()
-            
-            # Recalcular PID sugerido automáticamente
+    # --- INTERVALOS DE CONFIANZA (BOOTSTRAP) ---
+    def start_bootstrap(self, model):
+        """Lanza el bootstrap del ajuste en segundo plano (copia de los datos grabados)."""
+        args = (list(self.tuner.time_data), list(self.tuner.temp_data),
+                self.tuner.base_temp, self.tuner.step_power, model)
+        self.tasks.spawn("tuning.bootstrap", self._run_bootstrap, args, owner=self)
+
+    async def _run_bootstrap(self, args):
+        loop = asyncio.get_running_loop()
+        ci = await loop.run_in_executor(None, lambda: bootstrap_fopdt(*args))
+        model = args[-1]
+        if not ci or model is not self.tuner.last_identified_model: return
+
+        # El modelo pasa a llevar sus intervalos: la sugerencia IMC se vuelve
+        # conservadora y las respuestas precalculadas del slider ya no sirven.
+        # Copia: el dict original lo comparten el tuner y otras vistas.
+        with_ci = dict(model, ci=ci)
+        self.tuner.last_identified_model = with_ci
+        self.lambda_cache.invalidate()
+        if model is self.plant_model and not self.tuner.testing:
+            self.plant_model = with_ci
             self.on_lambda_change(None)
-            
-            self.lbl_status_info.value = "¡Modelo Identificado!"
+            self.precompute_lambda_responses()
+
+        pct = int(ci['level'] * 100)
+        self.lbl_status_info.value = (
+            f"IC{pct}%: K {ci['Kp'][0]:.3f}–{ci['Kp'][1]:.3f} | τ {ci['tau'][0]:.0f}–{ci['tau'][1]:.0f}s "
+            f"| θ {ci['theta'][0]:.1f}–{ci['theta'][1]:.1f}s"
+        )
+        if ci['rel_width'] > 0.2:
+            self.lbl_status_info.value += " | Modelo incierto: conviene repetir el ensayo"
+            self.lbl_status_info.color = "orange"
+        else:
             self.lbl_status_info.color = "green"
+        if self.lbl_status_info.page: self.lbl_status_info.update()
+
+    # --- MÁRGENES DE ESTABILIDAD ---
+    def update_stability_margins(self, kp, ki, kd):
+        """Recalcula MG/MF/Ms del lazo modelo + PID (<1 ms: se hace en cada cambio)."""
+        m = stability_margins(self.plant_model, kp, ki, kd)
+        gm = f"{m['gm_db']:.1f} dB @ {m['wpc']:.3g} rad/s" if m['gm_db'] is not None else "∞"
+        pm = f"{m['pm_deg']:.0f}° @ {m['wgc']:.3g} rad/s" if m['pm_deg'] is not None else "∞"
+        self.lbl_margins.value = f"MG {gm} | MF {pm} | Ms {m['ms']:.2f}"
+
+        if not m['stable']:
+            self.lbl_margins.value += " | ¡INESTABLE!"
+            self.lbl_margins.color = "red"
+        elif (m['gm_db'] is not None and m['gm_db'] < 6) or (m['pm_deg'] is not None and m['pm_deg'] < 30) or m['ms'] > 2:
+            self.lbl_margins.color = "orange"   # Estable pero con poco margen
         else:
-            self.lbl_status_info.value = "Fallo: Movimiento insuficiente o cancelación."
+            self.lbl_margins.color = "green"
+        if self.lbl_margins.page: self.lbl_margins.update()
+
+    # --- ROBUSTEZ (MONTE CARLO) ---
+    def _invalidate_band(self, params):
+        """Borra la banda si ya no corresponde a las entradas actuales."""
+        if self.band_params is None or self.band_params == params: return
+        self.band_params = None
+        self.series_band_lo.clear()
+        self.series_band_hi.clear()
+
+    def handle_robustness(self, e):
+        if self.tuner.testing: return
+        try:
+            kp, ki, kd = float(self.tf_kp.value), float(self.tf_ki.value), float(self.tf_kd.value)
+            sp = float(self.tf_sp.value)
+        except (TypeError, ValueError):
+            self.page.snack_bar = ft.SnackBar(ft.Text("Revisa los números del PID"), bgcolor="red")
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+
+        start_temp, final_time = self._simulation_context()
+        params = (dict(self.plant_model), kp, ki, kd, sp, start_temp, final_time)
+        self.btn_robustness.disabled = True
+        self.lbl_status_info.value = f"Simulando {DEFAULT_SAMPLES} plantas perturbadas..."
+        self.lbl_status_info.color = "grey"
+        if self.page: self.update()
+        self.tasks.spawn("tuning.robustness", self._run_robustness, params, owner=self)
+
+    async def _run_robustness(self, params):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(None, lambda: robustness_envelope(*params))
+        finally:
+            self.btn_robustness.disabled = False
+            if self.btn_robustness.page: self.btn_robustness.update()
+
+        # Las ganancias cambiaron mientras simulábamos: la banda ya no aplica
+        start_temp, final_time = self._simulation_context()
+        try:
+            current = (dict(self.plant_model), float(self.tf_kp.value), float(self.tf_ki.value),
+                       float(self.tf_kd.value), float(self.tf_sp.value), start_temp, final_time)
+        except (TypeError, ValueError):
+            return
+        if current != params or self.tuner.testing: return
+
+        self.band_params = params
+        width_px = self._chart_width_px()
+        self.series_band_lo.render(result["t"], result["p5"], 0, params[6], width_px)
+        self.series_band_hi.render(result["t"], result["p95"], 0, params[6], width_px)
+
+        settling = f"{result['worst_settling']:.0f}s" if result['worst_settling'] is not None else "--"
+        self.lbl_status_info.value = (
+            f"Robustez ({result['samples']} modelos): sobrepico peor caso {result['worst_overshoot']:.1f}% "
+            f"| p95 {result['p95_overshoot']:.1f}% | establecimiento peor {settling}"
+            + (f" | {result['unsettled']} sin asentar" if result['unsettled'] else "")
+        )
+        self.lbl_status_info.color = "orange" if result['worst_overshoot'] > 10 or result['unsettled'] else "green"
+        if self.chart.page:
+            self.chart.update()
+            self.lbl_status_info.update()
+
+    # --- AUTOSINTONÍA POR RELÉ ---
+    def _set_relay_button(self, active):
+        self.relay_ui_active = active
+        self.btn_relay.text = "DETENER RELÉ" if active else "Relé (rápido)"
+        self.btn_relay.style = ft.ButtonStyle(color="red") if active else None
+
+    def _set_relay_enabled(self, enabled):
+        """Habilita el relé solo si además el firmware anuncia potencia manual."""
+        supported = self.esp.manual_power_supported
+        self.btn_relay.disabled = not (enabled and supported)
+        self.btn_relay.tooltip = None if supported else RELAY_FIRMWARE_HINT
+
+    def handle_relay_click(self, e):
+        if not self.esp.connected:
+            self.page.snack_bar = ft.SnackBar(ft.Text("⚠️ Error: Conecta el horno antes del ensayo de relé"), bgcolor="red")
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+
+        if self.tuner.relay_active:
+            # Cancelación manual: devolver el control al PID
+            self.tuner.stop_relay()
+            self.esp.send_auto_tune_cmd(False)
+            self.finish_relay_ui()
+            return
+        if self.tuner.recording: return
+        if not self.esp.manual_power_supported:
+            self.page.snack_bar = ft.SnackBar(ft.Text(f"⚠️ {RELAY_FIRMWARE_HINT}"), bgcolor="red")
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+
+        sp = InputValidator.validate_float(self.tf_sp, 0, RELAY_MAX_SP)
+        if sp is None:
+            self.page.snack_bar = ft.SnackBar(ft.Text(f"SP inválido para el relé (máx {RELAY_MAX_SP:.0f}°C)"), bgcolor="red")
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+
+        # Modo manual en el ESP32; main.py conmuta la potencia en cada muestra
+        self.esp.send_auto_tune_cmd(True)
+        self.tuner.start_relay(sp)
+
+        self._set_relay_button(True)
+        self.btn_autotune.disabled = True
+        self.container_imc.visible = False
+        self.lbl_status_info.value = "Ensayo de relé: esperando oscilación estable..."
+        self.lbl_status_info.color = "grey"
+        self.update_simulation_curve()
+        if self.page: self.update()
+
+    def finish_relay_ui(self):
+        """Restaura los controles y, si hubo resultado, carga las ganancias del relé."""
+        self._set_relay_button(False)
+        self.btn_autotune.disabled = False
+
+        result = self.tuner.relay_result
+        if result:
+            model = result.get("model")
+            if model:
+                # Modelo equivalente: habilita slider IMC, optimizador y simulación
+                self.apply_model(model)
+            self.tf_kp.value, self.tf_ki.value, self.tf_kd.value = str(result['kp']), str(result['ki']), str(result['kd'])
+            self.lbl_status_info.value = f"Relé: Ku={result['Ku']:.2f} | Pu={result['Pu']:.0f}s | a={result['amplitude']:.1f}°C (PID Ziegler–Nichols)"
+            self.lbl_status_info.color = "green"
+        else:
+            self.container_imc.visible = self.tuner.last_identified_model is not None
+            self.lbl_status_info.value = "Relé detenido sin oscilación estable."
             self.lbl_status_info.color = "red"
-        
-        self.lbl_status_info.update()
 
-        # 4. RE-DIBUJAR CURVA IDEAL (COMPARACIÓN)
-        # Esto hace que la línea cian regrese sincronizada encima de la roja
         self.update_simulation_curve()
+        if self.page: self.update()
+
+    # --- SECUENCIA MULTI-PUNTO ---
+    def handle_sequence_click(self, e):
+        if self.sequencer.active:
+            self.sequencer.abort("Cancelado por el usuario")
+            self.finish_sequence_ui()
+            return
+
+        if not self.esp.connected or self.tuner.testing:
+            self.page.snack_bar = ft.SnackBar(ft.Text("⚠️ Conecta el horno y termina el ensayo en curso"), bgcolor="red")
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+        try:
+            points = parse_points(self.tf_points.value)
+        except ValueError as ex:
+            self.page.snack_bar = ft.SnackBar(ft.Text(f"Puntos inválidos: {ex}"), bgcolor="red")
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+
+        self.page.client_storage.set("sequence_points", self.tf_points.value)
+        if not self.sequencer.start(points):
+            self.page.snack_bar = ft.SnackBar(ft.Text("⚠️ La secuencia requiere firmware con potencia manual (comando M, caps=M)"), bgcolor="red")
+            self.page.snack_bar.open = True
+            self.page.update()
+            return
+        self._set_sequence_controls(True)
+        self.container_imc.visible = False
+        self.lbl_sequence.value = self.sequencer.status
+        if self.page: self.update()
+
+    def _set_sequence_controls(self, active):
+        self.sequence_ui_active = active
+        self.btn_sequence.text = "DETENER SECUENCIA" if active else "Iniciar secuencia"
+        self.btn_sequence.style = ft.ButtonStyle(color="red") if active else None
+        self.btn_autotune.disabled = active
+        self._set_relay_enabled(not active)
+
+    def finish_sequence_ui(self):
+        """La secuencia terminó (o se abortó): restaurar controles y mostrar la tabla."""
+        self._set_sequence_controls(False)
+        self.lbl_sequence.value = self.sequencer.status
+        self.container_imc.visible = self.tuner.last_identified_model is not None
+        self.refresh_model_table()
+        self.update_simulation_curve()
+        if self.page: self.update()
+
+    def refresh_model_table(self):
+        """Filas 'T: K, τ, θ' de la tabla de modelos, cada una con botón para usarla."""
+        table = self.sequencer.table if self.sequencer else {}
+        self.model_table_list.controls = [
+            ft.Row([
+                ft.Text(f"{float(temp):>4.0f}°C  K={m['Kp']:.3f} | τ={m['tau']:.0f}s | θ={m['theta']:.0f}s",
+                        size=11, font_family=AppTheme.font_mono, expand=True),
+                ft.TextButton("Usar", on_click=lambda e, temp=temp: self.use_table_model(float(temp)))
+            ])
+            for temp, m in sorted(table.items(), key=lambda kv: float(kv[0]))
+        ]
+
+    def use_table_model(self, temp):
+        model = model_for_temperature(self.sequencer.table, temp)
+        if not model or self.tuner.testing: return
+        self.apply_model({k: model[k] for k in ("Kp", "tau", "theta")})
+        self.lbl_status_info.value = f"Modelo del punto {temp:.0f}°C aplicado."
+        self.lbl_status_info.color = "green"
+        self.lbl_status_info.update()
+
+    # --- IDENTIFICACIÓN DESDE EL HISTORIAL ---
+    def handle_history_analysis(self, e):
+        if not len(self.data_store):
+            self.lbl_history.value = "Sin historial registrado."
+            self.lbl_history.update()
+            return
+        # Copia de las columnas (memcpy) en el hilo del bucle; el ajuste va al executor
+        columns = self.data_store.snapshot()
+        epoch0 = self.data_store.start_time or 0.0
+        self.btn_history.disabled = True
+        self.lbl_history.value = f"Analizando {len(columns[0])} muestras..."
+        self.history_card.update()
+        self.tasks.spawn("tuning.history", self._run_history_analysis, columns, epoch0, owner=self)
+
+    async def _run_history_analysis(self, columns, epoch0):
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        try:
+            found = await loop.run_in_executor(None, lambda: analyze_history(*columns, epoch0=epoch0))
+        finally:
+            self.btn_history.disabled = False
+        elapsed = time.perf_counter() - t0
+
+        # Acumulado entre sesiones (client_storage; en el loop solo las variantes async)
+        stored = await self.page.client_storage.get_async("history_models")
+        models = merge_models(stored, found)
+        await self.page.client_storage.set_async("history_models", models)
+        self.history_model = aggregate_models(models)
+
+        n_sp = sum(m["kind"] == "sp" for m in found)
+        if self.history_model:
+            m = self.history_model
+            self.lbl_history.value = (
+                f"{len(found)} segmentos ({n_sp} SP, {len(found) - n_sp} sat) en {elapsed:.1f}s\n"
+                f"Mediana de {m['count']}: K={m['Kp']:.3f} | τ={m['tau']:.0f}s | θ={m['theta']:.0f}s"
+            )
+        else:
+            self.lbl_history.value = f"Ningún segmento identificable ({elapsed:.1f}s)."
+        self.btn_use_history.disabled = self.history_model is None
+        if self.history_card.page: self.history_card.update()
+
+    def use_history_model(self, e):
+        if not self.history_model or self.tuner.testing: return
+        self.apply_model({k: self.history_model[k] for k in ("Kp", "tau", "theta")})
+        self.lbl_status_info.value = f"Modelo del historial aplicado ({self.history_model['count']} segmentos)."
+        self.lbl_status_info.color = "green"
+        self.lbl_status_info.update()
+
+    def apply_model(self, model):
+        """Adopta un modelo de planta y recalcula las sugerencias IMC."""
+        self.plant_model = model
+        tau = model['tau']
+        self.slider_lambda.min = max(0.1, tau * 0.2)
+        self.slider_lambda.max = tau * 3.0
+        self.slider_lambda.value = tau
+        self.container_imc.visible = True
+        if self.container_imc.page: self.container_imc.update()
+        self.on_lambda_change(None)
+        self.precompute_lambda_responses()
+
+    def handle_use_online_model(self, e):
+        estimate = self.tuner.current_model_estimate
+        if not estimate or self.tuner.testing: return
+        self.apply_model({k: estimate[k] for k in ("Kp", "tau", "theta")})
+        self.lbl_status_info.value = f"Modelo en línea aplicado (confianza {estimate['confidence']:.0%})"
+        self.lbl_status_info.color = "green"
+        self.lbl_status_info.update()
+
+    # --- CACHÉ DEL SLIDER LAMBDA ---
+    def precompute_lambda_responses(self):
+        """Simula en segundo plano todas las posiciones del slider para el modelo actual."""
+        try:
+            sp = float(self.tf_sp.value)
+        except (TypeError, ValueError):
+            return
+        start_temp, final_time = self._simulation_context()
+        lambdas = lambda_grid(self.slider_lambda.min, self.slider_lambda.max, self.slider_lambda.divisions)
+        self.tasks.spawn(
+            "tuning.lambda_cache", self._run_lambda_precompute,
+            dict(self.plant_model), lambdas, sp, start_temp, final_time, owner=self
+        )
+
+    async def _run_lambda_precompute(self, model, lambdas, sp, start_temp, final_time):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, self.lambda_cache.precompute, self.tuner, model, lambdas, sp, start_temp, final_time
+        )
+
+    def _snap_lambda(self, lam):
+        """Valor exacto de la posición del slider más cercana (clave de la caché)."""
+        lo, hi, div = self.slider_lambda.min, self.slider_lambda.max, self.slider_lambda.divisions
+        step = (hi - lo) / div
+        return lo + round((lam - lo) / step) * step if step > 0 else lam
 
     def on_lambda_change(self, e):
         if not self.plant_model: return
-        lam = self.slider_lambda.value
-        kp, ki, kd = self.tuner.calculate_imc_pid(self.plant_model, lam)
+        lam = self._snap_lambda(self.slider_lambda.value)
+
+        # 1. Búsqueda en la caché precalculada (arrastre fluido). Con un SP
+        #    inválido se sigue por la simulación normal, que lo marca en rojo.
+        cached = None
+        if not self.tuner.testing:
+            try:
+                sp = float(self.tf_sp.value)
+                if 0 <= sp <= 80:
+                    start_temp, final_time = self._simulation_context()
+                    cached = self.lambda_cache.get(self.plant_model, lam, sp, start_temp, final_time)
+            except (TypeError, ValueError):
+                cached = None
+
+        kp, ki, kd = cached[0] if cached else self.tuner.calculate_imc_pid(self.plant_model, lam)
         self.tf_kp.value, self.tf_ki.value, self.tf_kd.value = str(kp), str(ki), str(kd)
         if self.tf_kp.page: self.tf_kp.update(), self.tf_ki.update(), self.tf_kd.update()
+
+        self.update_stability_margins(kp, ki, kd)
+
+        if cached:
+            self._invalidate_band((dict(self.plant_model), kp, ki, kd, sp, start_temp, final_time))
+            self.sim_request_id += 1  # Descarta simulaciones en vuelo
+            self._draw_ideal_curve(sp, final_time, cached[1], cached[2])
+            self._schedule_persist()
+        else:
+            # 2. Sin caché: simulación normal (con antirrebote)
+            self.update_simulation_curve()
+
+    # --- OPTIMIZADOR POR BARRIDO ---
+    def handle_optimize(self, e):
+        try:
+            sp = float(self.tf_sp.value)
+        except (TypeError, ValueError):
+            return
+        start_temp = self.tuner.base_temp if self.tuner.time_data else self.tuner.latest_temp
+        base_gains = self.tuner.calculate_imc_pid(self.plant_model, self.slider_lambda.value)
+
+        self.btn_optimize.disabled = True
+        self.btn_optimize.update()
+        self.lbl_status_info.value = "Optimizando ganancias..."
+        self.lbl_status_info.color = "grey"
+        self.lbl_status_info.update()
+
+        self.tasks.spawn(
+            "tuning.optimizer", self._run_optimizer,
+            dict(self.plant_model), sp, start_temp, base_gains, owner=self
+        )
+
+    async def _run_optimizer(self, model, sp, start_temp, base_gains):
+        loop = asyncio.get_running_loop()
+        try:
+            front = await loop.run_in_executor(None, sweep_pid_gains, model, sp, start_temp, base_gains)
+        finally:
+            self.btn_optimize.disabled = False
+            if self.btn_optimize.page: self.btn_optimize.update()
+        self.show_pareto_front(front)
+
+    def show_pareto_front(self, front):
+        """Lista el frente de Pareto (los PARETO_SHOWN de menor ITAE) con un botón de subida directa."""
+        rows = []
+        for c in front[:PARETO_SHOWN]:
+            settling = f"{c['settling']:.0f}s" if c['settling'] != float("inf") else "--"
+            rows.append(ft.Row([
+                ft.Text(
+                    f"Kp {c['kp']:<7} Ki {c['ki']:<7} Kd {c['kd']:<7}| ITAE {c['itae']:<8} "
+                    f"OS {c['overshoot']}% ts {settling} U {c['peak_effort']:.0f}%",
+                    size=10, font_family=AppTheme.font_mono, color="white"
+                ),
+                ft.IconButton(
+                    icon=ft.Icons.UPLOAD, icon_size=16, tooltip="Usar y subir",
+                    on_click=lambda e, cand=c: self.use_candidate(cand)
+                )
+            ], alignment=ft.MainAxisAlignment.CENTER))
+
+        self.pareto_list.controls = rows
+        self.lbl_status_info.value = f"Frente de Pareto: {len(front)} candidatos (se listan {len(rows)})."
+        self.lbl_status_info.color = "green"
+        if self.pareto_list.page:
+            self.pareto_list.update()
+            self.lbl_status_info.update()
+
+    def use_candidate(self, cand):
+        self.tf_kp.value, self.tf_ki.value, self.tf_kd.value = str(cand['kp']), str(cand['ki']), str(cand['kd'])
+        if self.tf_kp.page: self.tf_kp.update(), self.tf_ki.update(), self.tf_kd.update()
         self.update_simulation_curve()
+        self.handle_upload(None)
 
     def handle_upload(self, e):
         kp = InputValidator.validate_float(self.tf_kp)
@@ -472,7 +1054,10 @@ class TuningView(ft.Container):
     async def update_visuals_loop(self):
         last_data_count = 0
         
-        while self.running:
+        while True:
+            # 0. Vista oculta (en caché): la tarea queda en pausa aquí
+            await self.tasks.checkpoint()
+
             try:
                 # 1. VALIDACIÓN DE EXISTENCIA
                 # Si la gráfica no está en la página (cambio de pestaña), esperamos.
@@ -486,19 +1071,24 @@ class TuningView(ft.Container):
                 self.lbl_live_temp.update()
                 self.lbl_live_out.update()
 
+                # 2b. ESTIMACIÓN EN LÍNEA (RLS)
+                estimate = self.tuner.current_model_estimate
+                if estimate:
+                    self.lbl_online_model.value = (
+                        f"En línea: K={estimate['Kp']:.3f} | τ={estimate['tau']:.0f}s | "
+                        f"θ={estimate['theta']:.0f}s | conf {estimate['confidence']:.0%}"
+                    )
+                    self.btn_use_online.disabled = self.tuner.testing
+                else:
+                    self.btn_use_online.disabled = True
+                self.lbl_online_model.update()
+                self.btn_use_online.update()
+
                 # 3. ACTUALIZAR GRÁFICA REAL (Solo si estamos grabando)
-                if self.tuner.recording:
+                if self.tuner.testing:
                     current_count = len(self.tuner.time_data)
                     
                     if current_count > last_data_count:
-                        # Reconstrucción rápida de puntos
-                        # (En Flet es mejor reasignar la lista completa)
-                        points = [
-                            ft.LineChartDataPoint(x=self.tuner.time_data[i], y=self.tuner.temp_data[i])
-                            for i in range(current_count)
-                        ]
-                        self.line_real.data_points = points
-                        
                         # LÓGICA DE AUTO-ESCALA (ESTIRAMIENTO)
                         if self.tuner.time_data:
                             max_t = self.tuner.time_data[-1]
@@ -509,20 +1099,76 @@ class TuningView(ft.Container):
                             # El final crece si superamos los 60s
                             # (1.05 es un margen del 5% a la derecha para estética)
                             self.chart.max_x = max(60, max_t * 1.05)
-                        
+
+                        # Progreso hacia el régimen estacionario
+                        slope = self.tuner.steady_detector.slope
+                        if self.tuner.recording and slope is not None:
+                            self.lbl_status_info.value = f"Grabando respuesta al escalón... pendiente {slope * 60:+.2f} °C/min"
+                            self.lbl_status_info.update()
+
+                        # Puntos reutilizados y diezmados: el costo no crece con la grabación
+                        self.render_real_series()
                         self.chart.update()
                         last_data_count = current_count
 
-                # 4. SINCRONIZACIÓN DE ESTADO (Por si hubo parada externa)
-                # Si el tuner ya no graba, pero el botón sigue en rojo "DETENER"
-                if not self.tuner.recording and self.btn_autotune.text == "DETENER":
+                # 3b. ENSAYO DE RELÉ: progreso y resultado
+                if self.tuner.relay_active:
+                    det = self.tuner.relay.detector
+                    self.lbl_status_info.value = f"Relé: {det.cycles} ciclos medidos..."
+                    self.lbl_status_info.update()
+                elif self.relay_ui_active:
+                    self.finish_relay_ui()
+                elif not self.tuner.testing and not self.sequence_ui_active \
+                        and self.btn_relay.disabled == self.esp.manual_power_supported:
+                    # La capacidad llega con la telemetría (conexión / cambio de equipo)
+                    self._set_relay_enabled(True)
+                    self.btn_relay.update()
+
+                # 3c. SECUENCIA MULTI-PUNTO: estado y tabla al terminar
+                if self.sequencer and self.sequencer.active:
+                    if not self.sequence_ui_active: self._set_sequence_controls(True)
+                    if self.lbl_sequence.value != self.sequencer.status:
+                        self.lbl_sequence.value = self.sequencer.status
+                        self.refresh_model_table()
+                        if self.sequence_card.page: self.sequence_card.update()
+                elif self.sequence_ui_active:
+                    self.finish_sequence_ui()
+
+                # 4. SINCRONIZACIÓN DE ESTADO (fin del ajuste o parada externa)
+                # Si el tuner ya no graba ni ajusta, pero el botón sigue en rojo "DETENER"
+                if not self.tuner.recording and not self.tuner.identifying and self.btn_autotune.text == "DETENER":
                      # Resetear visualmente el botón
                      self.btn_autotune.text = "Auto-Calibrar"
                      self.btn_autotune.style.bgcolor = AppTheme.color_tuning
+                     self.btn_autotune.disabled = False
+                     self._set_relay_enabled(True)
                      self.lbl_status_info.value = "Detenido."
+
+                     # Parada manual o automática (régimen estacionario / modelo convergido)
+                     model = self.tuner.last_identified_model
+                     if self.manual_stop:
+                         self.manual_stop = False
+                         if model:
+                             # Ajustar slider según el modelo detectado y recalcular PID sugerido
+                             self.apply_model(model)
+                             self.lbl_status_info.value = f"¡Modelo Identificado! (R²={model['r2']:.3f} | RMSE={model['rmse']:.2f}°C)"
+                             self.lbl_status_info.color = "green"
+                             self.start_bootstrap(model)
+                         else:
+                             self.lbl_status_info.value = "Fallo: Movimiento insuficiente o cancelación."
+                             self.lbl_status_info.color = "red"
+                     elif self.tuner.stop_reason:
+                         if model:
+                             self.apply_model(model)
+                             self.lbl_status_info.value = f"{self.tuner.stop_reason}: ¡Modelo Identificado! (R²={model['r2']:.3f})"
+                             self.lbl_status_info.color = "green"
+                             self.start_bootstrap(model)
+                         else:
+                             self.lbl_status_info.value = f"{self.tuner.stop_reason}, pero el ajuste falló."
+                             self.lbl_status_info.color = "red"
                      
                      # Actualizar UI con seguridad
-                     if self.btn_autotune.page: self.btn_autotune.update()
+                     if self.btn_autotune.page: self.btn_autotune.update(), self.btn_relay.update()
                      if self.lbl_status_info.page: self.lbl_status_info.update()
                      
                      # IMPORTANTE: Forzar reaparición de la línea azul comparativa